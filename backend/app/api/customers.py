@@ -7,12 +7,22 @@ from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from typing import Dict, List, Optional
 import pandas as pd
-from datetime import datetime, timedelta
+import numpy as np
+import threading
+from datetime import timedelta
 
 from app.utils.data_generator import DataGenerator
+from app.utils.customer_store import get_customer_store
+from app.utils.cohorts import CohortRetention
+from app.utils.cache import versioned_cache
+from app.utils.data_version import get_data_version
 
 router = APIRouter()
 
+# Motor de cohortes compartido entre peticiones
+_cohortes = None
+_cohortes_lock = threading.Lock()
+
 class CustomerRFMResponse(BaseModel):
     """Respuesta del endpoint de análisis RFM"""
     customer_id: str
@@ -38,29 +48,12 @@ async def get_customers_rfm(
 ):
     """Obtiene análisis RFM de clientes"""
     try:
-        # Cargar datos
-        data_generator = DataGenerator()
-        productos_df, clientes_df, ventas_df = data_generator.load_data()
-        
-        # Obtener datos combinados
-        df_completo = data_generator.get_combined_data()
-        df_pandas = df_completo.toPandas()
-        
-        # Calcular RFM
-        fecha_max = df_pandas['fecha'].max()
-        
-        rfm = df_pandas.groupby('customer_id').agg({
-            'fecha': lambda x: (fecha_max - x.max()).days,  # Recency
-            'venta_id': 'count',  # Frequency
-            'total': 'sum'  # Monetary
-        }).reset_index()
-        
-        rfm.columns = ['customer_id', 'recency', 'frequency', 'monetary']
+        # RFM precalculado en el almacén de clientes
+        store = get_customer_store()
+        rfm = store.perfiles[['customer_id', 'recency', 'frequency', 'monetary']].copy()
         
-        # Calcular quintiles para RFM
-        rfm['R_score'] = pd.qcut(rfm['recency'], 5, labels=[5,4,3,2,1])
-        rfm['F_score'] = pd.qcut(rfm['frequency'].rank(method='first'), 5, labels=[1,2,3,4,5])
-        rfm['M_score'] = pd.qcut(rfm['monetary'], 5, labels=[1,2,3,4,5])
+        # Quintiles RFM a partir de los sketches de cuantiles del almacén
+        rfm[['R_score', 'F_score', 'M_score']] = store.rfm_scores().to_numpy()
         
         # Combinar scores
         rfm['RFM_Score'] = rfm['R_score'].astype(str) + rfm['F_score'].astype(str) + rfm['M_score'].astype(str)
@@ -87,9 +80,6 @@ async def get_customers_rfm(
         # Ordenar por valor monetario
         rfm = rfm.sort_values('monetary', ascending=False).head(limit)
         
-        # Detener Spark
-        data_generator.stop_spark()
-        
         # Convertir a formato de respuesta
         response = []
         for _, row in rfm.iterrows():
@@ -111,19 +101,15 @@ async def get_customers_rfm(
 async def get_customers_segments():
     """Obtiene análisis de segmentación de clientes"""
     try:
-        # Cargar datos
-        data_generator = DataGenerator()
-        productos_df, clientes_df, ventas_df = data_generator.load_data()
-        
-        # Obtener datos combinados
-        df_completo = data_generator.get_combined_data()
-        df_pandas = df_completo.toPandas()
+        # Perfiles por cliente del almacén (una fila por cliente con compras)
+        store = get_customer_store()
+        perfiles = store.perfiles
         
         # Análisis por segmento
-        segmentos_analysis = df_pandas.groupby('segmento').agg({
-            'customer_id': 'nunique',
-            'total': 'sum',
-            'venta_id': 'count'
+        segmentos_analysis = perfiles.groupby('segmento').agg({
+            'customer_id': 'count',
+            'ventas_totales': 'sum',
+            'num_transacciones': 'sum'
         }).reset_index()
         
         segmentos_analysis.columns = ['segmento', 'num_clientes', 'ventas_totales', 'num_transacciones']
@@ -135,27 +121,21 @@ async def get_customers_segments():
         # Ordenar por ventas totales
         segmentos_analysis = segmentos_analysis.sort_values('ventas_totales', ascending=False)
         
-        # Detener Spark
-        data_generator.stop_spark()
-        
         # Obtener clientes top por segmento
         response = []
         for _, seg_row in segmentos_analysis.iterrows():
             segmento = seg_row['segmento']
             
             # Obtener clientes top de este segmento
-            clientes_segmento = df_pandas[df_pandas['segmento'] == segmento]
-            top_clientes = clientes_segmento.groupby('customer_id').agg({
-                'total': 'sum',
-                'venta_id': 'count'
-            }).sort_values('total', ascending=False).head(5)
+            top_clientes = perfiles[perfiles['segmento'] == segmento] \
+                .sort_values('ventas_totales', ascending=False).head(5)
             
             clientes_top_list = []
-            for customer_id, cli_row in top_clientes.iterrows():
+            for _, cli_row in top_clientes.iterrows():
                 clientes_top_list.append({
-                    'customer_id': customer_id,
-                    'ventas_totales': round(cli_row['total'], 2),
-                    'num_transacciones': int(cli_row['venta_id'])
+                    'customer_id': cli_row['customer_id'],
+                    'ventas_totales': round(cli_row['ventas_totales'], 2),
+                    'num_transacciones': int(cli_row['num_transacciones'])
                 })
             
             response.append(CustomerSegmentResponse(
@@ -176,61 +156,32 @@ async def get_customers_segments():
 async def get_customer_details(customer_id: str):
     """Obtiene detalles específicos de un cliente"""
     try:
-        # Cargar datos
-        data_generator = DataGenerator()
-        productos_df, clientes_df, ventas_df = data_generator.load_data()
-        
-        # Obtener datos combinados
-        df_completo = data_generator.get_combined_data()
-        df_pandas = df_completo.toPandas()
+        # Búsqueda directa en el almacén de clientes
+        store = get_customer_store()
+        cliente = store.get_customer(customer_id)
         
-        # Filtrar por cliente
-        cliente_data = df_pandas[df_pandas['customer_id'] == customer_id]
-        
-        if cliente_data.empty:
+        if cliente is None:
             raise HTTPException(status_code=404, detail="Cliente no encontrado")
         
         # Información básica del cliente
-        cliente_info = cliente_data.iloc[0]
+        cliente_info = cliente['perfil']
         
         # Métricas de compra
-        ventas_totales = cliente_data['total'].sum()
-        num_transacciones = len(cliente_data)
-        cantidad_total = cliente_data['cantidad'].sum()
-        margen_total = cliente_data['margen'].sum()
-        
-        # Calcular RFM
-        fecha_max = df_pandas['fecha'].max()
-        recency = (fecha_max - cliente_data['fecha'].max()).days
-        frequency = num_transacciones
-        monetary = ventas_totales
-        
-        # Análisis temporal de compras
-        compras_temporales = cliente_data.groupby('fecha').agg({
-            'total': 'sum',
-            'cantidad': 'sum'
-        }).reset_index()
-        
-        # Análisis por categoría
-        compras_categoria = cliente_data.groupby('categoria').agg({
-            'total': 'sum',
-            'cantidad': 'sum'
-        }).sort_values('total', ascending=False)
-        
-        # Análisis por canal
-        compras_canal = cliente_data.groupby('canal').agg({
-            'total': 'sum',
-            'venta_id': 'count'
-        }).reset_index()
-        
-        # Productos favoritos
-        productos_favoritos = cliente_data.groupby(['product_id', 'nombre']).agg({
-            'total': 'sum',
-            'cantidad': 'sum'
-        }).sort_values('total', ascending=False).head(5)
-        
-        # Detener Spark
-        data_generator.stop_spark()
+        ventas_totales = cliente_info['ventas_totales']
+        num_transacciones = int(cliente_info['num_transacciones'])
+        cantidad_total = cliente_info['cantidad_total']
+        margen_total = cliente_info['margen_total']
+        
+        # RFM precalculado
+        fecha_max = store.fecha_max
+        recency = cliente_info['recency']
+        frequency = cliente_info['frequency']
+        monetary = cliente_info['monetary']
+        
+        compras_temporales = cliente['compras_temporales']
+        compras_categoria = cliente['compras_categoria']
+        compras_canal = cliente['compras_canal']
+        productos_favoritos = cliente['productos_favoritos'].head(5)
         
         return {
             "cliente": {
@@ -265,28 +216,28 @@ async def get_customer_details(customer_id: str):
             ],
             "compras_categoria": [
                 {
-                    "categoria": categoria,
-                    "ventas": round(ventas, 2),
-                    "cantidad": int(cantidad)
+                    "categoria": row['categoria'],
+                    "ventas": round(row['total'], 2),
+                    "cantidad": int(row['cantidad'])
                 }
-                for categoria, (ventas, cantidad) in compras_categoria.iterrows()
+                for _, row in compras_categoria.iterrows()
             ],
             "compras_canal": [
                 {
                     "canal": row['canal'],
                     "ventas": round(row['total'], 2),
-                    "transacciones": int(row['venta_id'])
+                    "transacciones": int(row['transacciones'])
                 }
                 for _, row in compras_canal.iterrows()
             ],
             "productos_favoritos": [
                 {
-                    "product_id": product_id,
-                    "nombre": nombre,
-                    "ventas": round(ventas, 2),
-                    "cantidad": int(cantidad)
+                    "product_id": row['product_id'],
+                    "nombre": row['nombre'],
+                    "ventas": round(row['total'], 2),
+                    "cantidad": int(row['cantidad'])
                 }
-                for (product_id, nombre), (ventas, cantidad) in productos_favoritos.iterrows()
+                for _, row in productos_favoritos.iterrows()
             ]
         }
         
@@ -295,165 +246,172 @@ async def get_customer_details(customer_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo detalles del cliente: {str(e)}")
 
-@router.get("/customers/behavior/analysis")
-async def get_customer_behavior_analysis():
-    """Obtiene análisis de comportamiento de clientes"""
+def _calcular_comportamiento():
+    """Calcula el análisis de comportamiento con una única pasada de Spark (grouping sets)"""
+    data_generator = DataGenerator()
     try:
-        # Cargar datos
-        data_generator = DataGenerator()
-        productos_df, clientes_df, ventas_df = data_generator.load_data()
-        
-        # Obtener datos combinados
         df_completo = data_generator.get_combined_data()
-        df_pandas = df_completo.toPandas()
-        
-        # Análisis de comportamiento por edad
-        comportamiento_edad = df_pandas.groupby('edad').agg({
-            'total': 'sum',
-            'customer_id': 'nunique',
-            'venta_id': 'count'
-        }).reset_index()
-        
-        comportamiento_edad['ticket_promedio'] = comportamiento_edad['total'] / comportamiento_edad['venta_id']
-        comportamiento_edad['frecuencia_promedio'] = comportamiento_edad['venta_id'] / comportamiento_edad['customer_id']
-        
-        # Análisis por género
-        comportamiento_genero = df_pandas.groupby('genero').agg({
-            'total': 'sum',
-            'customer_id': 'nunique',
-            'venta_id': 'count'
-        }).reset_index()
-        
-        comportamiento_genero['ticket_promedio'] = comportamiento_genero['total'] / comportamiento_genero['venta_id']
-        
-        # Análisis por ciudad
-        comportamiento_ciudad = df_pandas.groupby('ciudad').agg({
-            'total': 'sum',
-            'customer_id': 'nunique',
-            'venta_id': 'count'
-        }).reset_index()
-        
-        comportamiento_ciudad['ticket_promedio'] = comportamiento_ciudad['total'] / comportamiento_ciudad['venta_id']
-        comportamiento_ciudad = comportamiento_ciudad.sort_values('total', ascending=False)
-        
-        # Análisis de lealtad (clientes que compran múltiples veces)
-        lealtad_clientes = df_pandas.groupby('customer_id').agg({
-            'venta_id': 'count',
-            'total': 'sum'
-        }).reset_index()
-        
-        lealtad_clientes.columns = ['customer_id', 'num_compras', 'ventas_totales']
-        
-        # Clasificar por lealtad
-        def clasificar_lealtad(num_compras):
-            if num_compras >= 10:
-                return "Muy Leal"
-            elif num_compras >= 5:
-                return "Leal"
-            elif num_compras >= 2:
-                return "Ocasional"
-            else:
-                return "Nuevo"
-        
-        lealtad_clientes['tipo_lealtad'] = lealtad_clientes['num_compras'].apply(clasificar_lealtad)
-        
-        # Detener Spark
+        df_completo.createOrReplaceTempView("ventas_completas")
+        
+        # Agregados por edad, género, ciudad y cliente en un solo GROUP BY
+        agregados = data_generator.spark.sql("""
+            SELECT edad, genero, ciudad, customer_id,
+                   grouping(edad) AS g_edad,
+                   grouping(genero) AS g_genero,
+                   grouping(ciudad) AS g_ciudad,
+                   SUM(total) AS total,
+                   COUNT(DISTINCT customer_id) AS num_clientes,
+                   COUNT(venta_id) AS num_compras
+            FROM ventas_completas
+            GROUP BY GROUPING SETS ((edad), (genero), (ciudad), (customer_id))
+        """).toPandas()
+    finally:
         data_generator.stop_spark()
-        
-        return {
-            "comportamiento_edad": [
-                {
-                    "edad": int(row['edad']),
-                    "ventas_totales": round(row['total'], 2),
-                    "num_clientes": int(row['customer_id']),
-                    "ticket_promedio": round(row['ticket_promedio'], 2),
-                    "frecuencia_promedio": round(row['frecuencia_promedio'], 2)
-                }
-                for _, row in comportamiento_edad.iterrows()
-            ],
-            "comportamiento_genero": [
-                {
-                    "genero": row['genero'],
-                    "ventas_totales": round(row['total'], 2),
-                    "num_clientes": int(row['customer_id']),
-                    "ticket_promedio": round(row['ticket_promedio'], 2)
-                }
-                for _, row in comportamiento_genero.iterrows()
-            ],
-            "top_ciudades": [
-                {
-                    "ciudad": row['ciudad'],
-                    "ventas_totales": round(row['total'], 2),
-                    "num_clientes": int(row['customer_id']),
-                    "ticket_promedio": round(row['ticket_promedio'], 2)
-                }
-                for _, row in comportamiento_ciudad.head(10).iterrows()
-            ],
-            "analisis_lealtad": {
-                "muy_leal": int((lealtad_clientes['tipo_lealtad'] == "Muy Leal").sum()),
-                "leal": int((lealtad_clientes['tipo_lealtad'] == "Leal").sum()),
-                "ocasional": int((lealtad_clientes['tipo_lealtad'] == "Ocasional").sum()),
-                "nuevo": int((lealtad_clientes['tipo_lealtad'] == "Nuevo").sum())
-            },
-            "insights": {
-                "edad_promedio": round(comportamiento_edad['edad'].mean(), 1),
-                "edad_max_ventas": int(comportamiento_edad.loc[comportamiento_edad['total'].idxmax()]['edad']),
-                "genero_dominante": comportamiento_genero.loc[comportamiento_genero['total'].idxmax()]['genero'],
-                "ciudad_top": comportamiento_ciudad.iloc[0]['ciudad'] if not comportamiento_ciudad.empty else None
+    
+    # Análisis de comportamiento por edad
+    comportamiento_edad = agregados[agregados['g_edad'] == 0].sort_values('edad')
+    comportamiento_edad = comportamiento_edad.assign(
+        ticket_promedio=comportamiento_edad['total'] / comportamiento_edad['num_compras'],
+        frecuencia_promedio=comportamiento_edad['num_compras'] / comportamiento_edad['num_clientes']
+    )
+    
+    # Análisis por género
+    comportamiento_genero = agregados[agregados['g_genero'] == 0].sort_values('genero')
+    comportamiento_genero = comportamiento_genero.assign(
+        ticket_promedio=comportamiento_genero['total'] / comportamiento_genero['num_compras']
+    )
+    
+    # Análisis por ciudad
+    comportamiento_ciudad = agregados[agregados['g_ciudad'] == 0]
+    comportamiento_ciudad = comportamiento_ciudad.assign(
+        ticket_promedio=comportamiento_ciudad['total'] / comportamiento_ciudad['num_compras']
+    ).sort_values('total', ascending=False)
+    
+    # Análisis de lealtad: clasificación vectorizada por intervalos de número de compras
+    lealtad_clientes = agregados[
+        (agregados['g_edad'] == 1) & (agregados['g_genero'] == 1) & (agregados['g_ciudad'] == 1)
+    ]
+    tipo_lealtad = pd.cut(
+        lealtad_clientes['num_compras'],
+        bins=[0, 2, 5, 10, np.inf],
+        right=False,
+        labels=["Nuevo", "Ocasional", "Leal", "Muy Leal"]
+    ).value_counts()
+    
+    return {
+        "comportamiento_edad": [
+            {
+                "edad": int(row['edad']),
+                "ventas_totales": round(row['total'], 2),
+                "num_clientes": int(row['num_clientes']),
+                "ticket_promedio": round(row['ticket_promedio'], 2),
+                "frecuencia_promedio": round(row['frecuencia_promedio'], 2)
             }
+            for _, row in comportamiento_edad.iterrows()
+        ],
+        "comportamiento_genero": [
+            {
+                "genero": row['genero'],
+                "ventas_totales": round(row['total'], 2),
+                "num_clientes": int(row['num_clientes']),
+                "ticket_promedio": round(row['ticket_promedio'], 2)
+            }
+            for _, row in comportamiento_genero.iterrows()
+        ],
+        "top_ciudades": [
+            {
+                "ciudad": row['ciudad'],
+                "ventas_totales": round(row['total'], 2),
+                "num_clientes": int(row['num_clientes']),
+                "ticket_promedio": round(row['ticket_promedio'], 2)
+            }
+            for _, row in comportamiento_ciudad.head(10).iterrows()
+        ],
+        "analisis_lealtad": {
+            "muy_leal": int(tipo_lealtad["Muy Leal"]),
+            "leal": int(tipo_lealtad["Leal"]),
+            "ocasional": int(tipo_lealtad["Ocasional"]),
+            "nuevo": int(tipo_lealtad["Nuevo"])
+        },
+        "insights": {
+            "edad_promedio": round(comportamiento_edad['edad'].mean(), 1),
+            "edad_max_ventas": int(comportamiento_edad.loc[comportamiento_edad['total'].idxmax()]['edad']),
+            "genero_dominante": comportamiento_genero.loc[comportamiento_genero['total'].idxmax()]['genero'],
+            "ciudad_top": comportamiento_ciudad.iloc[0]['ciudad'] if not comportamiento_ciudad.empty else None
         }
+    }
+
+@router.get("/customers/behavior/analysis")
+async def get_customer_behavior_analysis():
+    """Obtiene análisis de comportamiento de clientes"""
+    try:
+        # Materializado una vez por versión de datos
+        return versioned_cache.get_or_compute("comportamiento_clientes", _calcular_comportamiento)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analizando comportamiento: {str(e)}")
 
+def _obtener_cohortes():
+    """Obtiene el motor de cohortes de la versión de datos actual
+
+    Si ya existe una matriz construida, solo se leen de Spark las ventas posteriores
+    a la última fecha procesada; se reconstruye completa si el histórico cambió.
+    """
+    global _cohortes
+
+    version = get_data_version()
+    if _cohortes is not None and _cohortes.version == version:
+        return _cohortes
+
+    with _cohortes_lock:
+        if _cohortes is not None and _cohortes.version == version:
+            return _cohortes
+
+        data_generator = DataGenerator()
+        try:
+            ventas_df = data_generator.spark.read.parquet("app/data/sales.parquet") \
+                .select('customer_id', 'fecha')
+            
+            motor = _cohortes
+            if motor is not None:
+                ultima_fecha = motor.ultima_fecha.to_pydatetime()
+                historico = ventas_df.filter(ventas_df['fecha'] <= ultima_fecha).count()
+                
+                if historico == motor.num_ventas:
+                    nuevas_ventas = ventas_df.filter(ventas_df['fecha'] > ultima_fecha).toPandas()
+                    if not motor.update(nuevas_ventas):
+                        motor = None
+                else:
+                    motor = None
+            
+            if motor is None:
+                print("📅 Construyendo matriz de cohortes...")
+                motor = CohortRetention().build(ventas_df.toPandas())
+        finally:
+            data_generator.stop_spark()
+
+        motor.version = version
+        _cohortes = motor
+
+    return _cohortes
+
 @router.get("/customers/retention/analysis")
 async def get_customer_retention_analysis():
     """Obtiene análisis de retención de clientes"""
     try:
-        # Cargar datos
-        data_generator = DataGenerator()
-        productos_df, clientes_df, ventas_df = data_generator.load_data()
-        
-        # Obtener datos combinados
-        df_completo = data_generator.get_combined_data()
-        df_pandas = df_completo.toPandas()
-        
-        # Análisis de cohortes por mes de primera compra
-        df_pandas['fecha_compra'] = pd.to_datetime(df_pandas['fecha'])
-        df_pandas['periodo_compra'] = df_pandas['fecha_compra'].dt.to_period('M')
-        
-        # Primera compra por cliente
-        primera_compra = df_pandas.groupby('customer_id')['fecha_compra'].min().reset_index()
-        primera_compra.columns = ['customer_id', 'cohorte_fecha']
-        primera_compra['cohorte_periodo'] = primera_compra['cohorte_fecha'].dt.to_period('M')
-        
-        # Mergear con datos originales
-        df_cohorte = df_pandas.merge(primera_compra, on='customer_id')
-        df_cohorte['periodo_numero'] = (df_cohorte['periodo_compra'] - df_cohorte['cohorte_periodo']).apply(lambda x: x.n)
-        
-        # Tabla de cohortes
-        tabla_cohortes = df_cohorte.groupby(['cohorte_periodo', 'periodo_numero'])['customer_id'].nunique().reset_index()
-        tabla_cohortes_pivot = tabla_cohortes.pivot(index='cohorte_periodo', 
-                                                   columns='periodo_numero', 
-                                                   values='customer_id')
-        
-        # Tamaño de cohortes
-        tamanos_cohorte = primera_compra.groupby('cohorte_periodo').size()
-        
-        # Tasa de retención
-        tabla_retencion = tabla_cohortes_pivot.divide(tamanos_cohorte, axis=0)
+        # Matriz de cohortes mantenida incrementalmente
+        cohortes = _obtener_cohortes()
+        tabla_retencion = cohortes.retention_table()
+        tamanos_cohorte = cohortes.tamanos_cohorte
         
         # Análisis de churn
-        fecha_max = df_pandas['fecha'].max()
+        fecha_max = cohortes.ultima_fecha
         fecha_limite = fecha_max - timedelta(days=90)  # 3 meses sin comprar
         
-        clientes_activos = df_pandas[df_pandas['fecha'] >= fecha_limite]['customer_id'].nunique()
-        clientes_totales = df_pandas['customer_id'].nunique()
+        clientes_activos = cohortes.active_customers(fecha_limite)
+        clientes_totales = len(cohortes.clientes)
         tasa_actividad = clientes_activos / clientes_totales
         
-        # Detener Spark
-        data_generator.stop_spark()
-        
         return {
             "tasa_retencion": {
                 "cohortes": [
@@ -6,11 +6,23 @@ Predicciones de ventas usando Prophet y ARIMA
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from typing import Dict, List, Optional
+import os
+import joblib
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 
-from app.utils.data_generator import DataGenerator
-from app.ml.forecasting import SalesForecaster
+from app.utils.time_series import get_series, get_daily_matrix
+from app.utils.resampling import GRANULARIDADES
+from app.ml.forecasting import SalesForecaster, seasonal_period
+from app.ml.forecast_cache import cached_forecast, cached_history
+from app.ml.seasonality import seasonality_profile
+from app.ml.anomalies import AnomalyMonitor
+from app.ml.registry import ModelNotFoundError, StaleModelError
+from app.utils.data_version import get_data_version
+from app.utils.jobs import get_job_queue
+from app.utils.cache import versioned_cache, dump_atomic, CACHE_DIR
+from app.ml.hierarchical import NIVELES, METODOS
+from app.ml.baseline import BaselineForecaster, METODOS as BASELINES
 
 router = APIRouter()
 
@@ -21,261 +33,349 @@ class ForecastResponse(BaseModel):
     metricas_rendimiento: Optional[Dict]
     periodo_prediccion: Dict
     ultima_actualizacion: str
+    version_modelo: Optional[str] = None
+    reentrenamiento: Optional[Dict] = None
 
 class ForecastRequest(BaseModel):
     """Request para forecasting personalizado"""
     periods: int = 6
-    model_type: Optional[str] = "auto"  # auto, prophet, arima
+    model_type: Optional[str] = "auto"  # auto, prophet, arima, holt_winters, seasonal_naive
+    granularity: str = "D"  # D (días), W (semanas), M (meses)
+
+def _validar_granularidad(granularidad):
+    """Responde 400 si la granularidad no es válida"""
+    if granularidad not in GRANULARIDADES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Granularidad no válida. Disponibles: {', '.join(GRANULARIDADES)}"
+        )
+
+def _validar_periodos(periodos, granularidad):
+    """Responde 400 si el número de periodos no está entre 1 y el máximo de la granularidad"""
+    maximo = GRANULARIDADES[granularidad]['max_periodos']
+    if not 1 <= periodos <= maximo:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Periodos entre 1 y {maximo} con granularidad {granularidad}"
+        )
+
+def _cargar_forecaster(model_type="auto", respaldo=False, granularidad="D"):
+    """Carga el último modelo válido; si está obsoleto o no existe, encola su reentrenamiento
+
+    Devuelve el forecaster y el trabajo de reentrenamiento (None si el modelo está al día).
+    Con ``respaldo`` no se usa un modelo obsoleto: se devuelve un forecaster sin
+    entrenar para ajustar el modelo base sobre los datos actuales. Sin respaldo ni
+    modelos registrados responde 503 con el id del trabajo para consultar su estado.
+    """
+    forecaster = SalesForecaster(granularidad)
+    data_version = get_data_version()
+    parametros = {"model_type": model_type, "granularity": granularidad}
+    
+    try:
+        forecaster.load_models(data_version)
+        return forecaster, None
+    except StaleModelError as e:
+        job = get_job_queue().submit("forecast_train", parametros)
+        if not respaldo:
+            print(f"🔄 {e}: se sirve el último modelo mientras se reentrena")
+            forecaster.load_models()
+    except ModelNotFoundError:
+        job = get_job_queue().submit("forecast_train", parametros)
+        if not respaldo:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Modelos en entrenamiento, consulte /api/v1/jobs/{job['id']}"
+            )
+    
+    return forecaster, {"job_id": job['id'], "estado": job['estado']}
 
 @router.get("/forecast", response_model=ForecastResponse)
 async def get_forecast(
-    periods: int = Query(6, description="Número de períodos a predecir", ge=1, le=12),
-    model_type: str = Query("auto", description="Tipo de modelo: auto, prophet, arima")
+    periods: int = Query(6, description="Número de períodos a predecir (máximo según la granularidad: 90 D, 26 W, 12 M)", ge=1),
+    model_type: str = Query("auto", description="Tipo de modelo: auto, prophet, arima, holt_winters, seasonal_naive"),
+    granularity: str = Query("D", description="Granularidad de los períodos: D (días), W (semanas), M (meses)")
 ):
     """Obtiene predicciones de ventas futuras"""
+    _validar_granularidad(granularity)
+    _validar_periodos(periods, granularity)
+    
     try:
-        # Cargar datos
-        data_generator = DataGenerator()
-        productos_df, clientes_df, ventas_df = data_generator.load_data()
+        # Modelo registrado para estos datos; si no está listo, modelo base mientras se reentrena
+        forecaster, reentrenamiento = _cargar_forecaster(model_type, respaldo=True, granularidad=granularity)
         
-        # Obtener datos combinados
-        df_completo = data_generator.get_combined_data()
+        # Serie de la versión de datos actual (diaria agregada en Spark y cacheada, remuestreada)
+        time_series_data = get_series(granularity)
         
-        # Inicializar forecaster
-        forecaster = SalesForecaster()
-        
-        # Intentar cargar modelos existentes
-        try:
-            forecaster.load_models()
-            print("✅ Modelos cargados desde archivo")
-        except:
-            print("🔄 Entrenando nuevos modelos...")
-            # Preparar datos de series temporales
-            time_series_data = forecaster.prepare_time_series_data(df_completo)
-            
-            # Entrenar y comparar modelos
-            if model_type == "auto":
-                results = forecaster.compare_models(time_series_data)
-                forecaster.save_models()
-            elif model_type == "prophet":
-                forecaster.train_prophet_model(time_series_data)
-                forecaster.best_model = "prophet"
-                forecaster.save_models()
-            elif model_type == "arima":
-                forecaster.train_arima_model(time_series_data)
-                forecaster.best_model = "arima"
-                forecaster.save_models()
-            else:
-                raise ValueError("Tipo de modelo no válido")
+        if forecaster.best_model is None:
+            forecaster.train_baseline_model(time_series_data)
+            forecaster.best_model = "holt_winters"
         
-        # Preparar datos para predicción
-        time_series_data = forecaster.prepare_time_series_data(df_completo)
-        
-        # Obtener predicciones
-        predicciones = forecaster.predict_future_sales(periods, time_series_data)
-        
-        # Obtener métricas de rendimiento
-        metricas = forecaster.get_model_performance(time_series_data)
-        
-        # Calcular período de predicción
-        ultima_fecha = time_series_data['ds'].max()
-        fecha_inicio = ultima_fecha + timedelta(days=1)
-        fecha_fin = fecha_inicio + timedelta(days=periods-1)
-        
-        # Detener Spark
-        data_generator.stop_spark()
+        # Predicciones y métricas cacheadas por versión de modelo (recorte del horizonte más largo)
+        predicciones, metricas = cached_forecast(forecaster, time_series_data, periods, granularity)
         
         return ForecastResponse(
             predicciones=predicciones,
             modelo_utilizado=forecaster.best_model,
             metricas_rendimiento=metricas,
             periodo_prediccion={
-                "inicio": fecha_inicio.strftime('%Y-%m-%d'),
-                "fin": fecha_fin.strftime('%Y-%m-%d'),
-                "periodos": periods
+                "inicio": predicciones[0]['fecha'],
+                "fin": predicciones[-1]['fecha'],
+                "periodos": periods,
+                "granularidad": granularity
             },
-            ultima_actualizacion=datetime.now().isoformat()
+            ultima_actualizacion=datetime.now().isoformat(),
+            version_modelo=forecaster.model_version,
+            reentrenamiento=reentrenamiento
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en forecasting: {str(e)}")
 
 @router.post("/forecast/custom", response_model=ForecastResponse)
 async def custom_forecast(request: ForecastRequest):
     """Endpoint POST para forecasting personalizado"""
+    _validar_granularidad(request.granularity)
+    _validar_periodos(request.periods, request.granularity)
+    
     try:
-        # Cargar datos
-        data_generator = DataGenerator()
-        productos_df, clientes_df, ventas_df = data_generator.load_data()
-        
-        # Obtener datos combinados
-        df_completo = data_generator.get_combined_data()
-        
-        # Inicializar forecaster
-        forecaster = SalesForecaster()
-        
-        # Cargar modelos existentes o entrenar nuevos
-        try:
-            forecaster.load_models()
-        except:
-            time_series_data = forecaster.prepare_time_series_data(df_completo)
-            if request.model_type == "auto":
-                forecaster.compare_models(time_series_data)
-            elif request.model_type == "prophet":
-                forecaster.train_prophet_model(time_series_data)
-                forecaster.best_model = "prophet"
-            elif request.model_type == "arima":
-                forecaster.train_arima_model(time_series_data)
-                forecaster.best_model = "arima"
-            forecaster.save_models()
-        
-        # Preparar datos para predicción
-        time_series_data = forecaster.prepare_time_series_data(df_completo)
+        # Modelo registrado para estos datos; si no está listo, modelo base mientras se reentrena
+        forecaster, reentrenamiento = _cargar_forecaster(request.model_type, respaldo=True, granularidad=request.granularity)
         
-        # Obtener predicciones
-        predicciones = forecaster.predict_future_sales(request.periods, time_series_data)
+        # Serie de la versión de datos actual (diaria agregada en Spark y cacheada, remuestreada)
+        time_series_data = get_series(request.granularity)
         
-        # Obtener métricas de rendimiento
-        metricas = forecaster.get_model_performance(time_series_data)
+        if forecaster.best_model is None:
+            forecaster.train_baseline_model(time_series_data)
+            forecaster.best_model = "holt_winters"
         
-        # Calcular período de predicción
-        ultima_fecha = time_series_data['ds'].max()
-        fecha_inicio = ultima_fecha + timedelta(days=1)
-        fecha_fin = fecha_inicio + timedelta(days=request.periods-1)
-        
-        # Detener Spark
-        data_generator.stop_spark()
+        # Predicciones y métricas cacheadas por versión de modelo (recorte del horizonte más largo)
+        predicciones, metricas = cached_forecast(forecaster, time_series_data, request.periods, request.granularity)
         
         return ForecastResponse(
             predicciones=predicciones,
             modelo_utilizado=forecaster.best_model,
             metricas_rendimiento=metricas,
             periodo_prediccion={
-                "inicio": fecha_inicio.strftime('%Y-%m-%d'),
-                "fin": fecha_fin.strftime('%Y-%m-%d'),
-                "periodos": request.periods
+                "inicio": predicciones[0]['fecha'],
+                "fin": predicciones[-1]['fecha'],
+                "periodos": request.periods,
+                "granularidad": request.granularity
             },
-            ultima_actualizacion=datetime.now().isoformat()
+            ultima_actualizacion=datetime.now().isoformat(),
+            version_modelo=forecaster.model_version,
+            reentrenamiento=reentrenamiento
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en forecasting personalizado: {str(e)}")
 
 @router.get("/forecast/models/compare")
 async def compare_forecast_models():
-    """Compara el rendimiento de diferentes modelos de forecasting"""
+    """Compara el rendimiento de diferentes modelos de forecasting
+
+    Devuelve la comparación registrada con el último modelo; el entrenamiento
+    se ejecuta en la cola de trabajos en lugar de dentro de la petición.
+    """
     try:
-        # Cargar datos
-        data_generator = DataGenerator()
-        productos_df, clientes_df, ventas_df = data_generator.load_data()
-        
-        # Obtener datos combinados
-        df_completo = data_generator.get_combined_data()
-        
-        # Inicializar forecaster
-        forecaster = SalesForecaster()
-        
-        # Preparar datos
-        time_series_data = forecaster.prepare_time_series_data(df_completo)
+        forecaster, reentrenamiento = _cargar_forecaster("auto")
+        metadata = forecaster.metadata
         
-        # Comparar modelos
-        results = forecaster.compare_models(time_series_data)
+        # Un modelo entrenado sin comparación no tiene métricas de ambos candidatos
+        if not metadata.get('metricas'):
+            job = get_job_queue().submit("forecast_train", {"model_type": "auto", "granularity": "D"})
+            raise HTTPException(
+                status_code=503,
+                detail=f"Comparación en curso, consulte /api/v1/jobs/{job['id']}"
+            )
         
-        # Detener Spark
-        data_generator.stop_spark()
+        metricas = metadata['metricas']
+        ventana = metadata['ventana_entrenamiento']
         
         return {
             "comparacion": {
-                "prophet": {
-                    "rmse": round(results['prophet']['rmse'], 2),
-                    "mae": round(results['prophet']['mae'], 2)
-                },
-                "arima": {
-                    "rmse": round(results['arima']['rmse'], 2),
-                    "mae": round(results['arima']['mae'], 2)
+                nombre: {
+                    "rmse": round(metrica['rmse'], 2),
+                    "mae": round(metrica['mae'], 2),
+                    "tiempo_entrenamiento": round(metrica['tiempo'], 2) if 'tiempo' in metrica else None
                 }
+                for nombre, metrica in metricas.items()
             },
-            "mejor_modelo": results['best_model'],
+            "mejor_modelo": metadata['best_model'],
+            "tiempo_comparacion": round(metadata['tiempo_comparacion'], 2) if metadata.get('tiempo_comparacion') else None,
             "datos_utilizados": {
-                "periodos": len(time_series_data),
-                "fecha_inicio": time_series_data['ds'].min().strftime('%Y-%m-%d'),
-                "fecha_fin": time_series_data['ds'].max().strftime('%Y-%m-%d')
-            }
+                "periodos": ventana['dias'],
+                "fecha_inicio": ventana['inicio'],
+                "fecha_fin": ventana['fin']
+            },
+            "version_modelo": metadata['version'],
+            "reentrenamiento": reentrenamiento
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error comparando modelos: {str(e)}")
 
-@router.get("/forecast/history")
-async def get_forecast_history():
-    """Obtiene historial de predicciones vs valores reales"""
+@router.get("/forecast/hierarchical")
+async def get_hierarchical_forecast(
+    nivel: Optional[str] = Query(None, description="Nivel: total, categoria, producto, ciudad"),
+    metodo: str = Query("bottom_up", description="Reconciliación: bottom_up, top_down"),
+    periods: int = Query(7, description="Número de días a predecir", ge=1, le=30),
+    limit: int = Query(50, description="Número de series a retornar", ge=1, le=500),
+    offset: int = Query(0, description="Posición de la primera serie", ge=0)
+):
+    """Predicciones por categoría, producto y ciudad reconciliadas con el total"""
+    if nivel is not None and nivel not in NIVELES:
+        raise HTTPException(status_code=400, detail=f"Nivel no válido. Disponibles: {', '.join(NIVELES)}")
+    if metodo not in METODOS:
+        raise HTTPException(status_code=400, detail=f"Método no válido. Disponibles: {', '.join(METODOS)}")
+    
     try:
-        # Cargar datos
-        data_generator = DataGenerator()
-        productos_df, clientes_df, ventas_df = data_generator.load_data()
+        # Miles de ajustes: se calculan en la cola de trabajos una vez por versión de datos
+        forecaster = versioned_cache.get(f"forecast_jerarquico_{metodo}")
+        if forecaster is None:
+            job = get_job_queue().submit("forecast_hierarchical", {"metodo": metodo})
+            raise HTTPException(
+                status_code=503,
+                detail=f"Forecast jerárquico en cálculo, consulte /api/v1/jobs/{job['id']}"
+            )
+        
+        total_series, series = forecaster.page(nivel, periods, offset, limit)
+        rendimiento = forecaster.rendimiento
         
-        # Obtener datos combinados
-        df_completo = data_generator.get_combined_data()
-        
-        # Inicializar forecaster
-        forecaster = SalesForecaster()
+        return {
+            "series": series,
+            "paginacion": {
+                "total_series": total_series,
+                "offset": offset,
+                "limit": limit
+            },
+            "metodo": metodo,
+            "rendimiento": {
+                "series_ajustadas": rendimiento['series_ajustadas'],
+                "segundos": round(rendimiento['segundos'], 2),
+                "series_por_segundo": round(rendimiento['series_por_segundo'], 1) if rendimiento['series_por_segundo'] else None
+            }
+        }
         
-        # Preparar datos
-        time_series_data = forecaster.prepare_time_series_data(df_completo)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en forecast jerárquico: {str(e)}")
+
+@router.get("/forecast/backtest")
+async def get_forecast_backtest():
+    """Backtesting con origen móvil de los modelos candidatos
+
+    Se calcula en cada reentrenamiento y se guarda con el modelo registrado; para
+    otras configuraciones (ventana deslizante, más cortes) encolar un trabajo
+    ``forecast_backtest`` en /jobs.
+    """
+    try:
+        forecaster, reentrenamiento = _cargar_forecaster()
+        resultado = forecaster.metadata.get('backtest')
         
-        # Dividir datos para evaluación
-        test_size = 30
-        train_data = time_series_data.iloc[:-test_size]
-        test_data = time_series_data.iloc[-test_size:]
+        # Modelo registrado antes de incorporar el backtesting
+        if not resultado:
+            job = get_job_queue().submit("forecast_train", {"model_type": "auto", "granularity": "D"})
+            raise HTTPException(
+                status_code=503,
+                detail=f"Backtesting en curso, consulte /api/v1/jobs/{job['id']}"
+            )
         
-        # Cargar o entrenar modelo
-        try:
-            forecaster.load_models()
-        except:
-            forecaster.compare_models(time_series_data)
+        return {
+            "modelos": resultado['modelos'],
+            "configuracion": resultado['configuracion'],
+            "tiempo_backtesting": round(resultado['tiempo'], 2),
+            "ajustes_reutilizados": resultado['ajustes_cacheados'],
+            "version_modelo": forecaster.model_version,
+            "reentrenamiento": reentrenamiento
+        }
         
-        # Generar predicciones para el período de prueba
-        if forecaster.best_model == "prophet":
-            forecast = forecaster.prophet_model.predict(test_data[['ds']])
-            predictions = forecast['yhat'].values
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obteniendo backtesting: {str(e)}")
+
+def _calcular_historial(forecaster, time_series_data, test_size=None):
+    """Predicciones del modelo sobre los últimos ``test_size`` periodos frente a los valores reales"""
+    test_size = test_size or GRANULARIDADES[forecaster.granularidad]['prueba']
+    train_data = time_series_data.iloc[:-test_size]
+    test_data = time_series_data.iloc[-test_size:]
+    
+    # Generar predicciones para el período de prueba
+    if forecaster.best_model == "prophet":
+        forecast = forecaster.prophet_model.predict(test_data[['ds']])
+        predictions = forecast['yhat'].values
+    elif forecaster.best_model in BASELINES:
+        m = seasonal_period(len(train_data), forecaster.granularidad)
+        predictions = BaselineForecaster(forecaster.best_model, m).fit(train_data['y'].values).forecast(test_size)
+    else:
+        if forecaster.arima_model:
+            predictions = forecaster.arima_model.forecast(steps=test_size)
         else:
-            if forecaster.arima_model:
-                predictions = forecaster.arima_model.forecast(steps=test_size)
-            else:
-                predictions = [0] * test_size
-        
-        # Preparar datos de respuesta
-        actual_values = test_data['y'].values
-        dates = test_data['ds'].dt.strftime('%Y-%m-%d').values
+            predictions = [0] * test_size
+    
+    # Preparar datos de respuesta
+    actual_values = test_data['y'].values
+    dates = test_data['ds'].dt.strftime('%Y-%m-%d').values
+    
+    history_data = []
+    for i, (date, actual, pred) in enumerate(zip(dates, actual_values, predictions)):
+        history_data.append({
+            "fecha": date,
+            "valor_real": round(actual, 2),
+            "prediccion": round(max(0, pred), 2),
+            "error": round(abs(actual - pred), 2),
+            "error_porcentual": round(abs(actual - pred) / actual * 100, 2) if actual > 0 else 0
+        })
+    
+    return {
+        "historial": history_data,
+        "metricas": {
+            "rmse": round(((actual_values - predictions) ** 2).mean() ** 0.5, 2),
+            "mae": round(abs(actual_values - predictions).mean(), 2),
+            "mape": round(abs(actual_values - predictions) / actual_values * 100, 2).mean()
+        },
+        "periodo_evaluacion": {
+            "inicio": dates[0],
+            "fin": dates[-1],
+            "dias": len(dates)
+        }
+    }
+
+@router.get("/forecast/history")
+async def get_forecast_history(
+    granularity: str = Query("D", description="Granularidad: D (días), W (semanas), M (meses)")
+):
+    """Obtiene historial de predicciones vs valores reales"""
+    _validar_granularidad(granularity)
+    
+    try:
+        # Último modelo válido (el reentrenamiento, si hace falta, va en segundo plano)
+        forecaster, reentrenamiento = _cargar_forecaster(granularidad=granularity)
         
-        history_data = []
-        for i, (date, actual, pred) in enumerate(zip(dates, actual_values, predictions)):
-            history_data.append({
-                "fecha": date,
-                "valor_real": round(actual, 2),
-                "prediccion": round(max(0, pred), 2),
-                "error": round(abs(actual - pred), 2),
-                "error_porcentual": round(abs(actual - pred) / actual * 100, 2) if actual > 0 else 0
-            })
+        # Serie de la versión de datos actual (diaria agregada en Spark y cacheada, remuestreada)
+        time_series_data = get_series(granularity)
         
-        # Detener Spark
-        data_generator.stop_spark()
+        # Historial y métricas del periodo de prueba, cacheados por versión de modelo
+        historial = cached_history(
+            forecaster, lambda: _calcular_historial(forecaster, time_series_data), granularity
+        )
         
         return {
-            "historial": history_data,
-            "metricas": {
-                "rmse": round(((actual_values - predictions) ** 2).mean() ** 0.5, 2),
-                "mae": round(abs(actual_values - predictions).mean(), 2),
-                "mape": round(abs(actual_values - predictions) / actual_values * 100, 2).mean()
-            },
+            **historial,
             "modelo_utilizado": forecaster.best_model,
-            "periodo_evaluacion": {
-                "inicio": dates[0],
-                "fin": dates[-1],
-                "dias": len(dates)
-            }
+            "version_modelo": forecaster.model_version,
+            "reentrenamiento": reentrenamiento
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo historial: {str(e)}")
 
@@ -283,66 +383,81 @@ async def get_forecast_history():
 async def get_sales_trends():
     """Obtiene tendencias y patrones de ventas"""
     try:
-        # Cargar datos
-        data_generator = DataGenerator()
-        productos_df, clientes_df, ventas_df = data_generator.load_data()
-        
-        # Obtener datos combinados
-        df_completo = data_generator.get_combined_data()
-        df_pandas = df_completo.toPandas()
-        
-        # Análisis de tendencias
-        ventas_diarias = df_pandas.groupby('fecha').agg({
-            'total': 'sum',
-            'cantidad': 'sum',
-            'venta_id': 'count'
-        }).reset_index()
-        
-        # Tendencia general
-        ventas_diarias['fecha_num'] = (ventas_diarias['fecha'] - ventas_diarias['fecha'].min()).dt.days
-        correlation = ventas_diarias['fecha_num'].corr(ventas_diarias['total'])
-        
-        # Estacionalidad semanal
-        ventas_diarias['dia_semana'] = ventas_diarias['fecha'].dt.dayofweek
-        estacionalidad_semanal = ventas_diarias.groupby('dia_semana')['total'].mean()
+        # Perfil calculado una vez por versión de datos sobre la serie diaria cacheada
+        return versioned_cache.get_or_compute(
+            "perfil_estacionalidad",
+            lambda: seasonality_profile(get_series())
+        )
         
-        # Estacionalidad mensual
-        ventas_diarias['mes'] = ventas_diarias['fecha'].dt.month
-        estacionalidad_mensual = ventas_diarias.groupby('mes')['total'].mean()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error analizando tendencias: {str(e)}")
+
+
+# Series de cada nivel de detección de anomalías (columna de agrupación; None para el total)
+NIVELES_ANOMALIAS = {'total': None, 'categoria': 'categoria', 'producto': 'product_id', 'ciudad': 'ciudad'}
+
+def _actualizar_monitor(nivel):
+    """Actualiza el monitor de anomalías de un nivel con los días que aún no ha visto"""
+    columna = NIVELES_ANOMALIAS[nivel]
+    if columna is None:
+        matriz = get_series().set_index('ds')[['y']].rename(columns={'y': 'total'})
+    else:
+        matriz = get_daily_matrix(columna)
+    
+    # El estado del detector sobrevive entre versiones de datos: solo se procesan los días nuevos
+    ruta = os.path.join(CACHE_DIR, f"anomalias_{nivel}.pkl")
+    monitor = joblib.load(ruta) if os.path.exists(ruta) else AnomalyMonitor()
+    monitor.update(matriz)
+    
+    dump_atomic(monitor, ruta)
+    return monitor
+
+@router.get("/forecast/anomalies")
+async def get_sales_anomalies(
+    nivel: str = Query("total", description="Series a vigilar: total, categoria, producto, ciudad"),
+    dias: int = Query(30, description="Días recientes a revisar", ge=1, le=365),
+    limit: int = Query(100, description="Número máximo de anomalías a retornar", ge=1, le=1000)
+):
+    """Días con ventas anómalas respecto a la referencia de su día de la semana"""
+    if nivel not in NIVELES_ANOMALIAS:
+        raise HTTPException(status_code=400, detail=f"Nivel no válido. Disponibles: {', '.join(NIVELES_ANOMALIAS)}")
+    
+    try:
+        # Una actualización incremental por versión de datos
+        monitor = versioned_cache.get_or_compute(
+            f"anomalias_{nivel}", lambda: _actualizar_monitor(nivel), persistir=False
+        )
         
-        # Detener Spark
-        data_generator.stop_spark()
+        ultima_fecha = monitor.inicio + pd.Timedelta(days=monitor.dias - 1)
+        desde = (ultima_fecha - pd.Timedelta(days=dias - 1)).strftime('%Y-%m-%d')
+        anomalias = monitor.recent(desde, limit)
         
         return {
-            "tendencia_general": {
-                "correlacion_tiempo": round(correlation, 3),
-                "direccion": "creciente" if correlation > 0 else "decreciente" if correlation < 0 else "estable"
-            },
-            "estacionalidad_semanal": [
-                {
-                    "dia": ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"][i],
-                    "ventas_promedio": round(val, 2)
-                }
-                for i, val in estacionalidad_semanal.items()
-            ],
-            "estacionalidad_mensual": [
-                {
-                    "mes": ["Ene", "Feb", "Mar", "Abr", "May", "Jun", 
-                           "Jul", "Ago", "Sep", "Oct", "Nov", "Dic"][i-1],
-                    "ventas_promedio": round(val, 2)
-                }
-                for i, val in estacionalidad_mensual.items()
+            "anomalias": [
+                {**anomalia, "valor": round(anomalia['valor'], 2), "esperado": round(anomalia['esperado'], 2), "z": round(anomalia['z'], 2)}
+                for anomalia in anomalias
             ],
-            "patrones": {
-                "mejor_dia": ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"][estacionalidad_semanal.idxmax()],
-                "peor_dia": ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"][estacionalidad_semanal.idxmin()],
-                "mejor_mes": ["Ene", "Feb", "Mar", "Abr", "May", "Jun", 
-                             "Jul", "Ago", "Sep", "Oct", "Nov", "Dic"][estacionalidad_mensual.idxmax()-1],
-                "peor_mes": ["Ene", "Feb", "Mar", "Abr", "May", "Jun", 
-                            "Jul", "Ago", "Sep", "Oct", "Nov", "Dic"][estacionalidad_mensual.idxmin()-1]
+            "nivel": nivel,
+            "periodo": {
+                "inicio": desde,
+                "fin": ultima_fecha.strftime('%Y-%m-%d'),
+                "dias": dias
+            },
+            "resumen": {
+                "series": len(monitor.series),
+                "dias_procesados": monitor.dias,
+                "dias_nuevos": monitor.dias_nuevos,
+                "anomalias_periodo": len(monitor.recent(desde)),
+                "anomalias_totales": len(monitor.anomalias)
+            },
+            "parametros": {
+                "alpha": monitor.detector.alpha,
+                "umbral": monitor.detector.umbral,
+                "calentamiento": monitor.detector.calentamiento
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error analizando tendencias: {str(e)}")
-
+        raise HTTPException(status_code=500, detail=f"Error detectando anomalías: {str(e)}")
@@ -0,0 +1,38 @@
+"""
+⏳ Endpoint de Trabajos
+Entrenamientos en segundo plano con consulta de estado
+"""
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from typing import Dict
+
+from app.utils.jobs import get_job_queue, TAREAS
+
+router = APIRouter()
+
+class JobRequest(BaseModel):
+    """Request para encolar un trabajo"""
+    tipo: str  # forecast_train, recommendations_train, recommendations_batch
+    parametros: Dict = {}
+
+@router.post("/jobs", status_code=202)
+async def submit_job(request: JobRequest):
+    """Encola un trabajo (o devuelve el idéntico que ya está pendiente)"""
+    if request.tipo not in TAREAS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Tipo de trabajo no válido. Disponibles: {', '.join(TAREAS)}"
+        )
+    
+    return get_job_queue().submit(request.tipo, request.parametros)
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Estado y resultado de un trabajo"""
+    job = get_job_queue().get(job_id)
+    
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    
+    return job
@@ -4,13 +4,20 @@ Sistema híbrido de recomendaciones colaborativo + content-based
 """
 
 from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel
-from typing import Dict, List, Optional
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
+import json
 import pandas as pd
 from datetime import datetime
+from pyspark.sql import functions as F
 
 from app.utils.data_generator import DataGenerator
-from app.ml.recommendations import RecommendationSystem
+from app.ml.recommendations import get_recommendation_service
+from app.ml.registry import ModelNotFoundError
+from app.utils.jobs import get_job_queue
+from app.utils.data_version import get_data_version
+from app.utils.distinct_rollups import get_distinct_rollups
 
 router = APIRouter()
 
@@ -22,6 +29,7 @@ class RecommendationResponse(BaseModel):
     precio: float
     score: float
     tipo_recomendacion: str
+    version_modelo: Optional[str] = None
 
 class SimilarProductResponse(BaseModel):
     """Respuesta del endpoint de productos similares"""
@@ -30,6 +38,32 @@ class SimilarProductResponse(BaseModel):
     categoria: str
     precio: float
     similitud: float
+    version_modelo: Optional[str] = None
+
+class BatchRecommendationRequest(BaseModel):
+    """Request de recomendaciones para muchos clientes"""
+    customer_ids: Optional[List[str]] = None  # todos los clientes si no se indica
+    limit: int = Field(10, description="Recomendaciones por cliente", ge=1, le=50)
+
+def _cargar_sistema():
+    """Sistema compartido en memoria; si no hay modelos encola su entrenamiento en segundo plano
+
+    Si los datos cambiaron desde el último entrenamiento también se encola (la
+    cola no duplica un trabajo activo) y se sigue sirviendo el modelo anterior
+    hasta que se publique el nuevo.
+    """
+    service = get_recommendation_service()
+    if service.is_stale(get_data_version()):
+        get_job_queue().submit("recommendations_train")
+
+    try:
+        return service.get()
+    except ModelNotFoundError:
+        job = get_job_queue().submit("recommendations_train")
+        raise HTTPException(
+            status_code=503,
+            detail=f"Modelos de recomendaciones en entrenamiento, consulte /api/v1/jobs/{job['id']}"
+        )
 
 @router.get("/recommendations/{customer_id}", response_model=List[RecommendationResponse])
 async def get_customer_recommendations(
@@ -39,25 +73,8 @@ async def get_customer_recommendations(
 ):
     """Obtiene recomendaciones personalizadas para un cliente"""
     try:
-        # Cargar datos
-        data_generator = DataGenerator()
-        productos_df, clientes_df, ventas_df = data_generator.load_data()
-        
-        # Obtener datos combinados
-        df_completo = data_generator.get_combined_data()
-        
-        # Inicializar sistema de recomendaciones
-        rec_system = RecommendationSystem()
-        
-        # Intentar cargar modelos existentes
-        try:
-            rec_system.load_models()
-            print("✅ Modelos de recomendaciones cargados")
-        except:
-            print("🔄 Entrenando nuevos modelos de recomendaciones...")
-            # Entrenar modelo híbrido
-            rec_system.train_hybrid_model(df_completo, productos_df)
-            rec_system.save_models()
+        # Sistema en memoria (el entrenamiento va en la cola de trabajos)
+        rec_system = _cargar_sistema()
         
         # Obtener recomendaciones según tipo
         if recommendation_type == "hybrid":
@@ -75,26 +92,19 @@ async def get_customer_recommendations(
         if status != "Éxito":
             raise HTTPException(status_code=404, detail=status)
         
-        # Obtener información de productos
-        productos_pandas = productos_df.toPandas()
-        
-        # Detener Spark
-        data_generator.stop_spark()
-        
-        # Convertir a formato de respuesta
+        # Convertir a formato de respuesta (catálogo de la misma versión del modelo)
         response = []
         for product_id, score in recommendations:
-            # Buscar información del producto
-            producto_info = productos_pandas[productos_pandas['product_id'] == product_id]
-            if not producto_info.empty:
-                producto = producto_info.iloc[0]
+            producto = rec_system.get_product_info(product_id)
+            if producto is not None:
                 response.append(RecommendationResponse(
                     product_id=product_id,
                     nombre=producto['nombre'],
                     categoria=producto['categoria'],
                     precio=round(producto['precio'], 2),
                     score=round(score, 3),
-                    tipo_recomendacion=tipo
+                    tipo_recomendacion=tipo,
+                    version_modelo=rec_system.model_version
                 ))
         
         return response
@@ -104,6 +114,28 @@ async def get_customer_recommendations(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo recomendaciones: {str(e)}")
 
+@router.post("/recommendations:batch")
+async def get_batch_recommendations(request: BatchRecommendationRequest):
+    """Top-N collaborative para muchos clientes, en streaming NDJSON (una línea por cliente)"""
+    # Sistema en memoria (el entrenamiento va en la cola de trabajos)
+    rec_system = _cargar_sistema()
+    if rec_system.collaborative_model is None:
+        raise HTTPException(status_code=503, detail="Modelo collaborative no disponible")
+    
+    def lineas():
+        for customer_id, recomendaciones in rec_system.recommend_batch(request.customer_ids, request.limit):
+            linea = {"customer_id": customer_id, "version_modelo": rec_system.model_version}
+            if recomendaciones is None:
+                linea["error"] = "Cliente no encontrado"
+            else:
+                linea["recomendaciones"] = [
+                    {"product_id": product_id, "score": round(score, 3)}
+                    for product_id, score in recomendaciones
+                ]
+            yield json.dumps(linea, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(lineas(), media_type="application/x-ndjson")
+
 @router.get("/recommendations/products/{product_id}/similar", response_model=List[SimilarProductResponse])
 async def get_similar_products(
     product_id: str,
@@ -111,23 +143,8 @@ async def get_similar_products(
 ):
     """Obtiene productos similares a uno dado"""
     try:
-        # Cargar datos
-        data_generator = DataGenerator()
-        productos_df, clientes_df, ventas_df = data_generator.load_data()
-        
-        # Obtener datos combinados
-        df_completo = data_generator.get_combined_data()
-        
-        # Inicializar sistema de recomendaciones
-        rec_system = RecommendationSystem()
-        
-        # Cargar modelos existentes
-        try:
-            rec_system.load_models()
-        except:
-            # Entrenar modelo si no existe
-            rec_system.train_hybrid_model(df_completo, productos_df)
-            rec_system.save_models()
+        # Sistema en memoria (el entrenamiento va en la cola de trabajos)
+        rec_system = _cargar_sistema()
         
         # Obtener productos similares
         similar_products, status = rec_system.get_similar_products(product_id, limit)
@@ -135,25 +152,18 @@ async def get_similar_products(
         if status != "Éxito":
             raise HTTPException(status_code=404, detail=status)
         
-        # Obtener información de productos
-        productos_pandas = productos_df.toPandas()
-        
-        # Detener Spark
-        data_generator.stop_spark()
-        
-        # Convertir a formato de respuesta
+        # Convertir a formato de respuesta (catálogo de la misma versión del modelo)
         response = []
         for similar_product_id, similarity in similar_products:
-            # Buscar información del producto
-            producto_info = productos_pandas[productos_pandas['product_id'] == similar_product_id]
-            if not producto_info.empty:
-                producto = producto_info.iloc[0]
+            producto = rec_system.get_product_info(similar_product_id)
+            if producto is not None:
                 response.append(SimilarProductResponse(
                     product_id=similar_product_id,
                     nombre=producto['nombre'],
                     categoria=producto['categoria'],
                     precio=round(producto['precio'], 2),
-                    similitud=round(similarity, 3)
+                    similitud=round(similarity, 3),
+                    version_modelo=rec_system.model_version
                 ))
         
         return response
@@ -167,30 +177,12 @@ async def get_similar_products(
 async def get_recommendation_system_stats():
     """Obtiene estadísticas del sistema de recomendaciones"""
     try:
-        # Cargar datos
-        data_generator = DataGenerator()
-        productos_df, clientes_df, ventas_df = data_generator.load_data()
-        
-        # Obtener datos combinados
-        df_completo = data_generator.get_combined_data()
-        
-        # Inicializar sistema de recomendaciones
-        rec_system = RecommendationSystem()
-        
-        # Cargar modelos existentes
-        try:
-            rec_system.load_models()
-        except:
-            # Entrenar modelo si no existe
-            rec_system.train_hybrid_model(df_completo, productos_df)
-            rec_system.save_models()
+        # Sistema en memoria (el entrenamiento va en la cola de trabajos)
+        rec_system = _cargar_sistema()
         
         # Obtener estadísticas
         stats = rec_system.get_system_stats()
         
-        # Detener Spark
-        data_generator.stop_spark()
-        
         if stats:
             return {
                 "estadisticas_sistema": {
@@ -198,12 +190,19 @@ async def get_recommendation_system_stats():
                     "num_productos": stats['num_products'],
                     "densidad_matriz": round(stats['matrix_density'] * 100, 2),
                     "ratings_promedio_usuario": round(stats['avg_ratings_per_user'], 2),
-                    "ratings_promedio_producto": round(stats['avg_ratings_per_product'], 2)
+                    "ratings_promedio_producto": round(stats['avg_ratings_per_product'], 2),
+                    "memoria_matriz_mb": round(stats['matrix_bytes'] / 1e6, 3),
+                    "memoria_matriz_densa_mb": round(stats['dense_matrix_bytes'] / 1e6, 3)
                 },
                 "configuracion": {
                     "pesos_hibridos": rec_system.hybrid_weights,
                     "modelo_principal": "Híbrido (Collaborative + Content-Based)"
                 },
+                "servicio": {
+                    "listo": get_recommendation_service().ready,
+                    "cargado": get_recommendation_service().cargado.isoformat()
+                },
+                "version_modelo": rec_system.model_version,
                 "ultima_actualizacion": datetime.now().isoformat()
             }
         else:
@@ -213,9 +212,12 @@ async def get_recommendation_system_stats():
                     "pesos_hibridos": rec_system.hybrid_weights,
                     "modelo_principal": "Híbrido (Collaborative + Content-Based)"
                 },
+                "version_modelo": rec_system.model_version,
                 "ultima_actualizacion": datetime.now().isoformat()
             }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo estadísticas: {str(e)}")
 
@@ -223,30 +225,12 @@ async def get_recommendation_system_stats():
 async def evaluate_recommendation_system():
     """Evalúa la calidad del sistema de recomendaciones"""
     try:
-        # Cargar datos
-        data_generator = DataGenerator()
-        productos_df, clientes_df, ventas_df = data_generator.load_data()
-        
-        # Obtener datos combinados
-        df_completo = data_generator.get_combined_data()
-        
-        # Inicializar sistema de recomendaciones
-        rec_system = RecommendationSystem()
-        
-        # Cargar modelos existentes
-        try:
-            rec_system.load_models()
-        except:
-            # Entrenar modelo si no existe
-            rec_system.train_hybrid_model(df_completo, productos_df)
-            rec_system.save_models()
+        # Sistema en memoria (el entrenamiento va en la cola de trabajos)
+        rec_system = _cargar_sistema()
         
         # Evaluar sistema
         evaluation = rec_system.evaluate_recommendations(n_test=50)
         
-        # Detener Spark
-        data_generator.stop_spark()
-        
         return {
             "evaluacion_modelos": {
                 "collaborative": {
@@ -265,6 +249,7 @@ async def evaluate_recommendation_system():
                     "f1_score": round(evaluation['hybrid']['f1_score'], 3)
                 }
             },
+            "version_modelo": rec_system.model_version,
             "mejor_modelo": max(evaluation.items(), key=lambda x: x[1]['f1_score'])[0],
             "resumen_evaluacion": {
                 "total_usuarios_evaluados": 50,
@@ -273,34 +258,44 @@ async def evaluate_recommendation_system():
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error evaluando sistema: {str(e)}")
 
 @router.get("/recommendations/popular")
 async def get_popular_recommendations(
     limit: int = Query(10, description="Número de productos populares", ge=1, le=50),
-    category: Optional[str] = Query(None, description="Filtrar por categoría")
+    category: Optional[str] = Query(None, description="Filtrar por categoría"),
+    aproximado: bool = Query(False, description="Conteo aproximado de clientes únicos (HyperLogLog)")
 ):
     """Obtiene productos populares basados en ventas"""
     try:
+        # Sketches de clientes distintos (antes de abrir la sesión de Spark del endpoint)
+        rollups = get_distinct_rollups() if aproximado else None
+        
         # Cargar datos
         data_generator = DataGenerator()
         productos_df, clientes_df, ventas_df = data_generator.load_data()
         
         # Obtener datos combinados
         df_completo = data_generator.get_combined_data()
-        df_pandas = df_completo.toPandas()
         
         # Filtrar por categoría si se especifica
         if category:
-            df_pandas = df_pandas[df_pandas['categoria'] == category]
+            df_completo = df_completo.filter(F.col('categoria') == category)
         
-        # Calcular popularidad basada en ventas
-        popular_products = df_pandas.groupby(['product_id', 'nombre', 'categoria', 'precio']).agg({
-            'total': 'sum',
-            'cantidad': 'sum',
-            'customer_id': 'nunique'
-        }).reset_index()
+        # Calcular popularidad basada en ventas (agregada en Spark: solo se trae una fila por producto)
+        agregaciones = [F.sum('total').alias('total'), F.sum('cantidad').alias('cantidad')]
+        if not rollups:
+            agregaciones.append(F.countDistinct('customer_id').alias('customer_id'))
+        popular_products = df_completo.groupBy('product_id', 'nombre', 'categoria', 'precio').agg(*agregaciones).toPandas()
+        
+        if rollups:
+            rollup_productos = rollups['producto']
+            mascara = (rollup_productos.celdas['categoria'] == category) if category else None
+            clientes_unicos = rollup_productos.count_by('product_id', mascara).round()
+            popular_products['customer_id'] = popular_products['product_id'].map(clientes_unicos).fillna(0)
         
         # Calcular score de popularidad
         popular_products['popularity_score'] = (
@@ -329,12 +324,17 @@ async def get_popular_recommendations(
                 "popularity_score": round(row['popularity_score'], 2)
             })
         
-        return {
+        resultado = {
             "productos_populares": response,
             "categoria_filtro": category,
             "total_productos": len(response)
         }
         
+        if rollups:
+            resultado["error_relativo_clientes"] = round(rollups['producto'].relative_error, 4)
+        
+        return resultado
+        
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo productos populares: {str(e)}")
 
@@ -3,17 +3,29 @@
 Proporciona métricas clave del negocio
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from typing import Dict, List, Optional
 import pandas as pd
 from datetime import datetime, timedelta
+from pyspark.sql import functions as F
 
 from app.utils.data_generator import DataGenerator
-from app.utils.database import get_spark_session
+from app.utils.distinct_rollups import get_distinct_rollups, get_ticket_sketch
 
 router = APIRouter()
 
+def _agregar(df, por, columnas):
+    """Agrega en Spark y trae a pandas solo el resultado (una fila por grupo)
+
+    ``columnas`` asocia cada nombre de columna de salida con su expresión de agregación.
+    """
+    return df.groupBy(*por).agg(*[expr.alias(nombre) for nombre, expr in columnas.items()]).toPandas()
+
+def _clientes_distintos(rollups):
+    """Agregación de clientes distintos en Spark (vacía si se estiman con los rollups HLL)"""
+    return {} if rollups else {'customer_id': F.countDistinct('customer_id')}
+
 class SummaryResponse(BaseModel):
     """Respuesta del endpoint de resumen"""
     total_ventas: float
@@ -27,34 +39,47 @@ class SummaryResponse(BaseModel):
     top_ciudades: List[Dict]
     canales_venta: List[Dict]
     ultima_actualizacion: str
+    error_relativo_clientes: Optional[float] = None
 
 @router.get("/summary", response_model=SummaryResponse)
-async def get_summary():
+async def get_summary(
+    aproximado: bool = Query(False, description="Conteo aproximado de clientes distintos (HyperLogLog)")
+):
     """Obtiene resumen general del negocio"""
     try:
+        # Sketches de clientes distintos (antes de abrir la sesión de Spark del endpoint)
+        rollups = get_distinct_rollups() if aproximado else None
+        
         # Cargar datos
         data_generator = DataGenerator()
         productos_df, clientes_df, ventas_df = data_generator.load_data()
         
-        # Obtener datos combinados
+        # Obtener datos combinados (se agregan en Spark: solo se traen los resultados)
         df_completo = data_generator.get_combined_data()
         
-        # Convertir a pandas para análisis
-        df_pandas = df_completo.toPandas()
-        
         # Métricas principales
-        total_ventas = df_pandas['total'].sum()
-        total_margen = df_pandas['margen'].sum()
+        totales = df_completo.agg(
+            F.sum('total').alias('total'),
+            F.sum('margen').alias('margen'),
+            F.avg('total').alias('ticket'),
+            F.countDistinct('product_id').alias('productos'),
+            *[expr.alias(nombre) for nombre, expr in _clientes_distintos(rollups).items()]
+        ).first()
+        total_ventas = totales['total']
+        total_margen = totales['margen']
         margen_porcentaje = (total_margen / total_ventas) * 100
-        num_clientes = df_pandas['customer_id'].nunique()
-        num_productos = df_pandas['product_id'].nunique()
-        ticket_promedio = df_pandas['total'].mean()
+        if rollups:
+            num_clientes = int(round(rollups['ciudad'].count()))
+        else:
+            num_clientes = int(totales['customer_id'])
+        num_productos = int(totales['productos'])
+        ticket_promedio = totales['ticket']
         
         # Ventas mensuales (últimos 6 meses)
-        ventas_mensuales = df_pandas.groupby(['año', 'mes']).agg({
-            'total': 'sum',
-            'venta_id': 'count'
-        }).reset_index()
+        ventas_mensuales = _agregar(df_completo, ['año', 'mes'], {
+            'total': F.sum('total'),
+            'venta_id': F.count('venta_id')
+        })
         
         # Ordenar por fecha y obtener últimos 6 meses
         ventas_mensuales['fecha'] = pd.to_datetime(
@@ -72,11 +97,11 @@ async def get_summary():
             })
         
         # Top categorías
-        top_categorias = df_pandas.groupby('categoria').agg({
-            'total': 'sum',
-            'margen': 'sum',
-            'cantidad': 'sum'
-        }).sort_values('total', ascending=False).head(5)
+        top_categorias = _agregar(df_completo, ['categoria'], {
+            'total': F.sum('total'),
+            'margen': F.sum('margen'),
+            'cantidad': F.sum('cantidad')
+        }).set_index('categoria').sort_values('total', ascending=False).head(5)
         
         top_categorias_list = []
         for categoria, row in top_categorias.iterrows():
@@ -88,10 +113,13 @@ async def get_summary():
             })
         
         # Top ciudades
-        top_ciudades = df_pandas.groupby('ciudad').agg({
-            'total': 'sum',
-            'customer_id': 'nunique'
-        }).sort_values('total', ascending=False).head(5)
+        top_ciudades = _agregar(df_completo, ['ciudad'], {
+            'total': F.sum('total'),
+            **_clientes_distintos(rollups)
+        }).set_index('ciudad')
+        if rollups:
+            top_ciudades['customer_id'] = rollups['ciudad'].count_by('ciudad').round()
+        top_ciudades = top_ciudades.sort_values('total', ascending=False).head(5)
         
         top_ciudades_list = []
         for ciudad, row in top_ciudades.iterrows():
@@ -102,10 +130,10 @@ async def get_summary():
             })
         
         # Canales de venta
-        canales_venta = df_pandas.groupby('canal').agg({
-            'total': 'sum',
-            'venta_id': 'count'
-        }).sort_values('total', ascending=False)
+        canales_venta = _agregar(df_completo, ['canal'], {
+            'total': F.sum('total'),
+            'venta_id': F.count('venta_id')
+        }).set_index('canal').sort_values('total', ascending=False)
         
         canales_venta_list = []
         for canal, row in canales_venta.iterrows():
@@ -129,32 +157,47 @@ async def get_summary():
             top_categorias=top_categorias_list,
             top_ciudades=top_ciudades_list,
             canales_venta=canales_venta_list,
-            ultima_actualizacion=datetime.now().isoformat()
+            ultima_actualizacion=datetime.now().isoformat(),
+            error_relativo_clientes=round(rollups['ciudad'].relative_error, 4) if rollups else None
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo resumen: {str(e)}")
 
 @router.get("/summary/metrics")
-async def get_key_metrics():
+async def get_key_metrics(
+    aproximado: bool = Query(False, description="Conteo aproximado de clientes distintos (HyperLogLog)")
+):
     """Obtiene métricas clave en formato simplificado"""
     try:
+        # Sketches de ventas (antes de abrir la sesión de Spark del endpoint)
+        rollups = get_distinct_rollups() if aproximado else None
+        percentiles_ticket = get_ticket_sketch().quantiles([0.5, 0.9, 0.99])
+        
         # Cargar datos
         data_generator = DataGenerator()
         productos_df, clientes_df, ventas_df = data_generator.load_data()
         
-        # Obtener datos combinados
+        # Obtener datos combinados (se agregan en Spark: solo se traen los resultados)
         df_completo = data_generator.get_combined_data()
-        df_pandas = df_completo.toPandas()
         
         # Calcular métricas
-        total_ventas = df_pandas['total'].sum()
-        total_margen = df_pandas['margen'].sum()
-        num_clientes = df_pandas['customer_id'].nunique()
-        ticket_promedio = df_pandas['total'].mean()
+        totales = df_completo.agg(
+            F.sum('total').alias('total'),
+            F.sum('margen').alias('margen'),
+            F.avg('total').alias('ticket'),
+            *[expr.alias(nombre) for nombre, expr in _clientes_distintos(rollups).items()]
+        ).first()
+        total_ventas = totales['total']
+        total_margen = totales['margen']
+        if rollups:
+            num_clientes = int(round(rollups['ciudad'].count()))
+        else:
+            num_clientes = int(totales['customer_id'])
+        ticket_promedio = totales['ticket']
         
         # Crecimiento vs mes anterior
-        ventas_mensuales = df_pandas.groupby(['año', 'mes'])['total'].sum().reset_index()
+        ventas_mensuales = _agregar(df_completo, ['año', 'mes'], {'total': F.sum('total')})
         ventas_mensuales['fecha'] = pd.to_datetime(
             ventas_mensuales['año'].astype(str) + '-' + 
             ventas_mensuales['mes'].astype(str) + '-01'
@@ -171,40 +214,53 @@ async def get_key_metrics():
         # Detener Spark
         data_generator.stop_spark()
         
-        return {
+        metricas = {
             "total_ventas": round(total_ventas, 2),
             "total_margen": round(total_margen, 2),
             "num_clientes": num_clientes,
             "ticket_promedio": round(ticket_promedio, 2),
             "crecimiento_mensual": round(crecimiento, 2),
-            "margen_porcentaje": round((total_margen / total_ventas) * 100, 2)
+            "margen_porcentaje": round((total_margen / total_ventas) * 100, 2),
+            "percentiles_ticket": {
+                "p50": round(percentiles_ticket[0], 2),
+                "p90": round(percentiles_ticket[1], 2),
+                "p99": round(percentiles_ticket[2], 2)
+            }
         }
         
+        if rollups:
+            metricas["error_relativo_clientes"] = round(rollups['ciudad'].relative_error, 4)
+        
+        return metricas
+        
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo métricas: {str(e)}")
 
 @router.get("/summary/dashboard")
-async def get_dashboard_data():
+async def get_dashboard_data(
+    aproximado: bool = Query(False, description="Conteo aproximado de clientes distintos (HyperLogLog)")
+):
     """Obtiene datos para el dashboard principal"""
     try:
+        # Sketches de clientes distintos (antes de abrir la sesión de Spark del endpoint)
+        rollups = get_distinct_rollups() if aproximado else None
+        
         # Cargar datos
         data_generator = DataGenerator()
         productos_df, clientes_df, ventas_df = data_generator.load_data()
         
-        # Obtener datos combinados
+        # Obtener datos combinados (se agregan en Spark: solo se traen los resultados)
         df_completo = data_generator.get_combined_data()
-        df_pandas = df_completo.toPandas()
         
         # Ventas por día (últimos 30 días)
-        fecha_max = df_pandas['fecha'].max()
+        fecha_max = pd.Timestamp(df_completo.agg(F.max('fecha')).first()[0])
         fecha_min = fecha_max - timedelta(days=30)
         
-        ventas_diarias = df_pandas[
-            df_pandas['fecha'] >= fecha_min
-        ].groupby('fecha').agg({
-            'total': 'sum',
-            'venta_id': 'count'
-        }).reset_index()
+        ventas_diarias = _agregar(df_completo.filter(F.col('fecha') >= fecha_min.to_pydatetime()), ['fecha'], {
+            'total': F.sum('total'),
+            'venta_id': F.count('venta_id')
+        })
+        ventas_diarias['fecha'] = pd.to_datetime(ventas_diarias['fecha'])
         
         # Rellenar fechas faltantes
         date_range = pd.date_range(start=fecha_min, end=fecha_max, freq='D')
@@ -220,10 +276,10 @@ async def get_dashboard_data():
             })
         
         # Top productos
-        top_productos = df_pandas.groupby(['product_id', 'nombre']).agg({
-            'total': 'sum',
-            'cantidad': 'sum'
-        }).sort_values('total', ascending=False).head(10)
+        top_productos = df_completo.groupBy('product_id', 'nombre').agg(
+            F.sum('total').alias('total'),
+            F.sum('cantidad').alias('cantidad')
+        ).orderBy(F.desc('total')).limit(10).toPandas().set_index(['product_id', 'nombre'])
         
         top_productos_list = []
         for (product_id, nombre), row in top_productos.iterrows():
@@ -235,10 +291,13 @@ async def get_dashboard_data():
             })
         
         # Distribución por segmento
-        segmentos = df_pandas.groupby('segmento').agg({
-            'total': 'sum',
-            'customer_id': 'nunique'
-        }).sort_values('total', ascending=False)
+        segmentos = _agregar(df_completo, ['segmento'], {
+            'total': F.sum('total'),
+            **_clientes_distintos(rollups)
+        }).set_index('segmento')
+        if rollups:
+            segmentos['customer_id'] = rollups['segmento'].count_by('segmento').round()
+        segmentos = segmentos.sort_values('total', ascending=False)
         
         segmentos_list = []
         for segmento, row in segmentos.iterrows():
@@ -251,7 +310,7 @@ async def get_dashboard_data():
         # Detener Spark
         data_generator.stop_spark()
         
-        return {
+        dashboard = {
             "ventas_diarias": ventas_diarias_list,
             "top_productos": top_productos_list,
             "segmentos": segmentos_list,
@@ -261,6 +320,11 @@ async def get_dashboard_data():
             }
         }
         
+        if rollups:
+            dashboard["error_relativo_clientes"] = round(rollups['segmento'].relative_error, 4)
+        
+        return dashboard
+        
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo datos del dashboard: {str(e)}")
 
@@ -0,0 +1,162 @@
+"""
+🚨 Detección de Anomalías en Ventas
+Detector incremental (EWMA por día de la semana) para muchas series diarias a la vez
+"""
+
+import hashlib
+
+import numpy as np
+
+# Desviación mínima de la referencia: evita z-scores infinitos en referencias constantes
+SIGMA_MINIMA = 0.05
+
+class AnomalyDetector:
+    """Detector de anomalías por z-score sobre una media y varianza exponenciales
+
+    Cada serie mantiene, para cada posición de la temporada (día de la semana con
+    ``m=7``), una media y una varianza con suavizado ``alpha``; un punto es anómalo
+    si se aleja más de ``umbral`` desviaciones de la referencia de su día. Las
+    primeras ``calentamiento`` observaciones de cada día usan la media acumulada y
+    no se evalúan, y las desviaciones que entran en la referencia se recortan al
+    umbral para que una anomalía no la contamine. Cada día nuevo cuesta O(1) por serie.
+    """
+
+    def __init__(self, m=7, alpha=0.05, umbral=3.5, calentamiento=8):
+        self.m = m
+        self.alpha = alpha
+        self.umbral = umbral
+        self.calentamiento = calentamiento
+        self.media = None
+        self.varianza = None
+        self.cuenta = None
+        self.posicion = 0
+
+    def add_series(self, n):
+        """Añade ``n`` series nuevas con estado vacío (empiezan su calentamiento)"""
+        if self.media is None or n == 0:
+            return
+        self.media = np.hstack([self.media, np.zeros((self.m, n))])
+        self.varianza = np.hstack([self.varianza, np.zeros((self.m, n))])
+        self.cuenta = np.hstack([self.cuenta, np.zeros((self.m, n), dtype=int)])
+
+    def update(self, y):
+        """Evalúa e incorpora un día (vector de una observación por serie)
+
+        Devuelve el valor esperado, el z-score y la marca de anomalía de cada serie.
+        """
+        y = np.asarray(y, dtype=float)
+        if self.media is None:
+            self.media = np.zeros((self.m, len(y)))
+            self.varianza = np.zeros((self.m, len(y)))
+            self.cuenta = np.zeros((self.m, len(y)), dtype=int)
+
+        i = self.posicion
+        esperado = self.media[i].copy()
+        sigma = np.sqrt(self.varianza[i])
+        listo = self.cuenta[i] >= self.calentamiento
+
+        # Variación mínima (absoluta y del 1% del valor esperado) para referencias casi constantes
+        escala = np.maximum(sigma, np.maximum(0.01 * np.abs(esperado), SIGMA_MINIMA))
+        desviacion = y - esperado
+        z = np.where(listo, desviacion / escala, 0.0)
+        anomalia = listo & (np.abs(z) > self.umbral)
+
+        # Actualización robusta (Welford exponencial); media acumulada durante el calentamiento
+        recortar = listo & (sigma > 0)
+        desviacion = np.where(recortar, np.clip(desviacion, -self.umbral * sigma, self.umbral * sigma), desviacion)
+        peso = np.maximum(self.alpha, 1 / (self.cuenta[i] + 1))
+        incremento = peso * desviacion
+        self.media[i] += incremento
+        self.varianza[i] = (1 - peso) * (self.varianza[i] + desviacion * incremento)
+        self.cuenta[i] += 1
+        self.posicion = (i + 1) % self.m
+
+        return esperado, z, anomalia
+
+    def process(self, Y):
+        """Procesa varios días seguidos (matriz días × series); devuelve matrices del mismo tamaño"""
+        Y = np.asarray(Y, dtype=float)
+        esperados, zs, anomalias = np.empty(Y.shape), np.empty(Y.shape), np.empty(Y.shape, dtype=bool)
+
+        for t in range(len(Y)):
+            esperados[t], zs[t], anomalias[t] = self.update(Y[t])
+
+        return esperados, zs, anomalias
+
+def _huella(valores):
+    return hashlib.sha1(np.ascontiguousarray(valores, dtype=float).tobytes()).hexdigest()
+
+class AnomalyMonitor:
+    """Estado persistente del detector sobre una matriz días × series
+
+    Solo procesa los días posteriores al último visto si los anteriores no han
+    cambiado (misma huella de las series conocidas); en otro caso vuelve a empezar.
+    Las series nuevas (p. ej. un producto nuevo) se añaden con estado vacío sin
+    tocar el de las demás. Guarda la lista de anomalías detectadas hasta el
+    momento. Las ventas se evalúan en escala log1p (efectos multiplicativos, colas
+    largas) y se reportan en la original.
+    """
+
+    def __init__(self, **opciones):
+        self.opciones = opciones
+        self.detector = AnomalyDetector(**opciones)
+        self.series = None
+        self.inicio = None
+        self.dias = 0
+        self.huella = None
+        self.anomalias = []
+        self.dias_nuevos = 0
+
+    def _reiniciar(self):
+        self.__init__(**self.opciones)
+
+    def update(self, matriz):
+        """Incorpora los días nuevos de ``matriz`` (DataFrame con índice de fechas diario y una columna por serie)"""
+        conocidas = self.series or []
+        conjunto = set(conocidas)
+        continua = (
+            self.series is not None
+            and conjunto <= set(matriz.columns)
+            and self.inicio == matriz.index[0]
+            and len(matriz) >= self.dias
+            and _huella(matriz[conocidas].to_numpy(dtype=float)[:self.dias]) == self.huella
+        )
+        if continua:
+            # Las series nuevas van al final con estado vacío: el resto conserva el suyo
+            nuevas = [serie for serie in matriz.columns if serie not in conjunto]
+            self.detector.add_series(len(nuevas))
+            self.series = conocidas + nuevas
+        else:
+            self._reiniciar()
+            self.series = matriz.columns.tolist()
+            self.inicio = matriz.index[0]
+            # La temporada empieza en el día de la semana de la primera fecha
+            self.detector.posicion = matriz.index[0].dayofweek % self.detector.m
+
+        series = self.series
+        valores = matriz[series].to_numpy(dtype=float)
+        nuevos = valores[self.dias:]
+        esperados, zs, anomalias = self.detector.process(np.log1p(np.clip(nuevos, 0, None)))
+        esperados = np.expm1(esperados)
+
+        fechas = matriz.index[self.dias:]
+        for t, j in zip(*np.nonzero(anomalias)):
+            self.anomalias.append({
+                'fecha': fechas[t].strftime('%Y-%m-%d'),
+                'serie': series[j],
+                'valor': float(nuevos[t, j]),
+                'esperado': float(esperados[t, j]),
+                'z': float(zs[t, j]),
+                'tipo': 'pico' if zs[t, j] > 0 else 'caida'
+            })
+
+        self.dias = len(valores)
+        self.huella = _huella(valores)
+        self.dias_nuevos = len(nuevos)
+        return self
+
+    def recent(self, desde=None, limit=None):
+        """Anomalías desde una fecha (de más reciente a más antigua y por |z|)"""
+        seleccion = [a for a in self.anomalias if desde is None or a['fecha'] >= desde]
+        seleccion.sort(key=lambda a: (a['fecha'], abs(a['z'])), reverse=True)
+        return seleccion[:limit] if limit else seleccion
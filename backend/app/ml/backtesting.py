@@ -0,0 +1,203 @@
+"""
+🧪 Backtesting de Forecasters
+Validación con origen móvil (ventana expansiva o deslizante) en paralelo
+"""
+
+import hashlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+
+from app.utils.cache import dump_atomic
+
+VENTANAS = ['expanding', 'sliding']
+
+# Días de entrenamiento de cada corte con ventana deslizante
+TAM_VENTANA = 180
+
+def generate_cutoffs(n, horizonte, n_cortes=8, paso=None, ventana='expanding', tam_ventana=TAM_VENTANA, minimo=60):
+    """Cortes (inicio_train, corte) de más antiguo a más reciente
+
+    El último corte deja exactamente ``horizonte`` días de prueba al final; los
+    anteriores retroceden ``paso`` días (``horizonte`` por defecto). Con ventana
+    deslizante el entrenamiento tiene siempre ``tam_ventana`` días.
+    """
+    if ventana not in VENTANAS:
+        raise ValueError(f"Tipo de ventana no válido: {ventana}")
+
+    paso = paso or horizonte
+
+    cortes = []
+    for i in range(n_cortes):
+        corte = n - horizonte - i * paso
+        inicio = max(0, corte - tam_ventana) if ventana == 'sliding' else 0
+        if corte - inicio < minimo:
+            break
+        cortes.append((inicio, corte))
+
+    return cortes[::-1]
+
+def error_metrics(reales, predicciones):
+    """RMSE, MAE y MAPE (sobre los días con ventas) de un corte"""
+    reales = np.asarray(reales, dtype=float)
+    errores = reales - np.asarray(predicciones, dtype=float)
+    con_ventas = reales != 0
+
+    return {
+        'rmse': float(np.sqrt(np.mean(errores ** 2))),
+        'mae': float(np.mean(np.abs(errores))),
+        'mape': float(np.mean(np.abs(errores[con_ventas] / reales[con_ventas])) * 100) if con_ventas.any() else None
+    }
+
+def distribution(valores):
+    """Resumen de la distribución de una métrica entre cortes"""
+    valores = np.array([v for v in valores if v is not None], dtype=float)
+    if len(valores) == 0:
+        return None
+
+    return {
+        'media': float(valores.mean()),
+        'p50': float(np.percentile(valores, 50)),
+        'p90': float(np.percentile(valores, 90)),
+        'min': float(valores.min()),
+        'max': float(valores.max())
+    }
+
+class BacktestCache:
+    """Predicciones por corte indexadas por el contenido de su ventana de entrenamiento
+
+    Con datos que solo crecen por el final, las ventanas de los cortes antiguos no
+    cambian entre reentrenamientos y sus ajustes se reutilizan. Al guardar solo se
+    conservan las entradas usadas en la última ejecución.
+    """
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self._entradas = {}
+        self._usadas = {}
+
+    def _ruta(self, modelo):
+        return os.path.join(self.directorio, f"{modelo}.pkl")
+
+    def _de(self, modelo):
+        if modelo not in self._entradas:
+            ruta = self._ruta(modelo)
+            self._entradas[modelo] = joblib.load(ruta) if os.path.exists(ruta) else {}
+        return self._entradas[modelo]
+
+    @staticmethod
+    def key(train, horizonte):
+        """Clave de un ajuste: contenido de la ventana de entrenamiento y horizonte"""
+        contenido = train.to_csv(index=False).encode()
+        return hashlib.sha1(contenido + str(horizonte).encode()).hexdigest()
+
+    def get(self, modelo, clave):
+        self._usadas.setdefault(modelo, set()).add(clave)
+        return self._de(modelo).get(clave)
+
+    def set(self, modelo, clave, predicciones):
+        self._usadas.setdefault(modelo, set()).add(clave)
+        self._de(modelo)[clave] = np.asarray(predicciones, dtype=float)
+
+    def save(self):
+        """Persiste en disco las entradas de cada modelo (escritura atómica)"""
+        for modelo, entradas in self._entradas.items():
+            usadas = self._usadas.get(modelo, set())
+            entradas = {clave: valor for clave, valor in entradas.items() if clave in usadas}
+            dump_atomic(entradas, self._ruta(modelo))
+
+def _predecir_corte(funcion, train, test):
+    """Ajusta un modelo sobre la ventana de entrenamiento y predice el corte (worker)"""
+    return np.asarray(funcion(train, test), dtype=float)
+
+def backtest(data, modelos, horizonte=30, n_cortes=8, paso=None, ventana='expanding',
+             tam_ventana=TAM_VENTANA, n_jobs=None, cache=None):
+    """Backtesting con origen móvil de varios modelos
+
+    ``data`` es la serie diaria (columnas ``ds``, ``y`` y regresores) y ``modelos``
+    un diccionario nombre -> función ``(train, test) -> predicciones`` definida a
+    nivel de módulo para poder ejecutarse en los workers. Devuelve, por modelo, las
+    métricas de cada corte y su distribución.
+    """
+    cortes = generate_cutoffs(len(data), horizonte, n_cortes, paso, ventana, tam_ventana)
+    if not cortes:
+        raise ValueError("No hay datos suficientes para ningún corte")
+
+    inicio_tiempo = time.perf_counter()
+    tareas = []
+    predicciones = {}
+
+    for nombre in modelos:
+        for inicio, corte in cortes:
+            train = data.iloc[inicio:corte]
+            clave = BacktestCache.key(train, horizonte)
+            cacheada = cache.get(nombre, clave) if cache is not None else None
+
+            if cacheada is not None:
+                predicciones[(nombre, corte)] = cacheada
+            else:
+                tareas.append((nombre, corte, clave, train, data.iloc[corte:corte + horizonte]))
+
+    n_jobs = min(n_jobs or os.cpu_count() or 1, max(len(tareas), 1))
+
+    def _registrar(nombre, corte, clave, resultado):
+        predicciones[(nombre, corte)] = resultado
+        if cache is not None:
+            cache.set(nombre, clave, resultado)
+
+    # Un proceso daemon no puede crear workers: ajuste secuencial
+    if n_jobs == 1 or multiprocessing.current_process().daemon:
+        for nombre, corte, clave, train, test in tareas:
+            try:
+                _registrar(nombre, corte, clave, _predecir_corte(modelos[nombre], train, test))
+            except Exception as e:
+                print(f"⚠️ Error en {nombre} (corte {corte}): {e}")
+    elif tareas:
+        with ProcessPoolExecutor(max_workers=n_jobs, mp_context=multiprocessing.get_context('spawn')) as executor:
+            futuros = {
+                executor.submit(_predecir_corte, modelos[nombre], train, test): (nombre, corte, clave)
+                for nombre, corte, clave, train, test in tareas
+            }
+            for futuro, (nombre, corte, clave) in futuros.items():
+                try:
+                    _registrar(nombre, corte, clave, futuro.result())
+                except Exception as e:
+                    print(f"⚠️ Error en {nombre} (corte {corte}): {e}")
+
+    if cache is not None:
+        cache.save()
+
+    resultados = {}
+    for nombre in modelos:
+        por_corte = []
+        for inicio, corte in cortes:
+            if (nombre, corte) not in predicciones:
+                continue
+            reales = data['y'].values[corte:corte + horizonte]
+            por_corte.append({
+                'fecha_corte': data['ds'].iloc[corte].strftime('%Y-%m-%d'),
+                'dias_entrenamiento': corte - inicio,
+                **error_metrics(reales, predicciones[(nombre, corte)])
+            })
+
+        resultados[nombre] = {
+            'cortes': por_corte,
+            **{metrica: distribution([c[metrica] for c in por_corte]) for metrica in ['rmse', 'mae', 'mape']}
+        }
+
+    return {
+        'modelos': resultados,
+        'configuracion': {
+            'horizonte': horizonte,
+            'cortes': len(cortes),
+            'ventana': ventana,
+            'tam_ventana': tam_ventana if ventana == 'sliding' else None
+        },
+        'ajustes_calculados': len(tareas),
+        'ajustes_cacheados': len(modelos) * len(cortes) - len(tareas),
+        'tiempo': time.perf_counter() - inicio_tiempo
+    }
@@ -0,0 +1,170 @@
+"""
+⚡ Forecasters Base Vectorizados
+Holt-Winters aditivo y naive estacional en NumPy para muchas series a la vez
+"""
+
+import itertools
+
+import numpy as np
+
+METODOS = ['holt_winters', 'seasonal_naive']
+
+# Rejilla de parámetros de suavizado (alpha, beta, gamma); beta=None sin tendencia
+ALPHAS = (0.05, 0.1, 0.2, 0.4, 0.7)
+BETAS = (None, 0.01, 0.05)
+GAMMAS = (0.05, 0.15, 0.3)
+
+def _recursion(Y, inicio, nivel, tendencia, estacional, alpha, beta, gamma):
+    """Recursión de Holt-Winters aditivo desde el instante ``inicio``
+
+    Los estados pueden llevar dimensiones previas (p. ej. la rejilla de parámetros):
+    ``nivel`` y ``tendencia`` (..., n) y ``estacional`` (..., m, n). Actualiza
+    ``estacional`` en el sitio y devuelve nivel, tendencia y suma de errores².
+    """
+    m = estacional.shape[-2]
+    sse = np.zeros(nivel.shape)
+
+    for t in range(len(Y)):
+        i = (inicio + t) % m
+        y = Y[t]
+        s = estacional[..., i, :]
+
+        error = y - (nivel + tendencia + s)
+        sse += error ** 2
+
+        nuevo_nivel = alpha * (y - s) + (1 - alpha) * (nivel + tendencia)
+        tendencia = beta * (nuevo_nivel - nivel) + (1 - beta) * tendencia
+        estacional[..., i, :] = gamma * (y - nuevo_nivel) + (1 - gamma) * s
+        nivel = nuevo_nivel
+
+    return nivel, tendencia, sse
+
+class BaselineForecaster:
+    """Forecaster estadístico vectorizado sobre una matriz días × series
+
+    ``holt_winters`` ajusta un Holt-Winters aditivo con estacionalidad ``m`` y elige
+    por serie la combinación de parámetros de la rejilla con menor error de
+    predicción a un paso; toda la rejilla y todas las series avanzan juntas en una
+    única recursión sobre el tiempo. ``seasonal_naive`` repite la última temporada.
+    """
+
+    def __init__(self, metodo='holt_winters', m=7):
+        if metodo not in METODOS:
+            raise ValueError(f"Método no válido: {metodo}")
+
+        self.metodo = metodo
+        self.m = m
+        self.univariante = False
+        self.n_obs = 0
+        self.nivel = None
+        self.tendencia = None
+        self.estacional = None
+        self.parametros = None
+        self.sigma = None
+
+    def fit(self, Y):
+        """Ajusta todas las series (Y de forma (T,) o (T, n))"""
+        Y = np.asarray(Y, dtype=float)
+        self.univariante = Y.ndim == 1
+        if self.univariante:
+            Y = Y[:, None]
+
+        T, n = Y.shape
+        m = self.m
+        if T < 2 * m:
+            raise ValueError(f"Se necesitan al menos {2 * m} observaciones")
+
+        self.n_obs = T
+
+        if self.metodo == 'seasonal_naive':
+            self.estacional = Y[T - m:].copy()
+            residuos = Y[m:] - Y[:-m]
+            self.sigma = np.sqrt(np.mean(residuos ** 2, axis=0))
+            return self
+
+        # Rejilla como primera dimensión: estados de forma (k, n)
+        rejilla = list(itertools.product(ALPHAS, BETAS, GAMMAS))
+        alpha = np.array([a for a, _, _ in rejilla])[:, None]
+        beta = np.array([b or 0.0 for _, b, _ in rejilla])[:, None]
+        gamma = np.array([g for _, _, g in rejilla])[:, None]
+        con_tendencia = np.array([b is not None for _, b, _ in rejilla])[:, None]
+
+        # Inicialización con las dos primeras temporadas
+        primera = Y[:m].mean(axis=0)
+        segunda = Y[m:2 * m].mean(axis=0)
+        nivel = np.broadcast_to(primera, (len(rejilla), n)).copy()
+        tendencia = np.where(con_tendencia, (segunda - primera) / m, 0.0)
+        estacional = np.broadcast_to(Y[:m] - primera, (len(rejilla), m, n)).copy()
+
+        nivel, tendencia, sse = _recursion(Y[m:], m, nivel, tendencia, estacional, alpha, beta, gamma)
+
+        # Mejor combinación por serie
+        mejor = np.argmin(sse, axis=0)
+        series = np.arange(n)
+        self.nivel = nivel[mejor, series]
+        self.tendencia = tendencia[mejor, series]
+        self.estacional = estacional[mejor, :, series].T
+        self.parametros = np.column_stack([alpha[mejor, 0], beta[mejor, 0], gamma[mejor, 0]])
+        self.sigma = np.sqrt(sse[mejor, series] / (T - m))
+
+        return self
+
+    def update(self, Y_nuevo):
+        """Incorpora nuevas observaciones continuando la recursión, sin reajustar parámetros"""
+        if self.estacional is None:
+            raise ValueError("Modelo no ajustado")
+
+        Y_nuevo = np.asarray(Y_nuevo, dtype=float)
+        if self.univariante:
+            Y_nuevo = Y_nuevo[:, None]
+        if len(Y_nuevo) == 0:
+            return self
+
+        if self.metodo == 'seasonal_naive':
+            self.estacional = np.vstack([self.estacional, Y_nuevo])[-self.m:]
+        else:
+            self.nivel, self.tendencia, _ = _recursion(
+                Y_nuevo, self.n_obs, self.nivel, self.tendencia, self.estacional,
+                self.parametros[:, 0], self.parametros[:, 1], self.parametros[:, 2]
+            )
+
+        self.n_obs += len(Y_nuevo)
+        return self
+
+    def forecast(self, h):
+        """Predicciones a ``h`` días: matriz (n, h), o vector si se ajustó una serie"""
+        if self.estacional is None:
+            raise ValueError("Modelo no ajustado")
+
+        pasos = np.arange(1, h + 1)
+        indices = (self.n_obs + pasos - 1) % self.m
+
+        if self.metodo == 'seasonal_naive':
+            # estacional guarda los días T-m..T-1, cuyo índice de temporada es (T-m+j) % m
+            desplazamiento = self.n_obs % self.m
+            prediccion = self.estacional[(indices - desplazamiento) % self.m].T
+        else:
+            prediccion = (
+                self.nivel[:, None]
+                + self.tendencia[:, None] * pasos[None, :]
+                + self.estacional[indices].T
+            )
+
+        return prediccion[0] if self.univariante else prediccion
+
+    def intervals(self, h, z=1.96):
+        """Intervalos de predicción aproximados (límite inferior, límite superior)"""
+        prediccion = self.forecast(h)
+        pasos = np.arange(1, h + 1)
+
+        if self.metodo == 'seasonal_naive':
+            escala = np.sqrt(np.floor((pasos - 1) / self.m) + 1)[None, :]
+        else:
+            alpha = self.parametros[:, 0][:, None]
+            escala = np.sqrt(1 + (pasos[None, :] - 1) * alpha ** 2)
+
+        amplitud = z * self.sigma[:, None] * escala
+        if self.univariante:
+            amplitud = amplitud[0]
+
+        return prediccion - amplitud, prediccion + amplitud
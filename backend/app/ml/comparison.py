@@ -0,0 +1,94 @@
+"""
+🏁 Comparación de Modelos Candidatos
+Ajusta y evalúa candidatos en paralelo con un tiempo máximo por candidato
+"""
+
+import multiprocessing
+import time
+
+import numpy as np
+from sklearn.metrics import mean_squared_error, mean_absolute_error
+
+# Tiempo máximo (segundos) de un candidato sin timeout propio
+TIMEOUT_DEFECTO = 60
+
+def evaluate_candidate(funcion, train_data, test_data, granularidad='D'):
+    """Ajusta y evalúa un candidato (se ejecuta en un proceso worker)
+
+    ``funcion(train, test, granularidad)`` devuelve (modelo, predicciones del
+    periodo de prueba, hiperparámetros).
+    """
+    inicio = time.perf_counter()
+    model, predicciones, hiperparametros = funcion(train_data, test_data, granularidad)
+    actual_values = test_data['y'].values
+
+    return {
+        'model': model,
+        'hiperparametros': hiperparametros,
+        'rmse': float(np.sqrt(mean_squared_error(actual_values, predicciones))),
+        'mae': float(mean_absolute_error(actual_values, predicciones)),
+        'tiempo': time.perf_counter() - inicio
+    }
+
+def compare_candidates(candidatos, train_data, test_data, granularidad='D', timeouts=None, paralelo=None):
+    """Evalúa los candidatos (nombre -> función) y devuelve (resultados, agotados)
+
+    En paralelo cada candidato se ajusta en su propio proceso y los que superan su
+    timeout se terminan sin esperar. Un proceso daemon no puede crear workers: en
+    ese caso (o con ``paralelo=False``) se ajustan uno tras otro y se descartan los
+    que tardaron más que su timeout, de modo que el resultado es el mismo.
+    ``agotados`` son los candidatos descartados por tiempo.
+    """
+    timeouts = timeouts or {}
+    if paralelo is None:
+        paralelo = not multiprocessing.current_process().daemon
+
+    if paralelo:
+        return _comparar_en_paralelo(candidatos, train_data, test_data, granularidad, timeouts)
+    return _comparar_en_serie(candidatos, train_data, test_data, granularidad, timeouts)
+
+def _comparar_en_serie(candidatos, train_data, test_data, granularidad, timeouts):
+    resultados, agotados = {}, []
+
+    for nombre, funcion in candidatos.items():
+        try:
+            resultado = evaluate_candidate(funcion, train_data, test_data, granularidad)
+        except Exception as e:
+            print(f"⚠️ Error entrenando {nombre}: {e}")
+            continue
+
+        if resultado['tiempo'] > timeouts.get(nombre, TIMEOUT_DEFECTO):
+            print(f"⏱️ {nombre} superó el tiempo límite ({timeouts.get(nombre, TIMEOUT_DEFECTO)}s)")
+            agotados.append(nombre)
+        else:
+            resultados[nombre] = resultado
+
+    return resultados, agotados
+
+def _comparar_en_paralelo(candidatos, train_data, test_data, granularidad, timeouts):
+    inicio = time.perf_counter()
+    resultados, agotados = {}, []
+
+    # Un proceso por candidato para que ninguno espere a otro y el timeout sea real
+    pool = multiprocessing.get_context('spawn').Pool(processes=len(candidatos))
+    try:
+        pendientes = {
+            nombre: pool.apply_async(evaluate_candidate, (funcion, train_data, test_data, granularidad))
+            for nombre, funcion in candidatos.items()
+        }
+
+        # Todos empiezan a la vez: cada uno tiene de plazo su timeout desde el inicio
+        for nombre in sorted(pendientes, key=lambda n: timeouts.get(n, TIMEOUT_DEFECTO)):
+            restante = inicio + timeouts.get(nombre, TIMEOUT_DEFECTO) - time.perf_counter()
+            try:
+                resultados[nombre] = pendientes[nombre].get(timeout=max(0, restante))
+            except multiprocessing.TimeoutError:
+                print(f"⏱️ {nombre} superó el tiempo límite ({timeouts.get(nombre, TIMEOUT_DEFECTO)}s)")
+                agotados.append(nombre)
+            except Exception as e:
+                print(f"⚠️ Error entrenando {nombre}: {e}")
+    finally:
+        # Termina también los candidatos que siguen ejecutándose
+        pool.terminate()
+
+    return resultados, agotados
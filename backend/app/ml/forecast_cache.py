@@ -0,0 +1,45 @@
+"""
+🗃️ Caché de Predicciones
+Predicciones, métricas e historial por versión de modelo y granularidad
+"""
+
+from app.utils.cache import versioned_cache
+from app.utils.data_version import get_data_version
+
+# Horizonte mínimo calculado: las peticiones más cortas se sirven recortando
+HORIZONTE_MINIMO = 30
+
+def cache_version(forecaster):
+    """Versión del modelo registrado o, para el modelo base de respaldo, de los datos"""
+    return forecaster.model_version or f"base-{get_data_version()}"
+
+def cached_forecast(forecaster, data, periods, granularidad='D', cache=versioned_cache):
+    """Predicciones a ``periods`` días y métricas del modelo, calculadas una vez por versión
+
+    Se predice el horizonte más largo pedido hasta ahora (al menos
+    ``HORIZONTE_MINIMO``) y cualquier horizonte menor es un recorte de la entrada
+    cacheada. La entrada solo cambia cuando el registro publica un modelo nuevo.
+    """
+    def calcular():
+        horizonte = max(periods, HORIZONTE_MINIMO)
+        return {
+            'horizonte': horizonte,
+            'predicciones': forecaster.predict_future_sales(horizonte, data),
+            'metricas': forecaster.get_model_performance(data)
+        }
+
+    entrada = cache.get_or_compute(
+        f"forecast_predicciones_{granularidad}",
+        calcular,
+        version=cache_version(forecaster),
+        valido=lambda entrada: entrada['horizonte'] >= periods
+    )
+    return entrada['predicciones'][:periods], entrada['metricas']
+
+def cached_history(forecaster, calcular, granularidad='D', cache=versioned_cache):
+    """Historial de predicciones frente a valores reales, calculado una vez por versión"""
+    return cache.get_or_compute(
+        f"forecast_historial_{granularidad}",
+        calcular,
+        version=cache_version(forecaster)
+    )
@@ -5,82 +5,215 @@ Implementa Prophet y ARIMA para predicciones de ventas
 
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
 from prophet import Prophet
 from statsmodels.tsa.arima.model import ARIMA
-from statsmodels.tsa.stattools import adfuller
 from sklearn.metrics import mean_squared_error, mean_absolute_error
+import copy
+import hashlib
 import warnings
-import joblib
-import os
+import time
+from functools import partial
+
+from app.ml.registry import ModelRegistry
+from app.ml.order_search import search_arima_order, get_search_executor
+from app.ml.backtesting import backtest, BacktestCache
+from app.ml.comparison import compare_candidates
+from app.ml.baseline import BaselineForecaster, METODOS as BASELINES
+from app.ml.serialization import save_model, load_model
+from app.utils.cache import versioned_cache
+from app.utils.time_series import daily_sales
+from app.utils.resampling import GRANULARIDADES
 
 warnings.filterwarnings('ignore')
 
+BACKTEST_CACHE_DIR = "app/data/cache/backtest"
+
+# Hiperparámetros de Prophet
+PROPHET_PARAMS = {
+    'yearly_seasonality': True,
+    'weekly_seasonality': True,
+    'daily_seasonality': False,
+    'seasonality_mode': 'multiplicative',
+    'changepoint_prior_scale': 0.05,
+    'seasonality_prior_scale': 10.0
+}
+
+# Rejilla de búsqueda del orden ARIMA
+ARIMA_SEARCH = {
+    'max_p': 3,
+    'max_q': 3,
+    'seasonal': False,
+    'm': 7,
+    'criterio': 'aic',
+    'paciencia': 1
+}
+
+def seasonal_period(n, granularidad='D'):
+    """Periodo estacional de la granularidad, o 1 (sin estacionalidad) si no hay dos temporadas"""
+    m = GRANULARIDADES[granularidad]['estacionalidad']
+    return m if n >= 2 * m else 1
+
+def fit_prophet(data, init=None, granularidad='D'):
+    """Ajusta un modelo Prophet (con 'cantidad' como regresor si está disponible)
+
+    ``init`` permite arrancar la optimización desde los parámetros de un ajuste previo.
+    Con series semanales o mensuales no hay estacionalidad semanal que ajustar.
+    """
+    model = Prophet(**{**PROPHET_PARAMS, 'weekly_seasonality': granularidad == 'D'})
+    
+    if 'cantidad' in data.columns:
+        model.add_regressor('cantidad')
+    
+    if init is not None:
+        model.fit(data, init=init)
+    else:
+        model.fit(data)
+    return model
+
+def prophet_warm_start(model):
+    """Parámetros de un Prophet ajustado (MAP) para inicializar el siguiente ajuste"""
+    return {
+        **{nombre: model.params[nombre][0][0] for nombre in ['k', 'm', 'sigma_obs']},
+        **{nombre: model.params[nombre][0] for nombre in ['delta', 'beta']}
+    }
+
+def fit_arima(data, serie='total', granularidad='D'):
+    """Ajusta un modelo ARIMA con el orden seleccionado para la serie
+
+    La búsqueda del orden se ajusta en el pool compartido de order_search y se
+    cachea por serie, granularidad y último día de la ventana de entrenamiento
+    (p. ej. la de compare_models o un corte de backtesting), con el contenido de
+    la serie como versión: cada corte conserva su selección y solo se recalcula
+    si cambian sus datos. Devuelve (modelo, orden, orden estacional) o
+    (None, None, None) si no converge.
+    """
+    # La serie se pasa sin diferenciar: la diferenciación la aplica ARIMA con el orden d
+    ts_data = data.set_index('ds')['y'].asfreq(GRANULARIDADES[granularidad]['frecuencia'])
+    huella = hashlib.sha1((ts_data.to_csv() + repr(sorted(ARIMA_SEARCH.items()))).encode()).hexdigest()[:12]
+    nombre = f"arima_orden_{serie}" if granularidad == 'D' else f"arima_orden_{serie}_{granularidad}"
+    
+    seleccion = versioned_cache.get_or_compute(
+        f"{nombre}_{ts_data.index[-1]:%Y%m%d}",
+        lambda: search_arima_order(ts_data.values, **ARIMA_SEARCH, executor=get_search_executor()),
+        version=huella
+    )
+    print(f"  Orden ARIMA{seleccion['order']}x{seleccion['seasonal_order']} "
+          f"({seleccion['modelos_ajustados']} candidatos evaluados)")
+    
+    try:
+        model = ARIMA(ts_data, order=seleccion['order'], seasonal_order=seleccion['seasonal_order']).fit()
+        return model, seleccion['order'], seleccion['seasonal_order']
+    except Exception as e:
+        print(f"⚠️ Error entrenando ARIMA{seleccion['order']}: {e}")
+        return None, None, None
+
+def _candidato_prophet(train_data, test_data, granularidad='D'):
+    """Candidato Prophet: modelo, predicciones del periodo de prueba e hiperparámetros"""
+    model = fit_prophet(train_data, granularidad=granularidad)
+    predicciones = model.predict(test_data.drop(columns='y'))['yhat'].values
+    return model, predicciones, PROPHET_PARAMS
+
+def _candidato_arima(train_data, test_data, granularidad='D'):
+    """Candidato ARIMA: modelo, predicciones del periodo de prueba e hiperparámetros"""
+    model, order, seasonal_order = fit_arima(train_data, granularidad=granularidad)
+    if model is None:
+        raise RuntimeError("No se pudo entrenar modelo ARIMA")
+    hiperparametros = {'order': order, 'seasonal_order': seasonal_order}
+    return model, np.asarray(model.forecast(steps=len(test_data))), hiperparametros
+
+def _candidato_baseline(metodo, train_data, test_data, granularidad='D'):
+    """Candidato base vectorizado (Holt-Winters o naive estacional)"""
+    m = seasonal_period(len(train_data), granularidad)
+    model = BaselineForecaster(metodo, m).fit(train_data['y'].values)
+    hiperparametros = {'metodo': metodo, 'm': m}
+    if model.parametros is not None:
+        hiperparametros.update(zip(['alpha', 'beta', 'gamma'], model.parametros[0].tolist()))
+    return model, model.forecast(len(test_data)), hiperparametros
+
+# Modelos candidatos de compare_models: nombre -> función (train, test) -> (modelo, predicciones, hiperparámetros)
+CANDIDATOS = {
+    'prophet': _candidato_prophet,
+    'arima': _candidato_arima,
+    'holt_winters': partial(_candidato_baseline, 'holt_winters'),
+    'seasonal_naive': partial(_candidato_baseline, 'seasonal_naive')
+}
+
+def _predecir_candidato(nombre, train_data, test_data, granularidad='D'):
+    """Predicciones de un candidato sobre el periodo de prueba (para backtesting)"""
+    return CANDIDATOS[nombre](train_data, test_data, granularidad)[1]
+
+def _artefacto_perezoso(nombre):
+    """Atributo de modelo que se carga del registro la primera vez que se usa"""
+    def obtener(self):
+        ruta = self._pendientes.pop(nombre, None)
+        if ruta is not None:
+            self._modelos[nombre] = load_model(ruta)
+        return self._modelos.get(nombre)
+    
+    def asignar(self, modelo):
+        self._pendientes.pop(nombre, None)
+        self._modelos[nombre] = modelo
+    
+    return property(obtener, asignar)
+
 class SalesForecaster:
     """Sistema de predicción de ventas usando Prophet y ARIMA"""
     
-    def __init__(self):
+    # Tiempo máximo (segundos) de ajuste de cada candidato en compare_models
+    TIMEOUTS = {
+        'prophet': 120,
+        'arima': 60,
+        'holt_winters': 30,
+        'seasonal_naive': 30
+    }
+    
+    prophet_model = _artefacto_perezoso('prophet_model')
+    arima_model = _artefacto_perezoso('arima_model')
+    holt_winters_model = _artefacto_perezoso('holt_winters_model')
+    seasonal_naive_model = _artefacto_perezoso('seasonal_naive_model')
+    
+    def __init__(self, granularidad='D'):
+        if granularidad not in GRANULARIDADES:
+            raise ValueError(f"Granularidad no válida: {granularidad}")
+        
+        # Periodo de las observaciones y de las predicciones (días, semanas o meses)
+        self.granularidad = granularidad
+        
+        # Modelos cargados y rutas de los que aún no se han usado
+        self._modelos = {}
+        self._pendientes = {}
         self.prophet_model = None
         self.arima_model = None
+        self.arima_order = None
+        self.holt_winters_model = None
+        self.seasonal_naive_model = None
         self.best_model = None
-        self.models_dir = "app/models"
-        
-        # Crear directorio de modelos si no existe
-        os.makedirs(self.models_dir, exist_ok=True)
+        self.metricas = None
+        self.hiperparametros = {}
+        self.tiempo_comparacion = None
+        self.backtest = None
+        self.actualizacion = None
+        
+        # Registro versionado de modelos (uno por granularidad)
+        self.registry = ModelRegistry("forecast" if granularidad == 'D' else f"forecast_{granularidad}")
+        self.model_version = None
+        self.metadata = None
     
     def prepare_time_series_data(self, df_spark):
-        """Prepara datos de series temporales desde Spark DataFrame"""
+        """Prepara datos de series temporales desde Spark DataFrame (agregados en Spark)"""
         print("📊 Preparando datos de series temporales...")
         
-        # Convertir a pandas para análisis temporal
-        df_pandas = df_spark.toPandas()
-        
-        # Agregar ventas por día
-        daily_sales = df_pandas.groupby('fecha').agg({
-            'total': 'sum',
-            'cantidad': 'sum',
-            'venta_id': 'count'
-        }).reset_index()
-        
-        # Renombrar columnas para Prophet
-        daily_sales = daily_sales.rename(columns={
-            'fecha': 'ds',
-            'total': 'y'
-        })
-        
-        # Rellenar fechas faltantes con 0
-        date_range = pd.date_range(
-            start=daily_sales['ds'].min(),
-            end=daily_sales['ds'].max(),
-            freq='D'
-        )
-        
-        complete_df = pd.DataFrame({'ds': date_range})
-        daily_sales = complete_df.merge(daily_sales, on='ds', how='left').fillna(0)
+        daily_sales_data = daily_sales(df_spark)
         
-        print(f"✅ Datos preparados: {len(daily_sales)} días")
-        return daily_sales
+        print(f"✅ Datos preparados: {len(daily_sales_data)} días")
+        return daily_sales_data
     
     def train_prophet_model(self, data):
         """Entrena modelo Prophet"""
         print("🤖 Entrenando modelo Prophet...")
         
-        # Configurar modelo Prophet
-        self.prophet_model = Prophet(
-            yearly_seasonality=True,
-            weekly_seasonality=True,
-            daily_seasonality=False,
-            seasonality_mode='multiplicative',
-            changepoint_prior_scale=0.05,
-            seasonality_prior_scale=10.0
-        )
-        
-        # Agregar regresores si están disponibles
-        if 'cantidad' in data.columns:
-            self.prophet_model.add_regressor('cantidad')
-        
-        # Entrenar modelo
-        self.prophet_model.fit(data)
+        self.prophet_model = fit_prophet(data, granularidad=self.granularidad)
+        self.hiperparametros['prophet'] = PROPHET_PARAMS
         
         print("✅ Modelo Prophet entrenado")
         return self.prophet_model
@@ -89,96 +222,104 @@ class SalesForecaster:
         """Entrena modelo ARIMA"""
         print("📈 Entrenando modelo ARIMA...")
         
-        # Preparar datos para ARIMA
-        ts_data = data.set_index('ds')['y']
-        
-        # Verificar estacionariedad
-        adf_result = adfuller(ts_data)
-        is_stationary = adf_result[1] < 0.05
+        self.arima_model, self.arima_order, seasonal_order = fit_arima(data, granularidad=self.granularidad)
         
-        if not is_stationary:
-            # Diferenciar para hacer estacionario
-            ts_data = ts_data.diff().dropna()
-            print("  Datos diferenciados para estacionariedad")
-        
-        # Determinar parámetros ARIMA usando auto_arima o heurística
-        # Para simplificar, usamos parámetros comunes
-        try:
-            self.arima_model = ARIMA(ts_data, order=(1, 1, 1)).fit()
+        if self.arima_model is not None:
+            self.hiperparametros['arima'] = {'order': self.arima_order, 'seasonal_order': seasonal_order}
             print("✅ Modelo ARIMA entrenado")
-        except Exception as e:
-            print(f"⚠️ Error entrenando ARIMA: {e}")
-            # Fallback a parámetros más simples
-            try:
-                self.arima_model = ARIMA(ts_data, order=(0, 1, 1)).fit()
-                print("✅ Modelo ARIMA entrenado (parámetros simplificados)")
-            except:
-                print("❌ No se pudo entrenar modelo ARIMA")
-                self.arima_model = None
+        else:
+            print("❌ No se pudo entrenar modelo ARIMA")
         
         return self.arima_model
     
-    def compare_models(self, data, test_size=30):
-        """Compara modelos Prophet vs ARIMA"""
+    def train_baseline_model(self, data, metodo='holt_winters'):
+        """Entrena un modelo base vectorizado (milisegundos, sin Stan)"""
+        print(f"⚡ Entrenando modelo base {metodo}...")
+        
+        model, _, hiperparametros = _candidato_baseline(metodo, data, data.iloc[:0], self.granularidad)
+        setattr(self, f"{metodo}_model", model)
+        self.hiperparametros[metodo] = hiperparametros
+        
+        print(f"✅ Modelo {metodo} entrenado")
+        return model
+    
+    def compare_models(self, data, test_size=None, candidatos=None, timeouts=None):
+        """Compara los modelos candidatos ajustándolos en paralelo
+
+        Cada candidato se entrena en su propio proceso con un tiempo máximo; los que
+        terminan a tiempo se evalúan sobre los últimos ``test_size`` periodos (por
+        defecto el periodo de prueba de la granularidad) y el de menor RMSE pasa a
+        ser el mejor modelo. ``candidatos`` es una lista de nombres de ``CANDIDATOS``
+        o un diccionario nombre -> función; los que agotan su tiempo se devuelven
+        en ``tiempo_agotado``.
+        """
         print("🔍 Comparando modelos...")
         
+        test_size = test_size or GRANULARIDADES[self.granularidad]['prueba']
+        if not isinstance(candidatos, dict):
+            candidatos = {nombre: CANDIDATOS[nombre] for nombre in candidatos or CANDIDATOS}
+        timeouts = {**self.TIMEOUTS, **(timeouts or {})}
+        
         # Dividir datos en train/test
         train_data = data.iloc[:-test_size]
         test_data = data.iloc[-test_size:]
         
-        # Entrenar modelos
-        prophet_model = self.train_prophet_model(train_data)
-        arima_model = self.train_arima_model(train_data)
+        inicio = time.perf_counter()
+        resultados, agotados = compare_candidates(
+            candidatos, train_data, test_data, self.granularidad, timeouts
+        )
         
-        # Predicciones Prophet
-        prophet_forecast = prophet_model.predict(test_data[['ds']])
-        prophet_predictions = prophet_forecast['yhat'].values
+        self.tiempo_comparacion = time.perf_counter() - inicio
         
-        # Predicciones ARIMA
-        if arima_model:
-            arima_predictions = arima_model.forecast(steps=test_size)
-        else:
-            arima_predictions = np.zeros(test_size)
+        if not resultados:
+            raise RuntimeError("Ningún modelo candidato terminó de entrenarse")
         
-        # Métricas de evaluación
-        actual_values = test_data['y'].values
+        for nombre, resultado in resultados.items():
+            setattr(self, f"{nombre}_model", resultado['model'])
+            self.hiperparametros[nombre] = resultado['hiperparametros']
+            print(f"  {nombre}: RMSE {resultado['rmse']:.2f} ({resultado['tiempo']:.1f}s)")
         
-        prophet_rmse = np.sqrt(mean_squared_error(actual_values, prophet_predictions))
-        prophet_mae = mean_absolute_error(actual_values, prophet_predictions)
+        if 'arima' in resultados:
+            self.arima_order = resultados['arima']['hiperparametros']['order']
         
-        if arima_model:
-            arima_rmse = np.sqrt(mean_squared_error(actual_values, arima_predictions))
-            arima_mae = mean_absolute_error(actual_values, arima_predictions)
-        else:
-            arima_rmse = float('inf')
-            arima_mae = float('inf')
+        self.metricas = {
+            nombre: {'rmse': resultado['rmse'], 'mae': resultado['mae'], 'tiempo': resultado['tiempo']}
+            for nombre, resultado in resultados.items()
+        }
         
         # Seleccionar mejor modelo
-        if prophet_rmse < arima_rmse:
-            self.best_model = 'prophet'
-            print(f"🏆 Mejor modelo: Prophet (RMSE: {prophet_rmse:.2f})")
-        else:
-            self.best_model = 'arima'
-            print(f"🏆 Mejor modelo: ARIMA (RMSE: {arima_rmse:.2f})")
-        
-        results = {
-            'prophet': {
-                'rmse': prophet_rmse,
-                'mae': prophet_mae,
-                'model': prophet_model
-            },
-            'arima': {
-                'rmse': arima_rmse,
-                'mae': arima_mae,
-                'model': arima_model
-            },
-            'best_model': self.best_model
+        self.best_model = min(resultados, key=lambda nombre: resultados[nombre]['rmse'])
+        print(f"🏆 Mejor modelo: {self.best_model} (RMSE: {resultados[self.best_model]['rmse']:.2f}, "
+              f"comparación en {self.tiempo_comparacion:.1f}s)")
+        
+        return {
+            **resultados,
+            'best_model': self.best_model,
+            'tiempo_comparacion': self.tiempo_comparacion,
+            'tiempo_agotado': agotados
         }
+    
+    def backtest_models(self, data, candidatos=None, **opciones):
+        """Backtesting con origen móvil de los candidatos (ajustes por corte cacheados)"""
+        print("🧪 Ejecutando backtesting...")
         
-        return results
+        modelos = {
+            nombre: partial(_predecir_candidato, nombre, granularidad=self.granularidad)
+            for nombre in candidatos or CANDIDATOS
+        }
+        self.backtest = backtest(data, modelos, cache=BacktestCache(BACKTEST_CACHE_DIR), **opciones)
+        
+        print(f"✅ Backtesting completado en {self.backtest['tiempo']:.1f}s "
+              f"({self.backtest['ajustes_cacheados']} ajustes reutilizados)")
+        return self.backtest
+    
+    def _future_dates(self, data, periods):
+        """Inicio de los ``periods`` periodos siguientes al último observado"""
+        frecuencia = GRANULARIDADES[self.granularidad]['frecuencia']
+        return pd.date_range(data['ds'].max(), periods=periods + 1, freq=frecuencia)[1:]
     
     def predict_future_sales(self, periods=6, data=None):
-        """Predice ventas futuras usando el mejor modelo"""
+        """Predice ventas futuras (``periods`` periodos de la granularidad) usando el mejor modelo"""
         if not self.best_model:
             raise ValueError("No hay modelo entrenado. Ejecuta compare_models() primero.")
         
@@ -186,20 +327,15 @@ class SalesForecaster:
         
         if self.best_model == 'prophet':
             return self._prophet_forecast(periods, data)
+        elif self.best_model in BASELINES:
+            return self._baseline_forecast(periods, data)
         else:
             return self._arima_forecast(periods, data)
     
     def _prophet_forecast(self, periods, data):
         """Predicción usando Prophet"""
         # Crear fechas futuras
-        last_date = data['ds'].max()
-        future_dates = pd.date_range(
-            start=last_date + timedelta(days=1),
-            periods=periods,
-            freq='D'
-        )
-        
-        future_df = pd.DataFrame({'ds': future_dates})
+        future_df = pd.DataFrame({'ds': self._future_dates(data, periods)})
         
         # Agregar regresores si es necesario
         if 'cantidad' in data.columns:
@@ -233,10 +369,8 @@ class SalesForecaster:
         
         # Preparar resultados
         results = []
-        last_date = data['ds'].max()
         
-        for i, pred in enumerate(forecast):
-            fecha = last_date + timedelta(days=i+1)
+        for fecha, pred in zip(self._future_dates(data, periods), forecast):
             results.append({
                 'fecha': fecha.strftime('%Y-%m-%d'),
                 'prediccion': max(0, pred),
@@ -247,53 +381,189 @@ class SalesForecaster:
         
         return results
     
-    def save_models(self):
-        """Guarda los modelos entrenados"""
-        print("💾 Guardando modelos...")
+    def _baseline_forecast(self, periods, data):
+        """Predicción usando el modelo base vectorizado"""
+        model = getattr(self, f"{self.best_model}_model")
+        
+        # El modelo continúa desde su última observación: se reajusta si hay periodos nuevos
+        if model.n_obs != len(data):
+            model = self.train_baseline_model(data, self.best_model)
+        
+        prediccion = model.forecast(periods)
+        inferior, superior = model.intervals(periods)
+        fechas = self._future_dates(data, periods)
+        
+        return [
+            {
+                'fecha': fechas[i].strftime('%Y-%m-%d'),
+                'prediccion': max(0, prediccion[i]),
+                'limite_inferior': max(0, inferior[i]),
+                'limite_superior': max(0, superior[i]),
+                'modelo': 'Holt-Winters' if self.best_model == 'holt_winters' else 'Naive estacional'
+            }
+            for i in range(periods)
+        ]
+    
+    def _predict_new_days(self, data, nuevos):
+        """Predicción del mejor modelo para los días posteriores a su entrenamiento"""
+        if self.best_model == 'prophet':
+            return self.prophet_model.predict(nuevos.drop(columns='y'))['yhat'].values
         
-        if self.prophet_model:
-            joblib.dump(self.prophet_model, f"{self.models_dir}/prophet_model.pkl")
+        if self.best_model in BASELINES:
+            model = getattr(self, f"{self.best_model}_model")
+            pasos = len(data) - model.n_obs
+            return model.forecast(pasos)[-len(nuevos):]
         
-        if self.arima_model:
-            joblib.dump(self.arima_model, f"{self.models_dir}/arima_model.pkl")
+        ultima = self.arima_model.fittedvalues.index[-1]
+        frecuencia = GRANULARIDADES[self.granularidad]['frecuencia']
+        pasos = len(pd.date_range(ultima, nuevos['ds'].max(), freq=frecuencia)) - 1
+        return np.asarray(self.arima_model.forecast(steps=pasos))[-len(nuevos):]
+    
+    def update_models(self, data, umbral_deriva=1.5):
+        """Incorpora los días nuevos al modelo cargado sin reentrenar desde cero
+
+        Los días posteriores a la ventana de entrenamiento sirven de holdout: si el
+        RMSE del mejor modelo sobre ellos supera ``umbral_deriva`` veces su RMSE de
+        referencia hay deriva y se devuelve False para forzar un reentrenamiento
+        completo. En otro caso ARIMA añade las observaciones con ``append`` (mismos
+        parámetros), los modelos base continúan su recursión y Prophet, si es el
+        mejor modelo, se reajusta partiendo de sus parámetros anteriores.
+        """
+        if not self.best_model or not self.metadata:
+            return False
+        
+        fin = pd.Timestamp(self.metadata['ventana_entrenamiento']['fin'])
+        nuevos = data[data['ds'] > fin]
+        referencia = (self.metricas or {}).get(self.best_model, {}).get('rmse')
+        
+        # Sin días nuevos (datos históricos modificados) o sin referencia: reentrenar
+        if len(nuevos) == 0 or not referencia:
+            return False
+        
+        print(f"🔁 Actualizando modelos con {len(nuevos)} días nuevos...")
+        
+        errores = nuevos['y'].values - self._predict_new_days(data, nuevos)
+        rmse_nuevos = float(np.sqrt(np.mean(errores ** 2)))
+        deriva = rmse_nuevos / referencia
+        
+        if deriva > umbral_deriva:
+            print(f"⚠️ Deriva detectada (RMSE {rmse_nuevos:.2f} vs {referencia:.2f}): reentrenamiento completo")
+            return False
+        
+        if self.arima_model is not None:
+            ultima = self.arima_model.fittedvalues.index[-1]
+            ts_data = data.set_index('ds')['y'].asfreq(GRANULARIDADES[self.granularidad]['frecuencia'])
+            self.arima_model = self.arima_model.append(ts_data[ts_data.index > ultima], refit=False)
+        
+        for metodo in BASELINES:
+            model = getattr(self, f"{metodo}_model")
+            if model is not None:
+                # Los modelos cargados se comparten (memoizados): se actualiza una copia
+                model = copy.deepcopy(model)
+                model.update(data['y'].values[model.n_obs:])
+                setattr(self, f"{metodo}_model", model)
+        
+        if self.best_model == 'prophet':
+            self.prophet_model = fit_prophet(data, init=prophet_warm_start(self.prophet_model), granularidad=self.granularidad)
+        
+        self.actualizacion = {
+            'tipo': 'incremental',
+            'version_base': self.model_version,
+            'dias_nuevos': len(nuevos),
+            'rmse_nuevos': rmse_nuevos,
+            'rmse_referencia': referencia,
+            'deriva': deriva
+        }
         
-        # Guardar información del mejor modelo
-        model_info = {
+        print(f"✅ Modelos actualizados (deriva {deriva:.2f})")
+        return True
+    
+    def train_models(self, data, model_type="auto"):
+        """Entrena el modelo solicitado (auto compara Prophet y ARIMA) midiendo la duración"""
+        inicio = time.perf_counter()
+        self.metricas = None
+        self.hiperparametros = {}
+        self.tiempo_comparacion = None
+        self.actualizacion = None
+        
+        if model_type == "auto":
+            self.compare_models(data)
+        elif model_type == "prophet":
+            self.train_prophet_model(data)
+            self.best_model = "prophet"
+        elif model_type == "arima":
+            self.train_arima_model(data)
+            self.best_model = "arima"
+        elif model_type in BASELINES:
+            self.train_baseline_model(data, model_type)
+            self.best_model = model_type
+        else:
+            raise ValueError("Tipo de modelo no válido")
+        
+        return time.perf_counter() - inicio
+    
+    def save_models(self, data, data_version, duracion_entrenamiento=None):
+        """Registra los modelos entrenados con sus metadatos en el registro versionado"""
+        print("💾 Guardando modelos...")
+        
+        metadata = {
+            'data_version': data_version,
+            'granularidad': self.granularidad,
             'best_model': self.best_model,
-            'timestamp': datetime.now().isoformat()
+            'ventana_entrenamiento': {
+                'inicio': data['ds'].min().strftime('%Y-%m-%d'),
+                'fin': data['ds'].max().strftime('%Y-%m-%d'),
+                'dias': len(data)
+            },
+            'hiperparametros': self.hiperparametros,
+            'metricas': self.metricas,
+            'tiempo_comparacion': self.tiempo_comparacion,
+            'backtest': self.backtest,
+            'actualizacion': self.actualizacion,
+            'duracion_entrenamiento': duracion_entrenamiento
         }
-        joblib.dump(model_info, f"{self.models_dir}/model_info.pkl")
+        
+        self.model_version = self.registry.publish({
+            'prophet_model': self.prophet_model,
+            'arima_model': self.arima_model,
+            'holt_winters_model': self.holt_winters_model,
+            'seasonal_naive_model': self.seasonal_naive_model
+        }, metadata, guardar=save_model)
+        self.metadata = self.registry.get_metadata(self.model_version)
         
         print("✅ Modelos guardados")
+        return self.model_version
     
-    def load_models(self):
-        """Carga modelos guardados"""
+    def load_models(self, data_version=None):
+        """Carga el modelo registrado para la versión de datos indicada
+
+        Lanza ModelNotFoundError si no hay modelos y StaleModelError si el último
+        modelo se entrenó con otros datos, para que el llamador decida reentrenar.
+        """
         print("📂 Cargando modelos...")
         
-        try:
-            self.prophet_model = joblib.load(f"{self.models_dir}/prophet_model.pkl")
-            print("✅ Modelo Prophet cargado")
-        except:
-            print("⚠️ No se pudo cargar modelo Prophet")
-        
-        try:
-            self.arima_model = joblib.load(f"{self.models_dir}/arima_model.pkl")
-            print("✅ Modelo ARIMA cargado")
-        except:
-            print("⚠️ No se pudo cargar modelo ARIMA")
-        
-        try:
-            model_info = joblib.load(f"{self.models_dir}/model_info.pkl")
-            self.best_model = model_info['best_model']
-            print(f"✅ Mejor modelo: {self.best_model}")
-        except:
-            print("⚠️ No se pudo cargar información del modelo")
+        version = self.registry.resolve(data_version)
+        metadata = self.registry.get_metadata(version)
+        
+        # Los artefactos se deserializan (memoizados por ruta) al usarse por primera vez
+        self._modelos = {}
+        self._pendientes = self.registry.artifact_paths(metadata)
+        self.best_model = metadata['best_model']
+        self.metricas = metadata.get('metricas')
+        self.hiperparametros = metadata.get('hiperparametros') or {}
+        self.tiempo_comparacion = metadata.get('tiempo_comparacion')
+        self.backtest = metadata.get('backtest')
+        self.model_version = metadata['version']
+        self.metadata = metadata
+        
+        print(f"✅ Modelos cargados (versión {self.model_version}, mejor modelo: {self.best_model})")
     
-    def get_model_performance(self, data, test_size=30):
+    def get_model_performance(self, data, test_size=None):
         """Obtiene métricas de rendimiento del modelo"""
         if not self.best_model:
             return None
         
+        test_size = test_size or GRANULARIDADES[self.granularidad]['prueba']
         # Dividir datos
         train_data = data.iloc[:-test_size]
         test_data = data.iloc[-test_size:]
@@ -302,6 +572,9 @@ class SalesForecaster:
             # Predicción Prophet
             forecast = self.prophet_model.predict(test_data[['ds']])
             predictions = forecast['yhat'].values
+        elif self.best_model in BASELINES:
+            # Los modelos base se reajustan sobre el periodo de entrenamiento en milisegundos
+            predictions = _candidato_baseline(self.best_model, train_data, test_data, self.granularidad)[1]
         else:
             # Predicción ARIMA
             if self.arima_model:
@@ -0,0 +1,163 @@
+"""
+🌳 Forecasting Jerárquico
+Predicciones por categoría, producto y ciudad reconciliadas con el total
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from app.ml.baseline import BaselineForecaster
+
+NIVELES = ['total', 'categoria', 'producto', 'ciudad']
+METODOS = ['bottom_up', 'top_down']
+
+def _ajustar_bloque(matriz, horizonte, m):
+    """Ajusta a la vez un bloque de series (columnas de la matriz) en un worker"""
+    if matriz.shape[0] < 2 * m:
+        # Historia insuficiente para estacionalidad: media de los días disponibles
+        return np.repeat(matriz.mean(axis=0)[:, None], horizonte, axis=1)
+
+    prediccion = BaselineForecaster('holt_winters', m).fit(matriz).forecast(horizonte)
+    return np.clip(prediccion, 0, None)
+
+def forecast_matrix(matriz, horizonte, m=7, n_jobs=None, tam_bloque=1000):
+    """Predice cada columna de una matriz días × series, por bloques vectorizados en paralelo"""
+    matriz = np.asarray(matriz, dtype=float)
+    n_series = matriz.shape[1]
+    if n_series == 0:
+        return np.empty((0, horizonte))
+
+    bloques = [matriz[:, i:i + tam_bloque] for i in range(0, n_series, tam_bloque)]
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(bloques))
+
+    # Un proceso daemon no puede crear workers: ajuste secuencial
+    if n_jobs == 1 or multiprocessing.current_process().daemon:
+        return np.vstack([_ajustar_bloque(bloque, horizonte, m) for bloque in bloques])
+
+    with ProcessPoolExecutor(max_workers=n_jobs, mp_context=multiprocessing.get_context('spawn')) as executor:
+        resultados = executor.map(_ajustar_bloque, bloques, [horizonte] * len(bloques), [m] * len(bloques))
+        return np.vstack(list(resultados))
+
+def to_wide(ventas, columna, fechas):
+    """Pasa ventas en formato largo (fecha, columna, total) a matriz días × series"""
+    return ventas.pivot_table(
+        index='fecha', columns=columna, values='total', aggfunc='sum', fill_value=0
+    ).reindex(fechas, fill_value=0)
+
+class HierarchicalForecaster:
+    """Forecasting de la jerarquía total → categoría → producto y del desglose por ciudad
+
+    ``bottom_up`` ajusta cada producto y agrega hacia arriba; las ciudades se ajustan
+    por separado y se escalan para sumar el total. ``top_down`` ajusta solo el total
+    y lo reparte según la proporción histórica de cada serie en los últimos
+    ``ventana`` días.
+    """
+
+    def __init__(self, horizonte=30, metodo='bottom_up', ventana=90, n_jobs=None):
+        if metodo not in METODOS:
+            raise ValueError(f"Método de reconciliación no válido: {metodo}")
+
+        self.horizonte = horizonte
+        self.metodo = metodo
+        self.ventana = ventana
+        self.n_jobs = n_jobs
+        self.fechas = None
+        self.series = None
+        self.predicciones = None
+        self.rendimiento = None
+
+    def fit(self, ventas_producto, ventas_ciudad):
+        """Construye las series y las predice
+
+        ``ventas_producto`` tiene columnas (fecha, categoria, product_id, total) y
+        ``ventas_ciudad`` (fecha, ciudad, total), ambas agregadas por día.
+        """
+        ventas_producto = ventas_producto.assign(fecha=pd.to_datetime(ventas_producto['fecha']))
+        ventas_ciudad = ventas_ciudad.assign(fecha=pd.to_datetime(ventas_ciudad['fecha']))
+
+        fechas = pd.date_range(
+            min(ventas_producto['fecha'].min(), ventas_ciudad['fecha'].min()),
+            max(ventas_producto['fecha'].max(), ventas_ciudad['fecha'].max()),
+            freq='D'
+        )
+        productos = to_wide(ventas_producto, 'product_id', fechas)
+        ciudades = to_wide(ventas_ciudad, 'ciudad', fechas)
+        categoria_de = ventas_producto.drop_duplicates('product_id').set_index('product_id')['categoria']
+        categoria_de = categoria_de.reindex(productos.columns)
+
+        # Matriz de agregación producto -> categoría
+        categoria_de = categoria_de.to_numpy(dtype=object)
+        categorias = np.sort(pd.unique(categoria_de))
+        agregacion = (categoria_de[None, :] == categorias[:, None]).astype(float)
+
+        inicio = time.perf_counter()
+        total_historico = productos.values.sum(axis=1)
+
+        if self.metodo == 'bottom_up':
+            pred_productos = forecast_matrix(productos.values, self.horizonte, n_jobs=self.n_jobs)
+            pred_ciudades = forecast_matrix(ciudades.values, self.horizonte, n_jobs=self.n_jobs)
+            pred_categorias = agregacion @ pred_productos
+            pred_total = pred_categorias.sum(axis=0)
+
+            # Reconciliación proporcional: las ciudades suman el total de la jerarquía
+            suma_ciudades = pred_ciudades.sum(axis=0)
+            escala = np.divide(pred_total, suma_ciudades, out=np.zeros_like(pred_total), where=suma_ciudades > 0)
+            pred_ciudades = pred_ciudades * escala
+            ajustadas = productos.shape[1] + ciudades.shape[1]
+        else:
+            pred_total = forecast_matrix(total_historico[:, None], self.horizonte)[0]
+
+            reciente = slice(-self.ventana, None)
+            base = total_historico[reciente].sum()
+            proporcion_productos = productos.values[reciente].sum(axis=0) / base if base else np.zeros(productos.shape[1])
+            base_ciudades = ciudades.values[reciente].sum()
+            proporcion_ciudades = ciudades.values[reciente].sum(axis=0) / base_ciudades if base_ciudades else np.zeros(ciudades.shape[1])
+
+            pred_productos = np.outer(proporcion_productos, pred_total)
+            pred_categorias = agregacion @ pred_productos
+            pred_ciudades = np.outer(proporcion_ciudades, pred_total)
+            ajustadas = 1
+
+        segundos = time.perf_counter() - inicio
+
+        self.fechas = pd.date_range(fechas[-1] + pd.Timedelta(days=1), periods=self.horizonte, freq='D')
+        self.series = pd.DataFrame({
+            'nivel': ['total'] + ['categoria'] * len(categorias) + ['producto'] * productos.shape[1] + ['ciudad'] * ciudades.shape[1],
+            'serie': ['total'] + list(categorias) + list(productos.columns) + list(ciudades.columns),
+            'padre': [None] + ['total'] * len(categorias) + list(categoria_de) + ['total'] * ciudades.shape[1]
+        })
+        self.predicciones = np.vstack([pred_total[None, :], pred_categorias, pred_productos, pred_ciudades])
+        self.rendimiento = {
+            'series_ajustadas': ajustadas,
+            'series_totales': len(self.series),
+            'segundos': segundos,
+            'series_por_segundo': ajustadas / segundos if segundos > 0 else None
+        }
+
+        print(f"🌳 Forecast jerárquico ({self.metodo}): {ajustadas} series ajustadas en {segundos:.1f}s")
+        return self
+
+    def page(self, nivel=None, periods=None, offset=0, limit=50):
+        """Página de series (opcionalmente de un nivel) con sus predicciones"""
+        periods = periods or self.horizonte
+        seleccion = self.series if nivel is None else self.series[self.series['nivel'] == nivel]
+        pagina = seleccion.iloc[offset:offset + limit]
+        fechas = self.fechas[:periods].strftime('%Y-%m-%d')
+
+        return len(seleccion), [
+            {
+                'nivel': fila.nivel,
+                'serie': fila.serie,
+                'padre': fila.padre,
+                'predicciones': [
+                    {'fecha': fecha, 'prediccion': round(float(valor), 2)}
+                    for fecha, valor in zip(fechas, self.predicciones[i, :periods])
+                ]
+            }
+            for i, fila in zip(pagina.index, pagina.itertuples())
+        ]
@@ -0,0 +1,140 @@
+"""
+🔎 Búsqueda de Órdenes ARIMA
+Selecciona (p,d,q) y opcionalmente (P,D,Q,m) por criterio de información
+"""
+
+import itertools
+import multiprocessing
+import os
+import threading
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+from statsmodels.tsa.arima.model import ARIMA
+from statsmodels.tsa.stattools import adfuller
+
+warnings.filterwarnings('ignore')
+
+# Pool de procesos de larga duración compartido por las búsquedas del proceso
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_search_executor():
+    """Pool compartido para ajustar cada nivel en paralelo (None si hay que ajustar en serie)
+
+    Se crea una vez por proceso y se reutiliza en todas las búsquedas (p. ej. en
+    cada corte de backtesting). Un proceso daemon, como los workers de
+    compare_candidates, no puede crear procesos hijos, y con una sola CPU no hay
+    nada que ganar: en esos casos la búsqueda es secuencial.
+    """
+    global _executor
+
+    cpus = os.cpu_count() or 1
+    if multiprocessing.current_process().daemon or cpus < 2:
+        return None
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=cpus, mp_context=multiprocessing.get_context('spawn'))
+        return _executor
+
+def _descartar_executor(executor):
+    """Olvida el pool compartido roto para que la siguiente búsqueda cree otro"""
+    global _executor
+
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+def ndiffs(y, alpha=0.05, max_d=2):
+    """Número de diferenciaciones necesarias según el test ADF"""
+    y = np.asarray(y, dtype=float)
+
+    for d in range(max_d + 1):
+        # Una serie constante no necesita (ni admite) el test
+        if np.ptp(y) == 0 or adfuller(y)[1] < alpha:
+            return d
+        y = np.diff(y)
+
+    return max_d
+
+def candidate_orders(d, max_p=3, max_q=3, seasonal=False, m=7, max_P=1, max_Q=1):
+    """Rejilla de órdenes agrupada por complejidad (p+q+P+Q) creciente"""
+    estacionales = [(0, 0, 0, 0)]
+    if seasonal:
+        estacionales += [
+            (P, 0, Q, m) for P, Q in itertools.product(range(max_P + 1), range(max_Q + 1)) if P or Q
+        ]
+
+    niveles = {}
+    for (p, q), seasonal_order in itertools.product(
+        itertools.product(range(max_p + 1), range(max_q + 1)), estacionales
+    ):
+        complejidad = p + q + seasonal_order[0] + seasonal_order[2]
+        niveles.setdefault(complejidad, []).append(((p, d, q), seasonal_order))
+
+    return [niveles[k] for k in sorted(niveles)]
+
+def evaluate_order(y, order, seasonal_order=(0, 0, 0, 0), criterio='aic'):
+    """Criterio de información de un orden (infinito si el ajuste falla)"""
+    try:
+        resultado = ARIMA(y, order=order, seasonal_order=seasonal_order).fit()
+        valor = getattr(resultado, criterio)
+        return valor if np.isfinite(valor) else np.inf
+    except Exception:
+        return np.inf
+
+def _evaluar_nivel(y, nivel, criterio, executor):
+    """Evalúa todos los órdenes de un nivel (en paralelo si hay executor)"""
+    if executor is None:
+        return [evaluate_order(y, order, seasonal_order, criterio) for order, seasonal_order in nivel]
+
+    try:
+        futuros = [
+            executor.submit(evaluate_order, y, order, seasonal_order, criterio) for order, seasonal_order in nivel
+        ]
+        return [futuro.result() for futuro in futuros]
+    except BrokenProcessPool:
+        # Un worker murió: el nivel se ajusta aquí y el pool compartido se recrea
+        print("⚠️ Pool de búsqueda ARIMA roto, ajustando en serie")
+        _descartar_executor(executor)
+        return _evaluar_nivel(y, nivel, criterio, None)
+
+def search_arima_order(y, max_p=3, max_q=3, seasonal=False, m=7, criterio='aic', paciencia=1, executor=None):
+    """Busca el orden ARIMA con menor criterio de información
+
+    Los órdenes se evalúan por niveles de complejidad creciente y la búsqueda se
+    detiene cuando ``paciencia`` niveles seguidos no mejoran el mejor criterio
+    encontrado. Con ``executor`` (p. ej. ``get_search_executor()``) los órdenes
+    de cada nivel se ajustan en paralelo en sus workers; sin él, uno tras otro.
+    El resultado es el mismo en ambos casos.
+
+    Devuelve un diccionario con ``order``, ``seasonal_order``, el valor del
+    criterio y el número de modelos ajustados.
+    """
+    y = np.asarray(y, dtype=float)
+    d = ndiffs(y)
+    niveles = candidate_orders(d, max_p, max_q, seasonal, m)
+
+    mejor = {'order': (0, d, 0), 'seasonal_order': (0, 0, 0, 0), criterio: np.inf}
+    ajustados = 0
+    sin_mejora = 0
+
+    for nivel in niveles:
+        valores = _evaluar_nivel(y, nivel, criterio, executor)
+        ajustados += len(nivel)
+
+        i = int(np.argmin(valores))
+        if valores[i] < mejor[criterio]:
+            mejor = {'order': nivel[i][0], 'seasonal_order': nivel[i][1], criterio: float(valores[i])}
+            sin_mejora = 0
+        else:
+            sin_mejora += 1
+            if sin_mejora >= paciencia:
+                break
+
+    mejor['modelos_ajustados'] = ajustados
+    return mejor
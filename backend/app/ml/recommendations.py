@@ -5,60 +5,77 @@ Combina collaborative filtering y content-based filtering
 
 import pandas as pd
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.feature_extraction.text import TfidfVectorizer
-from scipy.sparse import csr_matrix
 import implicit
 import warnings
 import joblib
-import os
+import threading
+import time
+from datetime import datetime
+
+from app.ml.registry import ModelRegistry, ModelNotFoundError, REGISTRY_DIR
+from app.ml.user_item_matrix import UserItemMatrix
+from app.ml.similarity_index import SimilarityIndex
 
 warnings.filterwarnings('ignore')
 
+# Vecinos guardados por producto en el índice de similitud
+VECINOS_SIMILARES = 50
+
+def _top_n(scores, n):
+    """Posiciones de los ``n`` mayores scores finitos, de mayor a menor (empates por posición)"""
+    n = min(n, len(scores))
+    if n <= 0:
+        return np.array([], dtype=int)
+    
+    candidatos = np.argpartition(-scores, n - 1)[:n] if n < len(scores) else np.arange(len(scores))
+    top = candidatos[np.lexsort((candidatos, -scores[candidatos]))]
+    return top[np.isfinite(scores[top])]
+
 class RecommendationSystem:
     """Sistema de recomendaciones híbrido"""
     
-    def __init__(self):
+    def __init__(self, registry_dir=REGISTRY_DIR):
         self.user_item_matrix = None
         self.product_similarity = None
         self.user_similarity = None
         self.collaborative_model = None
         self.content_model = None
         self.hybrid_weights = {'collaborative': 0.6, 'content': 0.4}
-        self.models_dir = "app/models"
-        
-        # Crear directorio de modelos si no existe
-        os.makedirs(self.models_dir, exist_ok=True)
+        self.catalogo = {}
+        self._product_index = None
+        self._product_index_ids = None
+        self.registry = ModelRegistry("recommendations", registry_dir=registry_dir)
+        self.model_version = None
     
     def create_user_item_matrix(self, df_spark):
-        """Crea matriz usuario-producto desde Spark DataFrame"""
+        """Crea la matriz usuario-producto dispersa desde Spark DataFrame
+
+        El rating implícito de cada venta depende de cantidad e importe, y se suma
+        por (cliente, producto) en Spark: las compras repetidas aumentan la
+        confianza. Solo viajan las tripletas con interacción.
+        """
+        from pyspark.sql import functions as F
+
         print("📊 Creando matriz usuario-producto...")
         
-        # Convertir a pandas para facilitar el procesamiento
-        df_pandas = df_spark.toPandas()
+        interacciones = df_spark.groupBy('customer_id', 'product_id').agg(
+            F.sum(F.log1p('cantidad') * (1 + F.col('total') / 1000)).alias('rating_implicito')
+        ).toPandas()
         
-        # Crear rating implícito basado en cantidad y frecuencia
-        df_pandas['rating_implicito'] = np.log1p(df_pandas['cantidad']) * \
-                                       (1 + df_pandas['total'] / 1000)
-        
-        # Matriz usuario-producto
-        self.user_item_matrix = df_pandas.pivot_table(
-            index='customer_id',
-            columns='product_id',
-            values='rating_implicito',
-            fill_value=0
+        self.user_item_matrix = UserItemMatrix.from_triples(
+            interacciones['customer_id'],
+            interacciones['product_id'],
+            interacciones['rating_implicito']
         )
         
-        print(f"✅ Matriz creada: {self.user_item_matrix.shape}")
+        print(f"✅ Matriz creada: {self.user_item_matrix.shape} ({self.user_item_matrix.matriz.nnz} interacciones)")
         return self.user_item_matrix
     
     def train_collaborative_filtering(self):
         """Entrena modelo de collaborative filtering"""
         print("🤝 Entrenando collaborative filtering...")
         
-        # Convertir matriz a formato CSR para implicit
-        matrix_csr = csr_matrix(self.user_item_matrix.values)
-        
         # Modelo ALS (Alternating Least Squares)
         self.collaborative_model = implicit.als.AlternatingLeastSquares(
             factors=50,
@@ -67,8 +84,8 @@ class RecommendationSystem:
             random_state=42
         )
         
-        # Entrenar modelo
-        self.collaborative_model.fit(matrix_csr.T)
+        # Entrenar modelo (implicit >= 0.5 espera la matriz clientes × productos)
+        self.collaborative_model.fit(self.user_item_matrix.matriz)
         
         print("✅ Collaborative filtering entrenado")
         return self.collaborative_model
@@ -93,14 +110,15 @@ class RecommendationSystem:
         
         tfidf_matrix = tfidf.fit_transform(productos_pandas['texto_combinado'])
         
-        # Calcular similitud coseno entre productos
-        self.product_similarity = cosine_similarity(tfidf_matrix)
+        # Top-k vecinos por similitud coseno (TF-IDF normalizado), por bloques sin la matriz N × N
+        self.product_similarity = SimilarityIndex.build(tfidf_matrix, k=VECINOS_SIMILARES)
         
-        # Guardar vectorizador
+        # Guardar vectorizador (y el catálogo para responder sin volver a leer los datos)
         self.content_model = {
             'tfidf': tfidf,
             'product_ids': productos_pandas['product_id'].values,
-            'similarity_matrix': self.product_similarity
+            'similarity_index': self.product_similarity,
+            'productos': productos_pandas[['product_id', 'nombre', 'categoria', 'precio']].reset_index(drop=True)
         }
         
         print("✅ Content-based filtering entrenado")
@@ -123,66 +141,107 @@ class RecommendationSystem:
     
     def get_collaborative_recommendations(self, customer_id, n_recommendations=5):
         """Obtiene recomendaciones usando collaborative filtering"""
-        if customer_id not in self.user_item_matrix.index:
-            return [], "Cliente no encontrado"
-        
         # Obtener índice del usuario
-        user_idx = self.user_item_matrix.index.get_loc(customer_id)
+        user_idx = self.user_item_matrix.user_index(customer_id)
+        if user_idx is None:
+            return [], "Cliente no encontrado"
         
-        # Predicciones del modelo ALS
-        recommendations = self.collaborative_model.recommend(
-            user_idx, 
-            self.user_item_matrix.values, 
-            N=n_recommendations
+        # Predicciones del modelo ALS (excluye lo ya comprado con la fila del usuario)
+        product_idxs, scores = self.collaborative_model.recommend(
+            user_idx,
+            self.user_item_matrix.matriz[user_idx],
+            N=n_recommendations,
+            filter_already_liked_items=True
         )
         
         # Convertir a formato legible
         results = []
-        for product_idx, score in recommendations:
-            product_id = self.user_item_matrix.columns[product_idx]
-            results.append((product_id, score))
+        for product_idx, score in zip(product_idxs, scores):
+            product_id = self.user_item_matrix.productos[product_idx]
+            results.append((product_id, float(score)))
         
         return results, "Éxito"
     
+    def recommend_batch(self, customer_ids=None, n_recommendations=10, tam_bloque=1024):
+        """Recomendaciones collaborative para muchos clientes (todos por defecto)
+
+        Puntúa cada bloque de clientes con una sola multiplicación de factores
+        (clientes × factores por factores × productos), excluye lo ya comprado con
+        la máscara de la matriz dispersa y selecciona el top-N con argpartition.
+        Devuelve un generador de ``(customer_id, [(product_id, score), ...])``;
+        los clientes desconocidos reciben ``None``.
+        """
+        matriz = self.user_item_matrix
+        user_factors = np.asarray(self.collaborative_model.user_factors)
+        item_factors = np.asarray(self.collaborative_model.item_factors)
+        
+        if customer_ids is None:
+            customer_ids = matriz.clientes
+        customer_ids = np.asarray(customer_ids, dtype=object)
+        filas = matriz.clientes.get_indexer(customer_ids)
+        productos = matriz.productos.to_numpy()
+        n = min(n_recommendations, matriz.shape[1])
+        
+        for inicio in range(0, len(customer_ids), tam_bloque):
+            ids = customer_ids[inicio:inicio + tam_bloque]
+            bloque = filas[inicio:inicio + tam_bloque]
+            conocidos = bloque >= 0
+            
+            scores = user_factors[bloque[conocidos]] @ item_factors.T
+            
+            # Productos ya comprados fuera del ranking
+            compras = matriz.matriz[bloque[conocidos]]
+            scores[np.repeat(np.arange(compras.shape[0]), np.diff(compras.indptr)), compras.indices] = -np.inf
+            
+            # Top-N sin ordenar toda la fila y luego ordenado por score
+            top = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            orden = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, orden, axis=1)
+            top_scores = np.take_along_axis(top_scores, orden, axis=1)
+            
+            fila = 0
+            for customer_id, conocido in zip(ids, conocidos):
+                if not conocido:
+                    yield customer_id, None
+                    continue
+                
+                validos = np.isfinite(top_scores[fila])
+                yield customer_id, list(zip(productos[top[fila][validos]].tolist(), top_scores[fila][validos].tolist()))
+                fila += 1
+    
+    def _content_index(self):
+        """Índice product_id -> fila de la matriz de similitud (se reconstruye si cambia el modelo)"""
+        product_ids = self.content_model['product_ids']
+        if self._product_index is None or self._product_index_ids is not product_ids:
+            self._product_index = pd.Index(product_ids, name='product_id')
+            self._product_index_ids = product_ids
+        return self._product_index
+    
     def get_content_based_recommendations(self, customer_id, n_recommendations=5):
-        """Obtiene recomendaciones usando content-based filtering"""
-        if customer_id not in self.user_item_matrix.index:
+        """Obtiene recomendaciones usando content-based filtering
+
+        El score de cada producto es su similitud media con los productos comprados:
+        la media de las filas del índice de vecinos de esos productos (el vector de
+        compras del usuario por la matriz). Lo ya comprado se excluye con una máscara.
+        """
+        if self.user_item_matrix.user_index(customer_id) is None:
             return [], "Cliente no encontrado"
         
-        # Obtener productos que el usuario ya compró
-        user_ratings = self.user_item_matrix.loc[customer_id]
-        purchased_products = user_ratings[user_ratings > 0].index.tolist()
+        # Filas de los productos que el usuario ya compró
+        indice = self._content_index()
+        purchased_idx = indice.get_indexer(self.user_item_matrix.purchased_products(customer_id))
+        purchased_idx = purchased_idx[purchased_idx >= 0]
         
-        if not purchased_products:
+        if len(purchased_idx) == 0:
             return [], "Usuario sin historial de compras"
         
-        # Calcular similitud promedio con productos comprados
-        product_scores = {}
+        # Similitud promedio con productos comprados
+        scores = self.content_model['similarity_index'].mean_similarity(purchased_idx)
+        scores[purchased_idx] = -np.inf
         
-        for product_id in self.content_model['product_ids']:
-            if product_id in purchased_products:
-                continue
-            
-            # Obtener índice del producto
-            product_idx = np.where(self.content_model['product_ids'] == product_id)[0][0]
-            
-            # Calcular similitud con productos comprados
-            similarities = []
-            for purchased_product in purchased_products:
-                purchased_idx = np.where(self.content_model['product_ids'] == purchased_product)[0][0]
-                similarity = self.content_model['similarity_matrix'][product_idx][purchased_idx]
-                similarities.append(similarity)
-            
-            # Score promedio
-            if similarities:
-                product_scores[product_id] = np.mean(similarities)
-        
-        # Ordenar y obtener top N
-        recommendations = sorted(
-            product_scores.items(), 
-            key=lambda x: x[1], 
-            reverse=True
-        )[:n_recommendations]
+        # Top N
+        recommendations = [(indice[i], float(scores[i])) for i in _top_n(scores, n_recommendations)]
         
         return recommendations, "Éxito"
     
@@ -201,59 +260,38 @@ class RecommendationSystem:
         if collab_status != "Éxito" and content_status != "Éxito":
             return [], "No se pudieron generar recomendaciones"
         
-        # Combinar scores
-        hybrid_scores = {}
-        
-        # Agregar scores collaborative
-        for product_id, score in collab_recs:
-            if product_id not in hybrid_scores:
-                hybrid_scores[product_id] = {'collaborative': 0, 'content': 0}
-            hybrid_scores[product_id]['collaborative'] = score
-        
-        # Agregar scores content-based
-        for product_id, score in content_recs:
-            if product_id not in hybrid_scores:
-                hybrid_scores[product_id] = {'collaborative': 0, 'content': 0}
-            hybrid_scores[product_id]['content'] = score
-        
-        # Calcular score híbrido
-        final_scores = {}
-        for product_id, scores in hybrid_scores.items():
-            hybrid_score = (
-                scores['collaborative'] * self.hybrid_weights['collaborative'] +
-                scores['content'] * self.hybrid_weights['content']
-            )
-            final_scores[product_id] = hybrid_score
+        # Combinar scores sobre el catálogo (0 para el enfoque que no propone el producto)
+        indice = self._content_index()
+        scores = np.zeros(len(indice))
+        candidatos = np.zeros(len(indice), dtype=bool)
+        
+        for recs, peso in [(collab_recs, self.hybrid_weights['collaborative']),
+                           (content_recs, self.hybrid_weights['content'])]:
+            if not recs:
+                continue
+            product_ids, valores = zip(*recs)
+            idx = indice.get_indexer(product_ids)
+            validos = idx >= 0
+            scores[idx[validos]] += peso * np.asarray(valores, dtype=float)[validos]
+            candidatos[idx[validos]] = True
         
         # Ordenar y obtener top N
-        recommendations = sorted(
-            final_scores.items(), 
-            key=lambda x: x[1], 
-            reverse=True
-        )[:n_recommendations]
+        scores = np.where(candidatos, scores, -np.inf)
+        recommendations = [(indice[i], float(scores[i])) for i in _top_n(scores, n_recommendations)]
         
         return recommendations, "Éxito"
     
     def get_similar_products(self, product_id, n_similar=5):
         """Encuentra productos similares a uno dado"""
-        if product_id not in self.content_model['product_ids']:
+        indice = self._content_index()
+        product_idx = indice.get_indexer([product_id])[0]
+        if product_idx < 0:
             return [], "Producto no encontrado"
         
-        # Obtener índice del producto
-        product_idx = np.where(self.content_model['product_ids'] == product_id)[0][0]
+        # Vecinos precalculados del producto (ya excluyen el mismo producto)
+        similar_indices, similarities = self.content_model['similarity_index'].neighbors(product_idx, n_similar)
         
-        # Obtener similitudes
-        similarities = self.content_model['similarity_matrix'][product_idx]
-        
-        # Obtener índices de productos más similares (excluyendo el mismo producto)
-        similar_indices = np.argsort(similarities)[::-1][1:n_similar+1]
-        
-        # Convertir a formato legible
-        similar_products = []
-        for idx in similar_indices:
-            similar_product_id = self.content_model['product_ids'][idx]
-            similarity_score = similarities[idx]
-            similar_products.append((similar_product_id, similarity_score))
+        similar_products = [(indice[i], float(score)) for i, score in zip(similar_indices, similarities)]
         
         return similar_products, "Éxito"
     
@@ -263,7 +301,7 @@ class RecommendationSystem:
         
         if test_users is None:
             # Seleccionar usuarios aleatorios para evaluación
-            all_users = self.user_item_matrix.index.tolist()
+            all_users = self.user_item_matrix.clientes.tolist()
             test_users = np.random.choice(all_users, min(n_test, len(all_users)), replace=False)
         
         results = {
@@ -274,18 +312,13 @@ class RecommendationSystem:
         
         for user_id in test_users:
             # Obtener productos reales del usuario
-            user_ratings = self.user_item_matrix.loc[user_id]
-            real_products = set(user_ratings[user_ratings > 0].index)
+            real_products = set(self.user_item_matrix.purchased_products(user_id))
             
             if len(real_products) < 2:
                 continue
             
             # Dividir en train/test (leave-one-out)
             for test_product in real_products:
-                # Simular que no conocemos este producto
-                temp_ratings = user_ratings.copy()
-                temp_ratings[test_product] = 0
-                
                 # Generar recomendaciones
                 collab_recs, _ = self.get_collaborative_recommendations(user_id, 10)
                 content_recs, _ = self.get_content_based_recommendations(user_id, 10)
@@ -318,8 +351,13 @@ class RecommendationSystem:
         print("✅ Evaluación completada")
         return evaluation
     
-    def save_models(self):
-        """Guarda los modelos entrenados"""
+    def save_models(self, data_version=None):
+        """Registra los modelos entrenados como una nueva versión del registro
+
+        Todos los artefactos de la versión se escriben en su propio directorio y
+        se publican a la vez, así que un lector nunca mezcla modelos de dos
+        entrenamientos.
+        """
         print("💾 Guardando modelos de recomendaciones...")
         
         models_to_save = {
@@ -329,53 +367,134 @@ class RecommendationSystem:
             'hybrid_weights': self.hybrid_weights
         }
         
-        for name, model in models_to_save.items():
-            if model is not None:
-                joblib.dump(model, f"{self.models_dir}/{name}.pkl")
+        self.model_version = self.registry.publish(models_to_save, {
+            'data_version': data_version,
+            'num_usuarios': self.user_item_matrix.shape[0],
+            'num_productos': self.user_item_matrix.shape[1]
+        })
         
         print("✅ Modelos guardados")
+        return self.model_version
     
-    def load_models(self):
-        """Carga modelos guardados"""
+    def load_models(self, version=None):
+        """Carga una versión registrada (la actual por defecto; ModelNotFoundError si no hay)"""
         print("📂 Cargando modelos de recomendaciones...")
         
-        try:
-            self.user_item_matrix = joblib.load(f"{self.models_dir}/user_item_matrix.pkl")
-            print("✅ Matriz usuario-producto cargada")
-        except:
-            print("⚠️ No se pudo cargar matriz usuario-producto")
-        
-        try:
-            self.collaborative_model = joblib.load(f"{self.models_dir}/collaborative_model.pkl")
-            print("✅ Modelo collaborative cargado")
-        except:
-            print("⚠️ No se pudo cargar modelo collaborative")
-        
-        try:
-            self.content_model = joblib.load(f"{self.models_dir}/content_model.pkl")
-            print("✅ Modelo content-based cargado")
-        except:
-            print("⚠️ No se pudo cargar modelo content-based")
-        
-        try:
-            self.hybrid_weights = joblib.load(f"{self.models_dir}/hybrid_weights.pkl")
-            print("✅ Pesos híbridos cargados")
-        except:
-            print("⚠️ No se pudieron cargar pesos híbridos")
+        version = version or self.registry.resolve()
+        metadata = self.registry.get_metadata(version)
+        
+        artefactos = {
+            nombre: joblib.load(ruta) for nombre, ruta in self.registry.artifact_paths(metadata).items()
+        }
+        if 'user_item_matrix' not in artefactos:
+            raise ModelNotFoundError("No hay modelos de recomendaciones entrenados")
+        
+        self.user_item_matrix = artefactos['user_item_matrix']
+        self.collaborative_model = artefactos.get('collaborative_model')
+        self.content_model = artefactos.get('content_model')
+        self.hybrid_weights = artefactos.get('hybrid_weights', self.hybrid_weights)
+        self.model_version = version
+        
+        # Versiones registradas con la matriz de similitud densa
+        if self.content_model is not None and 'similarity_index' not in self.content_model:
+            self.content_model['similarity_index'] = SimilarityIndex.from_similarity(
+                self.content_model.pop('similarity_matrix'), k=VECINOS_SIMILARES
+            )
+        self.product_similarity = self.content_model['similarity_index'] if self.content_model else None
+        
+        # Catálogo por producto para construir las respuestas
+        productos = self.content_model.get('productos') if self.content_model else None
+        self.catalogo = productos.set_index('product_id').to_dict('index') if productos is not None else {}
+        
+        print(f"✅ Modelos de recomendaciones cargados (versión {version})")
+    
+    def get_product_info(self, product_id):
+        """Nombre, categoría y precio de un producto (None si no está en el catálogo)"""
+        return self.catalogo.get(product_id)
     
     def get_system_stats(self):
         """Obtiene estadísticas del sistema de recomendaciones"""
         if self.user_item_matrix is None:
             return None
         
-        stats = {
-            'num_users': len(self.user_item_matrix.index),
-            'num_products': len(self.user_item_matrix.columns),
-            'matrix_density': (self.user_item_matrix > 0).sum().sum() / \
-                            (self.user_item_matrix.shape[0] * self.user_item_matrix.shape[1]),
-            'avg_ratings_per_user': (self.user_item_matrix > 0).sum(axis=1).mean(),
-            'avg_ratings_per_product': (self.user_item_matrix > 0).sum(axis=0).mean()
-        }
-        
-        return stats
+        return self.user_item_matrix.stats()
+
+class RecommendationService:
+    """Sistema de recomendaciones en memoria compartido entre peticiones
+
+    El sistema se carga en el arranque (``preload``) o en el primer uso. Cuando el
+    registro publica una versión nueva, se carga aparte y se sustituye la
+    referencia de una sola vez: las peticiones en curso terminan con el sistema
+    que obtuvieron y las siguientes usan el nuevo. Las peticiones lo usan en solo
+    lectura.
+    """
+
+    def __init__(self, registry_dir=REGISTRY_DIR):
+        self.registry_dir = registry_dir
+        self.registry = ModelRegistry("recommendations", registry_dir=registry_dir)
+        self.sistema = None
+        self.cargado = None
+        self._version_fallida = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        """Indica si hay un sistema cargado en memoria"""
+        return self.sistema is not None
+
+    def is_stale(self, data_version):
+        """Indica si falta un modelo entrenado con la versión de datos indicada"""
+        return self.registry.is_stale(data_version)
+
+    def get(self):
+        """Sistema de la versión actual del registro (ModelNotFoundError si no hay modelos)"""
+        version = self.registry.current_version()
+        sistema = self.sistema
+        if sistema is not None and version in (sistema.model_version, self._version_fallida):
+            return sistema
+
+        with self._lock:
+            sistema = self.sistema
+            if sistema is not None and version in (sistema.model_version, self._version_fallida):
+                return sistema
+            if version is None:
+                raise ModelNotFoundError("No hay modelos de recomendaciones entrenados")
+
+            inicio = time.perf_counter()
+            nuevo = RecommendationSystem(registry_dir=self.registry_dir)
+            try:
+                nuevo.load_models(version)
+            except Exception as e:
+                # Se sigue sirviendo la versión anterior si la nueva no se puede cargar
+                if sistema is None:
+                    raise
+                self._version_fallida = version
+                print(f"⚠️ No se pudo cargar la versión {version} de recomendaciones: {e}")
+                return sistema
+
+            self.sistema = nuevo
+            self.cargado = datetime.now()
+            print(f"🎯 Recomendaciones en memoria: versión {version} ({time.perf_counter() - inicio:.2f}s)")
+
+        return nuevo
+
+    def preload(self):
+        """Carga el sistema en segundo plano (sin bloquear el arranque del servidor)"""
+        def cargar():
+            try:
+                self.get()
+            except ModelNotFoundError:
+                print("⚠️ Sin modelos de recomendaciones que precargar")
+
+        threading.Thread(target=cargar, daemon=True).start()
+
+_service = None
+_service_lock = threading.Lock()
 
+def get_recommendation_service():
+    """Obtiene el servicio de recomendaciones compartido del servidor"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = RecommendationService()
+    return _service
@@ -0,0 +1,248 @@
+"""
+🗃️ Registro de Modelos
+Almacena modelos entrenados en directorios versionados con sus metadatos
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+
+import joblib
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+REGISTRY_DIR = "app/models/registry"
+
+# Versiones publicadas que se conservan en disco por tipo de modelo
+VERSIONES_CONSERVADAS = 5
+
+def _bloquear(fichero):
+    """Bloqueo exclusivo (bloqueante) de un fichero entre procesos"""
+    if fcntl is not None:
+        fcntl.flock(fichero, fcntl.LOCK_EX)
+        return
+
+    # msvcrt.locking deja de reintentar a los 10 segundos: se vuelve a intentar
+    fichero.seek(0)
+    while True:
+        try:
+            msvcrt.locking(fichero.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue
+
+def _desbloquear(fichero):
+    """Libera el bloqueo tomado con ``_bloquear``"""
+    if fcntl is not None:
+        fcntl.flock(fichero, fcntl.LOCK_UN)
+    else:
+        fichero.seek(0)
+        msvcrt.locking(fichero.fileno(), msvcrt.LK_UNLCK, 1)
+
+class ModelNotFoundError(Exception):
+    """No hay ningún modelo registrado utilizable"""
+
+class StaleModelError(ModelNotFoundError):
+    """El último modelo registrado se entrenó con otra versión de datos"""
+
+    def __init__(self, message, metadata=None):
+        super().__init__(message)
+        self.metadata = metadata
+
+class ModelRegistry:
+    """Registro versionado de modelos de un tipo (p. ej. 'forecast')
+
+    Cada publicación se escribe en ``<registry_dir>/<nombre>/<version>/`` con sus
+    artefactos y un ``metadata.json``. El fichero ``index.json`` apunta a la
+    versión actual y a la versión entrenada para cada versión de datos, de modo
+    que localizar el modelo adecuado es una consulta directa.
+
+    Solo se conservan las ``conservar`` versiones más recientes (todas con
+    ``conservar=None``); las anteriores se borran al publicar.
+    """
+
+    def __init__(self, nombre, registry_dir=REGISTRY_DIR, conservar=VERSIONES_CONSERVADAS):
+        self.nombre = nombre
+        self.conservar = conservar
+        self.directorio = os.path.join(registry_dir, nombre)
+        os.makedirs(self.directorio, exist_ok=True)
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.directorio, "index.json")
+
+    def _read_index(self):
+        """Lee el índice de versiones (vacío si aún no se ha publicado nada)"""
+        try:
+            with open(self._index_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'actual': None, 'por_datos': {}}
+
+    def _write_index(self, index):
+        """Escribe el índice de forma atómica (fichero temporal único + rename)"""
+        descriptor, tmp_path = tempfile.mkstemp(dir=self.directorio, prefix=".index.", suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, 'w') as f:
+                json.dump(index, f, indent=2)
+            os.replace(tmp_path, self._index_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @contextmanager
+    def _index_lock(self):
+        """Bloqueo exclusivo entre procesos para leer, modificar y escribir el índice"""
+        with open(os.path.join(self.directorio, ".index.lock"), 'w') as lock:
+            _bloquear(lock)
+            try:
+                yield
+            finally:
+                _desbloquear(lock)
+
+    def _podar(self, index):
+        """Quita del índice las versiones antiguas y devuelve las que hay que borrar
+
+        Se conservan las ``conservar`` más recientes y siempre la actual.
+        """
+        if self.conservar is None:
+            return []
+
+        versiones = sorted(
+            nombre for nombre in os.listdir(self.directorio)
+            if not nombre.startswith('.') and os.path.isdir(os.path.join(self.directorio, nombre))
+        )
+        conservadas = set(versiones[-self.conservar:]) | {index['actual']}
+        antiguas = [version for version in versiones if version not in conservadas]
+
+        index['por_datos'] = {
+            data_version: version for data_version, version in index['por_datos'].items()
+            if version in conservadas
+        }
+        return antiguas
+
+    def publish(self, artefactos, metadata, guardar=None):
+        """Registra una nueva versión con sus artefactos y la marca como actual
+
+        ``guardar(nombre, artefacto, directorio)`` escribe un artefacto y devuelve el
+        nombre de su fichero; por defecto se usa joblib (``<nombre>.pkl``).
+        """
+        version = datetime.now().strftime('%Y%m%d%H%M%S%f')
+        version_dir = os.path.join(self.directorio, version)
+        tmp_dir = os.path.join(self.directorio, f".tmp-{version}")
+        os.makedirs(tmp_dir)
+
+        try:
+            ficheros = {}
+            for nombre, artefacto in artefactos.items():
+                if artefacto is None:
+                    continue
+                if guardar is not None:
+                    ficheros[nombre] = guardar(nombre, artefacto, tmp_dir)
+                else:
+                    ficheros[nombre] = f"{nombre}.pkl"
+                    joblib.dump(artefacto, os.path.join(tmp_dir, ficheros[nombre]))
+
+            metadata = {
+                **metadata,
+                'version': version,
+                'artefactos': list(ficheros),
+                'ficheros': ficheros,
+                'tamano_artefactos': {
+                    nombre: os.path.getsize(os.path.join(tmp_dir, fichero)) for nombre, fichero in ficheros.items()
+                },
+                'fecha_registro': datetime.now().isoformat()
+            }
+            with open(os.path.join(tmp_dir, "metadata.json"), 'w') as f:
+                json.dump(metadata, f, indent=2, default=str)
+
+            # El directorio solo es visible cuando está completo
+            os.rename(tmp_dir, version_dir)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        # Otro proceso puede estar publicando a la vez: sin el bloqueo se perdería su entrada
+        with self._index_lock():
+            index = self._read_index()
+            index['actual'] = version
+            if metadata.get('data_version'):
+                index['por_datos'][metadata['data_version']] = version
+            antiguas = self._podar(index)
+            self._write_index(index)
+
+            # El índice ya no apunta a ellas: se pueden borrar sin que nadie las resuelva
+            for antigua in antiguas:
+                shutil.rmtree(os.path.join(self.directorio, antigua), ignore_errors=True)
+
+        print(f"🗃️ Modelo '{self.nombre}' registrado: versión {version}")
+        return version
+
+    def current_version(self, data_version=None):
+        """Versión registrada para una versión de datos (o la actual si no se indica)"""
+        index = self._read_index()
+        if data_version is None:
+            return index['actual']
+        return index['por_datos'].get(data_version)
+
+    def get_metadata(self, version=None):
+        """Metadatos de una versión (la actual por defecto)"""
+        version = version or self.current_version()
+        if version is None:
+            raise ModelNotFoundError(f"No hay modelos '{self.nombre}' registrados")
+
+        with open(os.path.join(self.directorio, version, "metadata.json")) as f:
+            return json.load(f)
+
+    def is_stale(self, data_version):
+        """Indica si no hay un modelo entrenado con la versión de datos indicada"""
+        return self.current_version(data_version) is None
+
+    def resolve(self, data_version=None):
+        """Versión a cargar; lanza StaleModelError si solo existe un modelo de otros datos"""
+        if data_version is not None:
+            version = self.current_version(data_version)
+            if version is not None:
+                return version
+
+            actual = self.current_version()
+            if actual is not None:
+                metadata = self.get_metadata(actual)
+                raise StaleModelError(
+                    f"Modelo '{self.nombre}' obsoleto: entrenado con datos "
+                    f"{metadata.get('data_version')}, actuales {data_version}",
+                    metadata
+                )
+            raise ModelNotFoundError(f"No hay modelos '{self.nombre}' registrados")
+
+        version = self.current_version()
+        if version is None:
+            raise ModelNotFoundError(f"No hay modelos '{self.nombre}' registrados")
+        return version
+
+    def artifact_paths(self, metadata):
+        """Rutas de los artefactos de una versión a partir de sus metadatos"""
+        ficheros = metadata.get('ficheros') or {nombre: f"{nombre}.pkl" for nombre in metadata['artefactos']}
+        return {
+            nombre: os.path.join(self.directorio, metadata['version'], fichero)
+            for nombre, fichero in ficheros.items()
+        }
+
+    def load(self, data_version=None, cargar=joblib.load):
+        """Carga artefactos y metadatos del modelo adecuado a la versión de datos"""
+        version = self.resolve(data_version)
+        metadata = self.get_metadata(version)
+
+        artefactos = {
+            nombre: cargar(ruta) for nombre, ruta in self.artifact_paths(metadata).items()
+        }
+
+        return artefactos, metadata
@@ -0,0 +1,76 @@
+"""
+🌊 Perfil de Estacionalidad
+Tendencia y perfiles semanal y mensual de la serie diaria de ventas (descomposición STL)
+"""
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.seasonal import STL
+
+DIAS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+MESES = ["Ene", "Feb", "Mar", "Abr", "May", "Jun", "Jul", "Ago", "Sep", "Oct", "Nov", "Dic"]
+
+def _fuerza(componente, residuo):
+    """Fuerza de un componente (0-1): 1 - Var(residuo) / Var(componente + residuo)"""
+    total = np.var(componente + residuo)
+    return float(max(0.0, 1 - np.var(residuo) / total)) if total > 0 else 0.0
+
+def seasonality_profile(serie, periodo=7):
+    """Descompone la serie diaria (columnas ``ds`` e ``y``) y resume tendencia y estacionalidad
+
+    La tendencia se mide con la pendiente de la componente de tendencia de STL
+    (ventas por día) y la correlación de las ventas con el tiempo; los perfiles son
+    la media de ventas por día de la semana y por mes, junto al efecto estacional
+    semanal estimado por STL.
+    """
+    ds = pd.to_datetime(serie['ds']).reset_index(drop=True)
+    y = serie['y'].to_numpy(dtype=float)
+    t = np.arange(len(y))
+
+    if len(y) < 2 * periodo:
+        raise ValueError(f"Se necesitan al menos {2 * periodo} días para el perfil de estacionalidad")
+
+    descomposicion = STL(pd.Series(y, index=ds), period=periodo, robust=True).fit()
+    tendencia = descomposicion.trend.to_numpy()
+    estacional = descomposicion.seasonal.to_numpy()
+    residuo = descomposicion.resid.to_numpy()
+
+    pendiente = float(np.polyfit(t, tendencia, 1)[0])
+    correlacion = float(np.corrcoef(t, y)[0, 1]) if np.ptp(y) > 0 else 0.0
+
+    semanal = pd.Series(y).groupby(ds.dt.dayofweek).mean()
+    efecto_semanal = pd.Series(estacional).groupby(ds.dt.dayofweek).mean()
+    mensual = pd.Series(y).groupby(ds.dt.month).mean()
+
+    return {
+        "tendencia_general": {
+            "correlacion_tiempo": round(correlacion, 3),
+            "direccion": "creciente" if correlacion > 0 else "decreciente" if correlacion < 0 else "estable",
+            "pendiente_diaria": round(pendiente, 2),
+            "fuerza_tendencia": round(_fuerza(tendencia, residuo), 3)
+        },
+        "estacionalidad_semanal": [
+            {
+                "dia": DIAS[i],
+                "ventas_promedio": round(float(valor), 2),
+                "efecto_estacional": round(float(efecto_semanal[i]), 2)
+            }
+            for i, valor in semanal.items()
+        ],
+        "estacionalidad_mensual": [
+            {"mes": MESES[i - 1], "ventas_promedio": round(float(valor), 2)}
+            for i, valor in mensual.items()
+        ],
+        "fuerza_estacional_semanal": round(_fuerza(estacional, residuo), 3),
+        "patrones": {
+            "mejor_dia": DIAS[semanal.idxmax()],
+            "peor_dia": DIAS[semanal.idxmin()],
+            "mejor_mes": MESES[mensual.idxmax() - 1],
+            "peor_mes": MESES[mensual.idxmin() - 1]
+        },
+        "periodo_analizado": {
+            "inicio": ds.iloc[0].strftime('%Y-%m-%d'),
+            "fin": ds.iloc[-1].strftime('%Y-%m-%d'),
+            "dias": len(y)
+        }
+    }
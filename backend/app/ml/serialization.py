@@ -0,0 +1,144 @@
+"""
+📦 Serialización Compacta de Modelos
+Guarda solo los parámetros ajustados de cada modelo de forecasting
+"""
+
+import functools
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.arima.model import ARIMA
+
+# Prophet solo se importa al guardar o cargar un modelo Prophet: ARIMA no lo necesita
+def _guardar_prophet(modelo, ruta):
+    from prophet.serialize import model_to_json
+
+    with open(ruta, 'w') as f:
+        f.write(model_to_json(modelo))
+
+def _cargar_prophet(ruta):
+    from prophet.serialize import model_from_json
+
+    with open(ruta) as f:
+        return model_from_json(f.read())
+
+def _guardar_arima(modelo, ruta):
+    """Parámetros, especificación y serie observada (sin el estado del optimizador)"""
+    endog = modelo.model.data.orig_endog
+    with open(ruta, 'wb') as f:
+        np.savez(
+            f,
+            params=np.asarray(modelo.params, dtype=float),
+            endog=np.asarray(endog, dtype=float).ravel(),
+            nombre=str(endog.name) if endog.name is not None else '',
+            inicio=str(endog.index[0]),
+            freq=endog.index.freqstr,
+            order=np.array(modelo.model.order),
+            seasonal_order=np.array(modelo.model.seasonal_order),
+            trend=str(modelo.model.trend)
+        )
+
+def _cargar_arima(ruta):
+    """Reconstruye los resultados con el filtro de Kalman sobre los parámetros guardados"""
+    with np.load(ruta) as datos:
+        endog = pd.Series(
+            datos['endog'],
+            index=pd.date_range(str(datos['inicio']), periods=len(datos['endog']), freq=str(datos['freq'])),
+            name=str(datos['nombre']) or None
+        )
+        modelo = ARIMA(
+            endog,
+            order=tuple(int(x) for x in datos['order']),
+            seasonal_order=tuple(int(x) for x in datos['seasonal_order']),
+            trend=str(datos['trend'])
+        )
+        return modelo.filter(datos['params'])
+
+# Artefacto -> (extensión, guardar, cargar); el resto (p. ej. los modelos base, que
+# ya son solo arrays de parámetros) se guarda con joblib
+FORMATOS = {
+    'prophet_model': ('json', _guardar_prophet, _cargar_prophet),
+    'arima_model': ('npz', _guardar_arima, _cargar_arima)
+}
+
+def save_model(nombre, modelo, directorio):
+    """Guarda un artefacto en su formato compacto (o con joblib) y devuelve el nombre del fichero"""
+    if nombre not in FORMATOS:
+        fichero = f"{nombre}.pkl"
+        joblib.dump(modelo, os.path.join(directorio, fichero))
+        return fichero
+
+    extension, guardar, _ = FORMATOS[nombre]
+    fichero = f"{nombre}.{extension}"
+    guardar(modelo, os.path.join(directorio, fichero))
+    return fichero
+
+@functools.lru_cache(maxsize=16)
+def load_model(ruta):
+    """Carga un artefacto (memoizado por ruta; los directorios de versión son inmutables)
+
+    El objeto devuelto se comparte entre llamadas: quien necesite modificarlo
+    debe trabajar sobre una copia.
+    """
+    inicio = time.perf_counter()
+    nombre, extension = os.path.splitext(os.path.basename(ruta))
+
+    # Versiones registradas antes del formato compacto
+    if extension == '.pkl':
+        modelo = joblib.load(ruta)
+    else:
+        modelo = FORMATOS[nombre][2](ruta)
+
+    print(f"📦 {nombre} cargado en {time.perf_counter() - inicio:.3f}s")
+    return modelo
+
+def benchmark(modelos, directorio, repeticiones=5):
+    """Compara tamaño y tiempo de carga del formato compacto frente a joblib
+
+    ``modelos`` es un diccionario artefacto -> modelo ajustado. Devuelve, por
+    artefacto, bytes y segundos de carga (media de ``repeticiones``) en ambos formatos.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    resultados = {}
+
+    for nombre, modelo in modelos.items():
+        if modelo is None or nombre not in FORMATOS:
+            continue
+
+        ruta_pickle = os.path.join(directorio, f"{nombre}.pkl")
+        joblib.dump(modelo, ruta_pickle)
+        ruta_compacta = os.path.join(directorio, save_model(nombre, modelo, directorio))
+
+        tiempos = {}
+        for formato, cargar in [('pickle', lambda: joblib.load(ruta_pickle)),
+                                ('compacto', lambda: FORMATOS[nombre][2](ruta_compacta))]:
+            inicio = time.perf_counter()
+            for _ in range(repeticiones):
+                cargar()
+            tiempos[formato] = (time.perf_counter() - inicio) / repeticiones
+
+        resultados[nombre] = {
+            'bytes_pickle': os.path.getsize(ruta_pickle),
+            'bytes_compacto': os.path.getsize(ruta_compacta),
+            'segundos_carga_pickle': tiempos['pickle'],
+            'segundos_carga_compacto': tiempos['compacto']
+        }
+
+    return resultados
+
+if __name__ == "__main__":
+    # Benchmark sobre el modelo registrado actualmente (ejecutar desde backend/)
+    import json
+    import tempfile
+
+    from app.ml.forecasting import SalesForecaster
+
+    forecaster = SalesForecaster()
+    forecaster.load_models()
+    modelos = {nombre: getattr(forecaster, nombre) for nombre in FORMATOS}
+
+    with tempfile.TemporaryDirectory() as directorio:
+        print(json.dumps(benchmark(modelos, directorio), indent=2))
@@ -0,0 +1,100 @@
+"""
+🧭 Índice de Productos Similares
+Top-k vecinos por producto en formato CSR, construido por bloques de filas
+"""
+
+import numpy as np
+from scipy.sparse import csr_matrix, issparse
+
+class SimilarityIndex:
+    """Los ``k`` productos más similares a cada producto (sin él mismo)
+
+    ``vecinos`` es una matriz CSR productos × productos con como mucho ``k``
+    similitudes positivas por fila; la memoria es O(productos · k) en lugar de
+    O(productos²).
+    """
+
+    def __init__(self, vecinos, k):
+        self.vecinos = vecinos
+        self.k = k
+
+    @classmethod
+    def build(cls, vectores, k=50, tam_bloque=256):
+        """Construye el índice desde vectores normalizados (p. ej. TF-IDF, similitud = coseno)
+
+        Cada bloque de filas calcula su similitud con todo el catálogo, se queda con
+        los ``k`` mejores vecinos y se descarta: nunca se materializa la matriz N × N
+        (cada bloque ocupa ``tam_bloque`` × N floats de 32 bits).
+        """
+        vectores = vectores.astype(np.float32)
+
+        def bloques():
+            for inicio in range(0, vectores.shape[0], tam_bloque):
+                bloque = vectores[inicio:inicio + tam_bloque] @ vectores.T
+                yield inicio, bloque.toarray() if issparse(bloque) else np.asarray(bloque)
+
+        return cls(_top_k_por_bloques(bloques(), vectores.shape[0], k), k)
+
+    @classmethod
+    def from_similarity(cls, similitud, k=50, tam_bloque=256):
+        """Construye el índice desde una matriz de similitud densa ya calculada"""
+        def bloques():
+            for inicio in range(0, similitud.shape[0], tam_bloque):
+                yield inicio, np.array(similitud[inicio:inicio + tam_bloque], dtype=np.float32)
+
+        return cls(_top_k_por_bloques(bloques(), similitud.shape[0], k), k)
+
+    def __len__(self):
+        return self.vecinos.shape[0]
+
+    def neighbors(self, i, n=None):
+        """Vecinos de la fila ``i`` (posiciones y similitudes, de mayor a menor)"""
+        inicio, fin = self.vecinos.indptr[i], self.vecinos.indptr[i + 1]
+        indices, similitudes = self.vecinos.indices[inicio:fin], self.vecinos.data[inicio:fin]
+
+        # Las operaciones de scipy pueden reordenar los índices de la fila: se ordena (k es pequeño)
+        orden = np.lexsort((indices, -similitudes))[:n]
+        return indices[orden], similitudes[orden]
+
+    def mean_similarity(self, filas):
+        """Similitud media de cada producto con los de ``filas`` (0 fuera de los top-k)"""
+        return np.asarray(self.vecinos[filas].mean(axis=0), dtype=float).ravel()
+
+    def nbytes(self):
+        """Memoria del índice (datos, índices y punteros de fila)"""
+        return self.vecinos.data.nbytes + self.vecinos.indices.nbytes + self.vecinos.indptr.nbytes
+
+def _top_k_por_bloques(bloques, n, k):
+    """Ensambla la CSR de top-k vecinos a partir de bloques densos de similitud"""
+    k = min(k, n - 1)
+    datos, indices, longitudes = [], [], []
+
+    for inicio, bloque in bloques:
+        bloque = np.asarray(bloque, dtype=np.float32)
+        filas = np.arange(len(bloque))
+
+        # El propio producto no es vecino de sí mismo
+        bloque[filas, inicio + filas] = -np.inf
+
+        if k <= 0:
+            top = np.empty((len(bloque), 0), dtype=int)
+        else:
+            top = np.argpartition(-bloque, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(bloque, top, axis=1)
+
+        # Solo similitudes positivas (el resto no aporta al score)
+        positivos = top_scores > 0
+        datos.append(top_scores[positivos])
+        indices.append(top[positivos])
+        longitudes.append(positivos.sum(axis=1))
+
+    longitudes = np.concatenate(longitudes) if longitudes else np.zeros(0, dtype=int)
+    indptr = np.concatenate([[0], np.cumsum(longitudes)])
+    return csr_matrix(
+        (
+            np.concatenate(datos) if datos else np.zeros(0, dtype=np.float32),
+            np.concatenate(indices).astype(np.int32) if indices else np.zeros(0, dtype=np.int32),
+            indptr
+        ),
+        shape=(n, n)
+    )
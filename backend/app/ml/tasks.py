@@ -0,0 +1,171 @@
+"""
+🛠️ Tareas de Entrenamiento
+Trabajos ejecutados por los workers de la cola de trabajos
+"""
+
+import json
+import os
+import time
+
+from pyspark.sql import functions as F
+
+from app.utils.data_generator import DataGenerator
+from app.utils.data_version import get_data_version
+from app.utils.cache import versioned_cache
+from app.utils.time_series import get_daily_series, get_series
+from app.ml.forecasting import SalesForecaster
+from app.ml.registry import ModelNotFoundError
+from app.ml.hierarchical import HierarchicalForecaster
+from app.ml.recommendations import RecommendationSystem
+
+# Horizonte calculado para el forecast jerárquico (los endpoints recortan a lo pedido)
+HORIZONTE_JERARQUICO = 30
+
+# Ficheros NDJSON de recomendaciones por lotes (campañas)
+RECOMENDACIONES_DIR = "app/data/recommendations"
+
+def train_forecast(model_type="auto", incremental=True, granularity="D"):
+    """Actualiza o entrena y registra los modelos de forecasting con los datos actuales
+
+    Con ``incremental`` se intenta primero añadir los periodos nuevos al último
+    modelo registrado; solo si hay deriva (o no hay modelo) se reentrena desde cero.
+    Las granularidades semanal y mensual se ajustan sobre la serie diaria cacheada
+    remuestreada.
+    """
+    # La versión se fija antes de leer para no registrar datos más nuevos con una versión antigua
+    data_version = get_data_version()
+    
+    time_series_data = get_series(granularity, version=data_version)
+    
+    forecaster = SalesForecaster(granularity)
+    actualizado = False
+    if incremental:
+        try:
+            forecaster.load_models()
+            if model_type in ("auto", forecaster.best_model):
+                inicio = time.perf_counter()
+                actualizado = forecaster.update_models(time_series_data)
+                duracion = time.perf_counter() - inicio
+        except ModelNotFoundError:
+            pass
+    
+    if not actualizado:
+        forecaster = SalesForecaster(granularity)
+        duracion = forecaster.train_models(time_series_data, model_type)
+        
+        # El backtesting reutiliza los ajustes de cortes anteriores: se ejecuta en cada
+        # reentrenamiento (las series semanales y mensuales son demasiado cortas para sus cortes)
+        if granularity == "D":
+            try:
+                forecaster.backtest_models(time_series_data)
+            except Exception as e:
+                print(f"⚠️ Error en backtesting: {e}")
+    
+    version = forecaster.save_models(time_series_data, data_version, duracion)
+    
+    return {
+        'version_modelo': version,
+        'data_version': data_version,
+        'granularidad': granularity,
+        'mejor_modelo': forecaster.best_model,
+        'metricas': forecaster.metricas,
+        'actualizacion': forecaster.actualizacion,
+        'duracion_entrenamiento': round(duracion, 2)
+    }
+
+def backtest_forecast(horizonte=30, n_cortes=8, ventana="expanding", tam_ventana=180):
+    """Backtesting con origen móvil a medida sobre los datos actuales"""
+    time_series_data = get_daily_series()
+    
+    forecaster = SalesForecaster()
+    return forecaster.backtest_models(
+        time_series_data,
+        horizonte=horizonte,
+        n_cortes=n_cortes,
+        ventana=ventana,
+        tam_ventana=tam_ventana
+    )
+
+def train_recommendations():
+    """Entrena y registra el sistema de recomendaciones híbrido"""
+    data_version = get_data_version()
+    
+    data_generator = DataGenerator()
+    productos_df, clientes_df, ventas_df = data_generator.load_data()
+    df_completo = data_generator.get_combined_data()
+    
+    try:
+        rec_system = RecommendationSystem()
+        rec_system.train_hybrid_model(df_completo, productos_df)
+    finally:
+        data_generator.stop_spark()
+    
+    version = rec_system.save_models(data_version)
+    
+    stats = rec_system.get_system_stats()
+    return {
+        'version_modelo': version,
+        'data_version': data_version,
+        'num_usuarios': int(stats['num_users']),
+        'num_productos': int(stats['num_products']),
+        'bytes_matriz': stats['matrix_bytes'],
+        'bytes_matriz_densa': stats['dense_matrix_bytes']
+    }
+
+def batch_recommendations(limit=10, tam_bloque=1024):
+    """Top-N collaborative de todos los clientes en un fichero NDJSON (una línea por cliente)"""
+    rec_system = RecommendationSystem()
+    rec_system.load_models()
+    
+    os.makedirs(RECOMENDACIONES_DIR, exist_ok=True)
+    ruta = os.path.join(RECOMENDACIONES_DIR, f"{rec_system.model_version}_top{limit}.ndjson")
+    
+    inicio = time.perf_counter()
+    usuarios = 0
+    with open(f"{ruta}.tmp", 'w') as f:
+        for customer_id, recomendaciones in rec_system.recommend_batch(None, limit, tam_bloque):
+            f.write(json.dumps({
+                'customer_id': customer_id,
+                'recomendaciones': [
+                    {'product_id': product_id, 'score': round(score, 3)} for product_id, score in recomendaciones
+                ]
+            }) + "\n")
+            usuarios += 1
+    os.replace(f"{ruta}.tmp", ruta)
+    duracion = time.perf_counter() - inicio
+    
+    return {
+        'version_modelo': rec_system.model_version,
+        'fichero': ruta,
+        'usuarios': usuarios,
+        'duracion': round(duracion, 3),
+        'usuarios_por_segundo': round(usuarios / duracion, 1) if duracion > 0 else None
+    }
+
+def forecast_hierarchical(metodo="bottom_up"):
+    """Calcula y cachea el forecast jerárquico de la versión de datos actual"""
+    data_version = get_data_version()
+    
+    def calcular():
+        data_generator = DataGenerator()
+        data_generator.load_data()
+        df_completo = data_generator.get_combined_data()
+        
+        try:
+            # Series diarias agregadas en Spark: solo viajan (fecha, grupo, total)
+            ventas_producto = df_completo.groupBy('fecha', 'categoria', 'product_id') \
+                .agg(F.sum('total').alias('total')).toPandas()
+            ventas_ciudad = df_completo.groupBy('fecha', 'ciudad') \
+                .agg(F.sum('total').alias('total')).toPandas()
+        finally:
+            data_generator.stop_spark()
+        
+        return HierarchicalForecaster(HORIZONTE_JERARQUICO, metodo).fit(ventas_producto, ventas_ciudad)
+    
+    forecaster = versioned_cache.get_or_compute(f"forecast_jerarquico_{metodo}", calcular, version=data_version)
+    
+    return {
+        'data_version': data_version,
+        'metodo': metodo,
+        **forecaster.rendimiento
+    }
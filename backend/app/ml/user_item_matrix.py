@@ -0,0 +1,118 @@
+"""
+🧮 Matriz Usuario-Producto Dispersa
+Interacciones cliente × producto en formato CSR con los mapas id <-> índice
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+class UserItemMatrix:
+    """Matriz CSR clientes × productos
+
+    ``clientes`` y ``productos`` son índices de pandas con el id de cada fila y
+    columna; solo se almacenan las interacciones, así que la memoria crece con el
+    número de compras y no con clientes × productos.
+    """
+
+    def __init__(self, matriz, clientes, productos):
+        self.matriz = csr_matrix(matriz, dtype=np.float32)
+        self.clientes = pd.Index(clientes, name='customer_id')
+        self.productos = pd.Index(productos, name='product_id')
+
+    @classmethod
+    def from_triples(cls, clientes, productos, pesos):
+        """Construye la matriz desde tripletas (cliente, producto, peso); los duplicados se suman"""
+        codigos_clientes, ids_clientes = pd.factorize(pd.Series(clientes), sort=True)
+        codigos_productos, ids_productos = pd.factorize(pd.Series(productos), sort=True)
+
+        matriz = csr_matrix(
+            (np.asarray(pesos, dtype=np.float32), (codigos_clientes, codigos_productos)),
+            shape=(len(ids_clientes), len(ids_productos))
+        )
+        matriz.sum_duplicates()
+        return cls(matriz, ids_clientes, ids_productos)
+
+    @property
+    def shape(self):
+        return self.matriz.shape
+
+    def user_index(self, customer_id):
+        """Fila de un cliente (None si no tiene compras)"""
+        i = self.clientes.get_indexer([customer_id])[0]
+        return int(i) if i >= 0 else None
+
+    def purchased_indices(self, i):
+        """Columnas con interacción de la fila ``i``"""
+        return self.matriz.indices[self.matriz.indptr[i]:self.matriz.indptr[i + 1]]
+
+    def purchased_products(self, customer_id):
+        """Productos comprados por un cliente (lista vacía si no existe)"""
+        i = self.user_index(customer_id)
+        return [] if i is None else self.productos[self.purchased_indices(i)].tolist()
+
+    def nbytes(self):
+        """Memoria de la matriz CSR (datos, índices y punteros de fila)"""
+        return self.matriz.data.nbytes + self.matriz.indices.nbytes + self.matriz.indptr.nbytes
+
+    def dense_nbytes(self):
+        """Memoria que ocuparía la misma matriz densa en float64 (como el pivot_table)"""
+        return self.shape[0] * self.shape[1] * 8
+
+    def stats(self):
+        """Tamaño, densidad e interacciones medias por cliente y por producto"""
+        n_clientes, n_productos = self.shape
+        nnz = self.matriz.nnz
+        return {
+            'num_users': n_clientes,
+            'num_products': n_productos,
+            'matrix_density': nnz / (n_clientes * n_productos) if nnz else 0.0,
+            'avg_ratings_per_user': nnz / n_clientes if n_clientes else 0.0,
+            'avg_ratings_per_product': nnz / n_productos if n_productos else 0.0,
+            'matrix_bytes': self.nbytes(),
+            'dense_matrix_bytes': self.dense_nbytes()
+        }
+
+def benchmark(interacciones):
+    """Compara la matriz CSR con el pivot_table denso sobre las mismas interacciones
+
+    ``interacciones`` tiene columnas ``customer_id``, ``product_id`` y
+    ``rating_implicito``. Devuelve bytes y segundos de construcción de cada formato.
+    """
+    inicio = time.perf_counter()
+    dispersa = UserItemMatrix.from_triples(
+        interacciones['customer_id'], interacciones['product_id'], interacciones['rating_implicito']
+    )
+    segundos_dispersa = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    densa = interacciones.pivot_table(
+        index='customer_id', columns='product_id', values='rating_implicito', aggfunc='sum', fill_value=0
+    )
+    segundos_densa = time.perf_counter() - inicio
+
+    return {
+        'forma': list(dispersa.shape),
+        'interacciones': int(dispersa.matriz.nnz),
+        'bytes_dispersa': dispersa.nbytes(),
+        'bytes_densa': int(densa.memory_usage(index=False).sum()),
+        'segundos_dispersa': segundos_dispersa,
+        'segundos_densa': segundos_densa
+    }
+
+if __name__ == "__main__":
+    # Benchmark sobre las ventas actuales (ejecutar desde backend/)
+    import json
+
+    from app.utils.data_generator import DataGenerator
+
+    data_generator = DataGenerator()
+    try:
+        ventas = data_generator.get_combined_data().select('customer_id', 'product_id', 'cantidad', 'total').toPandas()
+    finally:
+        data_generator.stop_spark()
+
+    ventas['rating_implicito'] = np.log1p(ventas['cantidad']) * (1 + ventas['total'] / 1000)
+    print(json.dumps(benchmark(ventas), indent=2))
@@ -0,0 +1,121 @@
+"""
+💾 Caché por Versión de Datos
+Materializa resultados derivados de los datasets una vez por versión de datos
+"""
+
+import glob
+import os
+import tempfile
+import threading
+
+import joblib
+
+from app.utils.data_version import get_data_version
+
+CACHE_DIR = "app/data/cache"
+
+def dump_atomic(valor, ruta):
+    """Serializa ``valor`` en ``ruta`` de forma atómica
+
+    Se escribe en un temporal único del mismo directorio y se renombra, así que
+    varios procesos pueden escribir la misma ruta sin pisarse el temporal y un
+    lector nunca ve un fichero a medias.
+    """
+    directorio = os.path.dirname(ruta) or '.'
+    os.makedirs(directorio, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=directorio, prefix=f".{os.path.basename(ruta)}.", suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as fichero:
+            joblib.dump(valor, fichero)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+class VersionedCache:
+    """Caché en memoria y en disco de resultados indexados por nombre y versión de datos
+
+    En memoria se conserva solo la última versión de cada resultado; en disco se
+    guarda como ``<nombre>-<version>.pkl`` para sobrevivir a reinicios y, al
+    escribir una versión nueva, se borran las anteriores del mismo nombre.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._memoria = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _lock_de(self, nombre):
+        """Lock por nombre para no calcular dos veces el mismo resultado"""
+        with self._lock:
+            return self._locks.setdefault(nombre, threading.Lock())
+
+    def _ruta(self, nombre, version):
+        if '-' in nombre:
+            raise ValueError(f"El nombre de caché no puede contener '-': {nombre}")
+        return os.path.join(self.cache_dir, f"{nombre}-{version}.pkl")
+
+    def get(self, nombre, version=None):
+        """Devuelve el resultado cacheado (o None) sin calcularlo"""
+        version = version or get_data_version()
+
+        entrada = self._memoria.get(nombre)
+        if entrada is not None and entrada[0] == version:
+            return entrada[1]
+
+        ruta = self._ruta(nombre, version)
+        if os.path.exists(ruta):
+            valor = joblib.load(ruta)
+            self._memoria[nombre] = (version, valor)
+            return valor
+
+        return None
+
+    def get_or_compute(self, nombre, calcular, version=None, persistir=True, valido=None):
+        """Devuelve el resultado de la versión de datos actual, calculándolo si no existe
+
+        ``valido`` permite descartar un resultado cacheado que no sirve para la
+        petición actual (p. ej. un horizonte de predicción más corto) y recalcularlo.
+        """
+        version = version or get_data_version()
+
+        def _sirve(valor):
+            return valor is not None and (valido is None or valido(valor))
+
+        valor = self.get(nombre, version)
+        if _sirve(valor):
+            return valor
+
+        with self._lock_de(nombre):
+            valor = self.get(nombre, version)
+            if _sirve(valor):
+                return valor
+
+            valor = calcular()
+
+            if persistir:
+                ruta = self._ruta(nombre, version)
+                dump_atomic(valor, ruta)
+                self._podar(nombre, ruta)
+
+            self._memoria[nombre] = (version, valor)
+
+        return valor
+
+    def _podar(self, nombre, actual):
+        """Borra del disco las demás versiones de ``nombre``"""
+        for ruta in glob.glob(os.path.join(glob.escape(self.cache_dir), f"{glob.escape(nombre)}-*.pkl")):
+            if ruta != actual:
+                try:
+                    os.remove(ruta)
+                except FileNotFoundError:
+                    pass
+
+    def invalidate(self, nombre):
+        """Elimina un resultado de la caché en memoria"""
+        self._memoria.pop(nombre, None)
+
+# Caché compartida por los endpoints
+versioned_cache = VersionedCache()
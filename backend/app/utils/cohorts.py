@@ -0,0 +1,167 @@
+"""
+📅 Motor de Cohortes
+Matriz de retención mensual con meses como enteros y actualización incremental
+"""
+
+import numpy as np
+import pandas as pd
+
+# Bits reservados para el mes en la clave (cliente, mes); año 2100 -> 25200 < 2**16
+BITS_MES = 16
+
+def month_index(fechas):
+    """Convierte fechas en un índice entero de mes (año * 12 + mes - 1)"""
+    fechas = pd.to_datetime(pd.Series(fechas))
+    return (fechas.dt.year * 12 + fechas.dt.month - 1).to_numpy(dtype=np.int64)
+
+def month_label(indice):
+    """Etiqueta 'YYYY-MM' de un índice entero de mes"""
+    return f"{indice // 12}-{indice % 12 + 1:02d}"
+
+class CohortRetention:
+    """Matriz de clientes activos por cohorte (mes de primera compra) y periodo
+
+    ``matriz[c, p]`` es el número de clientes distintos de la cohorte ``mes_base + c``
+    que compraron ``p`` meses después de su primera compra. La columna 0 es el
+    tamaño de cada cohorte.
+    """
+
+    def __init__(self):
+        self.clientes = pd.Index([])
+        self.primer_mes = np.empty(0, dtype=np.int64)
+        self.ultima_compra = np.empty(0, dtype='datetime64[ns]')
+        self.mes_base = None
+        self.matriz = np.zeros((0, 0), dtype=np.int64)
+        self.ultima_fecha = None
+        self.num_ventas = 0
+        self.version = None
+
+        # Pares (cliente, mes) ya contabilizados en el último mes con datos
+        self._pares_recientes = np.empty(0, dtype=np.int64)
+
+    @staticmethod
+    def _pares(codigos, meses):
+        """Claves únicas (cliente, mes) empaquetadas en un entero"""
+        return np.unique((codigos.astype(np.int64) << BITS_MES) | meses)
+
+    def build(self, ventas):
+        """Construye la matriz completa desde un DataFrame con customer_id y fecha"""
+        codigos, clientes = pd.factorize(ventas['customer_id'])
+        fechas = pd.to_datetime(ventas['fecha']).to_numpy()
+        meses = month_index(fechas)
+
+        # Pares distintos ordenados por cliente y mes: el primero de cada cliente es su cohorte
+        pares = self._pares(codigos, meses)
+        codigo_par = pares >> BITS_MES
+        mes_par = pares & ((1 << BITS_MES) - 1)
+        _, primeros = np.unique(codigo_par, return_index=True)
+
+        self.clientes = pd.Index(clientes)
+        self.primer_mes = mes_par[primeros]
+        self.ultima_compra = np.full(len(clientes), np.datetime64('NaT'), dtype='datetime64[ns]')
+        np.maximum.at(self.ultima_compra.view(np.int64), codigos, fechas.astype('datetime64[ns]').view(np.int64))
+
+        self.mes_base = int(self.primer_mes.min())
+        self.matriz = np.zeros((0, 0), dtype=np.int64)
+        self._acumular(self.primer_mes[codigo_par], mes_par)
+
+        self.ultima_fecha = pd.Timestamp(fechas.max())
+        self.num_ventas = len(ventas)
+        self._pares_recientes = pares[mes_par == mes_par.max()]
+        return self
+
+    def update(self, nuevas_ventas):
+        """Incorpora ventas posteriores a ``ultima_fecha`` tocando solo las celdas afectadas
+
+        Devuelve False si las ventas no son incrementales (meses anteriores al último
+        mes procesado) y la matriz debe reconstruirse.
+        """
+        if nuevas_ventas.empty:
+            return True
+
+        fechas = pd.to_datetime(nuevas_ventas['fecha']).to_numpy()
+        meses = month_index(fechas)
+        ultimo_mes = int(month_index([self.ultima_fecha])[0])
+        if meses.min() < ultimo_mes:
+            return False
+
+        # Códigos de cliente, registrando los clientes nuevos con su cohorte
+        codigos = self.clientes.get_indexer(nuevas_ventas['customer_id'])
+        nuevos = codigos < 0
+        if nuevos.any():
+            ids_nuevos, codigos_nuevos = np.unique(
+                nuevas_ventas['customer_id'].to_numpy()[nuevos], return_inverse=True
+            )
+            primer_mes_nuevos = np.full(len(ids_nuevos), np.iinfo(np.int64).max)
+            np.minimum.at(primer_mes_nuevos, codigos_nuevos, meses[nuevos])
+
+            codigos[nuevos] = len(self.clientes) + codigos_nuevos
+            self.clientes = self.clientes.append(pd.Index(ids_nuevos))
+            self.primer_mes = np.concatenate([self.primer_mes, primer_mes_nuevos])
+            self.ultima_compra = np.concatenate([
+                self.ultima_compra,
+                np.full(len(ids_nuevos), np.datetime64('NaT'), dtype='datetime64[ns]')
+            ])
+
+        np.maximum.at(self.ultima_compra.view(np.int64), codigos, fechas.astype('datetime64[ns]').view(np.int64))
+
+        # Solo los pares (cliente, mes) que no se habían contado ya
+        pares = self._pares(codigos, meses)
+        pares = pares[~np.isin(pares, self._pares_recientes, assume_unique=True)]
+        codigo_par = pares >> BITS_MES
+        mes_par = pares & ((1 << BITS_MES) - 1)
+        self._acumular(self.primer_mes[codigo_par], mes_par)
+
+        # Mantener solo los pares del último mes con datos
+        nuevo_ultimo_mes = int(meses.max())
+        if nuevo_ultimo_mes == ultimo_mes:
+            self._pares_recientes = np.union1d(self._pares_recientes, pares)
+        else:
+            self._pares_recientes = pares[mes_par == nuevo_ultimo_mes]
+
+        self.ultima_fecha = max(self.ultima_fecha, pd.Timestamp(fechas.max()))
+        self.num_ventas += len(nuevas_ventas)
+        return True
+
+    def _acumular(self, cohortes, meses):
+        """Suma 1 en cada celda (cohorte, periodo), ampliando la matriz si hace falta"""
+        if len(cohortes) == 0:
+            return
+
+        filas = cohortes - self.mes_base
+        periodos = meses - cohortes
+
+        n_filas = max(self.matriz.shape[0], int(filas.max()) + 1)
+        n_columnas = max(self.matriz.shape[1], int(periodos.max()) + 1)
+        if (n_filas, n_columnas) != self.matriz.shape:
+            matriz = np.zeros((n_filas, n_columnas), dtype=np.int64)
+            matriz[:self.matriz.shape[0], :self.matriz.shape[1]] = self.matriz
+            self.matriz = matriz
+
+        np.add.at(self.matriz, (filas, periodos), 1)
+
+    @property
+    def tamanos_cohorte(self):
+        """Tamaño de cada cohorte no vacía indexado por etiqueta 'YYYY-MM'"""
+        tamanos = self.matriz[:, 0] if self.matriz.size else np.empty(0, dtype=np.int64)
+        filas = np.flatnonzero(tamanos)
+        return pd.Series(
+            tamanos[filas],
+            index=[month_label(self.mes_base + fila) for fila in filas]
+        )
+
+    def retention_table(self):
+        """Tasa de retención por cohorte (filas) y periodo en meses (columnas)"""
+        tamanos = self.matriz[:, 0] if self.matriz.size else np.empty(0, dtype=np.int64)
+        filas = np.flatnonzero(tamanos)
+        tasas = self.matriz[filas] / tamanos[filas, None]
+
+        return pd.DataFrame(
+            tasas,
+            index=[month_label(self.mes_base + fila) for fila in filas],
+            columns=np.arange(self.matriz.shape[1])
+        )
+
+    def active_customers(self, desde):
+        """Número de clientes con alguna compra a partir de ``desde``"""
+        return int((self.ultima_compra >= np.datetime64(pd.Timestamp(desde), 'ns')).sum())
@@ -0,0 +1,259 @@
+"""
+🗂️ Almacén de Características de Clientes
+Perfil precalculado por cliente (demografía, RFM, categorías, canales, productos
+favoritos y serie temporal de compras) indexado por customer_id
+"""
+
+import json
+import os
+import threading
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from app.utils.cache import dump_atomic
+from app.utils.data_version import get_data_version
+from app.utils.sketches import KLLSketch, tie_breaker
+
+STORE_DIR = "app/data/customer_store"
+
+class CustomerStore:
+    """Tabla columnar de perfiles de cliente con índice de offsets por customer_id
+
+    Cada tabla de detalle (compras temporales, categorías, canales, productos) está
+    ordenada por cliente, de modo que las filas del cliente en la posición ``i`` son
+    ``tabla[offsets[i]:offsets[i + 1]]``.
+    """
+
+    TABLAS = ('compras_temporales', 'compras_categoria', 'compras_canal', 'productos_favoritos')
+
+    def __init__(self, version, perfiles, tablas, offsets, metadata):
+        self.version = version
+        self.perfiles = perfiles
+        self.tablas = tablas
+        self.offsets = offsets
+        self.metadata = metadata
+
+        # Índice customer_id -> posición en la tabla de perfiles
+        self.indice = {customer_id: i for i, customer_id in enumerate(perfiles['customer_id'])}
+        self._rfm_sketches = None
+
+    @classmethod
+    def build(cls, df_spark, version):
+        """Construye el almacén agregando el dataset combinado en Spark"""
+        from pyspark.sql import functions as F
+
+        print("🗂️ Construyendo almacén de clientes...")
+
+        # Perfil: demografía + métricas de compra (una fila por cliente)
+        perfiles = df_spark.groupBy('customer_id').agg(
+            F.first('edad').alias('edad'),
+            F.first('genero').alias('genero'),
+            F.first('ciudad').alias('ciudad'),
+            F.first('segmento').alias('segmento'),
+            F.first('fecha_registro').alias('fecha_registro'),
+            F.sum('total').alias('ventas_totales'),
+            F.count('venta_id').alias('num_transacciones'),
+            F.sum('cantidad').alias('cantidad_total'),
+            F.sum('margen').alias('margen_total'),
+            F.max('fecha').alias('ultima_compra')
+        ).toPandas()
+
+        # Tablas de detalle agregadas por cliente
+        detalle = {
+            'compras_temporales': df_spark.groupBy('customer_id', 'fecha').agg(
+                F.sum('total').alias('total'),
+                F.sum('cantidad').alias('cantidad')
+            ),
+            'compras_categoria': df_spark.groupBy('customer_id', 'categoria').agg(
+                F.sum('total').alias('total'),
+                F.sum('cantidad').alias('cantidad')
+            ),
+            'compras_canal': df_spark.groupBy('customer_id', 'canal').agg(
+                F.sum('total').alias('total'),
+                F.count('venta_id').alias('transacciones')
+            ),
+            'productos_favoritos': df_spark.groupBy('customer_id', 'product_id', 'nombre').agg(
+                F.sum('total').alias('total'),
+                F.sum('cantidad').alias('cantidad')
+            )
+        }
+
+        store = cls.from_frames(
+            version, perfiles, {nombre: df_detalle.toPandas() for nombre, df_detalle in detalle.items()}
+        )
+
+        print(f"✅ Almacén de clientes construido: {len(store.perfiles)} clientes")
+        return store
+
+    @classmethod
+    def from_frames(cls, version, perfiles, detalle):
+        """Ordena los perfiles y las tablas de detalle (pandas) y calcula los offsets por cliente"""
+        perfiles = perfiles.sort_values('customer_id').reset_index(drop=True)
+
+        # RFM respecto a la fecha más reciente del dataset
+        fecha_max = perfiles['ultima_compra'].max()
+        perfiles['recency'] = (fecha_max - perfiles['ultima_compra']).dt.days
+        perfiles['frequency'] = perfiles['num_transacciones']
+        perfiles['monetary'] = perfiles['ventas_totales']
+
+        codigos = pd.Index(perfiles['customer_id'])
+        tablas = {}
+        offsets = {}
+
+        for nombre, tabla in detalle.items():
+            tabla = tabla.copy()
+            tabla['codigo'] = codigos.get_indexer(tabla['customer_id'])
+
+            # Serie temporal en orden cronológico, el resto por importe descendente
+            if nombre == 'compras_temporales':
+                tabla = tabla.sort_values(['codigo', 'fecha'])
+            elif nombre == 'compras_canal':
+                tabla = tabla.sort_values(['codigo', 'canal'])
+            else:
+                tabla = tabla.sort_values(['codigo', 'total'], ascending=[True, False])
+
+            tabla = tabla.reset_index(drop=True)
+            offsets[nombre] = np.searchsorted(
+                tabla['codigo'].values, np.arange(len(perfiles) + 1)
+            ).astype(np.int64)
+            tablas[nombre] = tabla.drop(columns=['customer_id', 'codigo'])
+
+        metadata = {
+            'version': version,
+            'fecha_max': fecha_max.isoformat(),
+            'num_clientes': len(perfiles)
+        }
+
+        return cls(version, perfiles, tablas, offsets, metadata)
+
+    @property
+    def fecha_max(self):
+        """Fecha más reciente del dataset con el que se construyó el almacén"""
+        return pd.Timestamp(self.metadata['fecha_max'])
+
+    def get_customer(self, customer_id):
+        """Devuelve el perfil y las tablas de detalle de un cliente (o None si no existe)"""
+        posicion = self.indice.get(customer_id)
+        if posicion is None:
+            return None
+
+        resultado = {'perfil': self.perfiles.iloc[posicion]}
+        for nombre, tabla in self.tablas.items():
+            inicio, fin = self.offsets[nombre][posicion], self.offsets[nombre][posicion + 1]
+            resultado[nombre] = tabla.iloc[inicio:fin]
+
+        return resultado
+
+    def rfm_values(self):
+        """Recency, frequency y monetary con los empates de días y compras deshechos
+
+        Se suma a cada valor entero un desempate determinista en [0, 1) por
+        cliente (como ``rank(method='first')``), así un valor muy repetido se
+        reparte entre quintiles en lugar de dejar quintiles vacíos.
+        """
+        desempate = tie_breaker(self.perfiles['customer_id'])
+        return {
+            'recency': self.perfiles['recency'].to_numpy() + desempate,
+            'frequency': self.perfiles['frequency'].to_numpy() + desempate,
+            'monetary': self.perfiles['monetary'].to_numpy(dtype=np.float64)
+        }
+
+    def rfm_sketches(self):
+        """Sketches KLL de recency, frequency y monetary (umbrales RFM sin ordenar la tabla)
+
+        Se construyen una vez por versión de datos y se guardan con el almacén.
+        """
+        if self._rfm_sketches is None:
+            self._rfm_sketches = {
+                variable: KLLSketch(seed=0).add(valores)
+                for variable, valores in self.rfm_values().items()
+            }
+        return self._rfm_sketches
+
+    def rfm_scores(self):
+        """Scores RFM (1-5) por cliente según los quintiles de los sketches"""
+        valores = self.rfm_values()
+        sketches = self.rfm_sketches()
+        return pd.DataFrame({
+            'R_score': 5 - sketches['recency'].bins(valores['recency'], 5),
+            'F_score': 1 + sketches['frequency'].bins(valores['frequency'], 5),
+            'M_score': 1 + sketches['monetary'].bins(valores['monetary'], 5)
+        })
+
+    def get_purchased_products(self, customer_id):
+        """Productos comprados por un cliente, ordenados por importe (útil para recomendaciones)"""
+        cliente = self.get_customer(customer_id)
+        if cliente is None:
+            return []
+        return cliente['productos_favoritos']['product_id'].tolist()
+
+    def save(self, store_dir=STORE_DIR):
+        """Guarda el almacén en formato parquet bajo un directorio por versión de datos"""
+        version_dir = os.path.join(store_dir, self.version)
+        os.makedirs(version_dir, exist_ok=True)
+
+        self.perfiles.to_parquet(f"{version_dir}/perfiles.parquet", index=False)
+        for nombre, tabla in self.tablas.items():
+            tabla.to_parquet(f"{version_dir}/{nombre}.parquet", index=False)
+
+        np.savez(f"{version_dir}/offsets.npz", **self.offsets)
+
+        dump_atomic(self.rfm_sketches(), f"{version_dir}/rfm_sketches.joblib")
+
+        with open(f"{version_dir}/metadata.json", 'w') as f:
+            json.dump(self.metadata, f)
+
+    @classmethod
+    def load(cls, version, store_dir=STORE_DIR):
+        """Carga el almacén de una versión de datos (None si no se ha construido)"""
+        version_dir = os.path.join(store_dir, version)
+        if not os.path.exists(f"{version_dir}/metadata.json"):
+            return None
+
+        with open(f"{version_dir}/metadata.json") as f:
+            metadata = json.load(f)
+
+        perfiles = pd.read_parquet(f"{version_dir}/perfiles.parquet")
+        tablas = {
+            nombre: pd.read_parquet(f"{version_dir}/{nombre}.parquet")
+            for nombre in cls.TABLAS
+        }
+        with np.load(f"{version_dir}/offsets.npz") as npz:
+            offsets = {nombre: npz[nombre] for nombre in cls.TABLAS}
+
+        store = cls(version, perfiles, tablas, offsets, metadata)
+        if os.path.exists(f"{version_dir}/rfm_sketches.joblib"):
+            store._rfm_sketches = joblib.load(f"{version_dir}/rfm_sketches.joblib")
+        return store
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_customer_store():
+    """Obtiene el almacén de clientes de la versión de datos actual (memoria -> disco -> Spark)"""
+    global _store
+
+    version = get_data_version()
+    if _store is not None and _store.version == version:
+        return _store
+
+    with _store_lock:
+        if _store is not None and _store.version == version:
+            return _store
+
+        store = CustomerStore.load(version)
+        if store is None:
+            from app.utils.data_generator import DataGenerator
+
+            data_generator = DataGenerator()
+            try:
+                store = CustomerStore.build(data_generator.get_combined_data(), version)
+            finally:
+                data_generator.stop_spark()
+            store.save()
+
+        _store = store
+
+    return _store
@@ -0,0 +1,30 @@
+"""
+🏷️ Versionado de Datos
+Identifica la versión de los datasets parquet para invalidar cachés y modelos
+"""
+
+import hashlib
+import os
+
+DATA_DIR = "app/data"
+DATASETS = ("products.parquet", "customers.parquet", "sales.parquet")
+
+def get_data_version(data_dir: str = DATA_DIR) -> str:
+    """Calcula la versión de los datos a partir de nombre, tamaño y fecha de los ficheros parquet"""
+    digest = hashlib.sha1()
+
+    for dataset in DATASETS:
+        dataset_path = os.path.join(data_dir, dataset)
+        if not os.path.exists(dataset_path):
+            continue
+
+        for root, dirs, files in sorted(os.walk(dataset_path)):
+            for name in sorted(files):
+                # Ignorar checksums y marcadores de Spark (.crc, _SUCCESS)
+                if name.startswith('.') or name.startswith('_'):
+                    continue
+
+                stat = os.stat(os.path.join(root, name))
+                digest.update(f"{dataset}/{name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+
+    return digest.hexdigest()[:12]
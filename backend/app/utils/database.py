@@ -5,15 +5,20 @@ Utilidades para manejo de base de datos SQLite
 
 import sqlite3
 import os
-from typing import Optional
-from pyspark.sql import SparkSession
+from typing import TYPE_CHECKING
+
+# Spark solo se importa al pedir una sesión: la cola de trabajos usa este módulo sin Spark
+if TYPE_CHECKING:
+    from pyspark.sql import SparkSession
 
 # Configuración de base de datos
 DATABASE_URL = "sqlite:///app/data/ecommerce.db"
 DATABASE_PATH = "app/data/ecommerce.db"
 
-def get_spark_session() -> SparkSession:
+def get_spark_session() -> "SparkSession":
     """Obtiene una sesión de Spark configurada"""
+    from pyspark.sql import SparkSession
+    
     return SparkSession.builder \
         .appName("E-Commerce Analytics") \
         .config("spark.sql.adaptive.enabled", "true") \
@@ -0,0 +1,100 @@
+"""
+🧮 Sketches por Versión de Datos
+Rollups HyperLogLog de clientes distintos y sketch KLL de importes de ticket
+"""
+
+import functools
+import threading
+
+import numpy as np
+from pyspark.sql import functions as F
+
+from app.utils.data_generator import DataGenerator
+from app.utils.data_version import get_data_version
+from app.utils.sketches import HLLRollup, KLLSketch
+
+# Dimensiones de cada rollup (la fecha permite filtrar cualquier rango de días)
+ROLLUPS = {
+    'ciudad': ['fecha', 'ciudad'],
+    'segmento': ['fecha', 'segmento'],
+    'producto': ['categoria', 'product_id']
+}
+
+_sketches = {}
+_sketches_lock = threading.Lock()
+
+def _get_sketch(nombre, construir):
+    """Construye (una vez por versión de datos) el sketch ``nombre`` con ``construir(df_completo)``
+
+    Cada sketch se construye y se cachea por separado: pedir uno no obliga a
+    recorrer los datos que solo necesita otro.
+    """
+    version = get_data_version()
+    actual = _sketches.get(nombre)
+    if actual is not None and actual[0] == version:
+        return actual[1]
+
+    with _sketches_lock:
+        actual = _sketches.get(nombre)
+        if actual is not None and actual[0] == version:
+            return actual[1]
+
+        print(f"🧮 Construyendo sketch de ventas: {nombre}...")
+        data_generator = DataGenerator()
+        try:
+            sketch = construir(data_generator.get_combined_data())
+        finally:
+            data_generator.stop_spark()
+
+        _sketches[nombre] = (version, sketch)
+
+    return sketch
+
+def _registros_hll(df, dimensiones, columna, p):
+    """Registros HLL no vacíos de cada celda, calculados y reducidos en Spark
+
+    Mismo esquema que ``HyperLogLog.positions`` con ``xxhash64``: los ``p`` bits
+    altos dan el registro y el rango es la posición del primer bit a 1 del resto.
+    Al driver solo llega una fila por (celda, registro) con su rango máximo.
+    """
+    hash_ = F.xxhash64(columna)
+    resto = hash_.bitwiseAND(F.lit((1 << (64 - p)) - 1))
+    # Con resto > 0 la longitud de su representación binaria es su número de bits
+    rango = F.when(resto == 0, 65 - p).otherwise(65 - p - F.length(F.bin(resto)))
+
+    return (
+        df.select(*dimensiones, F.shiftrightunsigned(hash_, 64 - p).alias('indice'), rango.alias('rango'))
+        .groupBy(*dimensiones, 'indice')
+        .agg(F.max('rango').alias('rango'))
+        .toPandas()
+    )
+
+def _construir_rollups(df_completo):
+    """Rollups HLL desde los registros por celda calculados en Spark"""
+    rollups = {}
+    for nombre, dimensiones in ROLLUPS.items():
+        rollup = HLLRollup(dimensiones)
+        rollups[nombre] = rollup.from_registers(
+            _registros_hll(df_completo, dimensiones, 'customer_id', rollup.p)
+        )
+    return rollups
+
+def _construir_ticket(df_completo):
+    """Sketch KLL de importes: uno por partición en los executors y merge en el driver
+
+    Al driver solo llegan los sketches parciales (unos cientos de valores cada
+    uno), nunca la columna completa.
+    """
+    def _sketch_particion(indice, filas):
+        yield KLLSketch(seed=indice).add(np.fromiter((fila[0] for fila in filas), dtype=np.float64))
+
+    parciales = df_completo.select('total').dropna().rdd.mapPartitionsWithIndex(_sketch_particion).collect()
+    return functools.reduce(lambda sketch, parcial: sketch.merge(parcial), parciales, KLLSketch(seed=0))
+
+def get_distinct_rollups():
+    """Obtiene los rollups HLL de clientes distintos de la versión de datos actual"""
+    return _get_sketch('rollups', _construir_rollups)
+
+def get_ticket_sketch():
+    """Obtiene el sketch KLL de importes por venta de la versión de datos actual"""
+    return _get_sketch('ticket', _construir_ticket)
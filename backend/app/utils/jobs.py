@@ -0,0 +1,214 @@
+"""
+⏳ Cola de Trabajos en Segundo Plano
+Ejecuta entrenamientos en procesos worker y persiste su estado en SQLite
+"""
+
+import hashlib
+import importlib
+import json
+import multiprocessing
+import sqlite3
+import threading
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from app.utils.database import DATABASE_PATH
+
+# Tipos de trabajo -> función que los ejecuta ("modulo:funcion", importada en el worker)
+TAREAS = {
+    'forecast_train': 'app.ml.tasks:train_forecast',
+    'forecast_hierarchical': 'app.ml.tasks:forecast_hierarchical',
+    'forecast_backtest': 'app.ml.tasks:backtest_forecast',
+    'recommendations_train': 'app.ml.tasks:train_recommendations',
+    'recommendations_batch': 'app.ml.tasks:batch_recommendations'
+}
+
+ESTADOS_ACTIVOS = ('pendiente', 'ejecutando')
+
+def _connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def create_jobs_table(db_path=DATABASE_PATH):
+    """Crea la tabla de trabajos si no existe"""
+    conn = _connect(db_path)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            tipo TEXT NOT NULL,
+            parametros TEXT NOT NULL,
+            clave TEXT NOT NULL,
+            estado TEXT NOT NULL,
+            resultado TEXT,
+            error TEXT,
+            creado DATETIME NOT NULL,
+            iniciado DATETIME,
+            finalizado DATETIME
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_clave_estado ON jobs (clave, estado)')
+    conn.commit()
+    conn.close()
+
+def _actualizar(db_path, job_id, **campos):
+    """Actualiza columnas de un trabajo"""
+    asignaciones = ', '.join(f"{campo} = ?" for campo in campos)
+    conn = _connect(db_path)
+    conn.execute(f"UPDATE jobs SET {asignaciones} WHERE id = ?", (*campos.values(), job_id))
+    conn.commit()
+    conn.close()
+
+def _ejecutar_job(job_id, ruta_tarea, parametros, db_path):
+    """Punto de entrada en el proceso worker (``ruta_tarea`` es "modulo:funcion")"""
+    _actualizar(db_path, job_id, estado='ejecutando', iniciado=datetime.now().isoformat())
+
+    try:
+        modulo, funcion = ruta_tarea.split(':')
+        tarea = getattr(importlib.import_module(modulo), funcion)
+        resultado = tarea(**parametros)
+
+        _actualizar(
+            db_path, job_id,
+            estado='completado',
+            resultado=json.dumps(resultado, default=str),
+            finalizado=datetime.now().isoformat()
+        )
+    except Exception as e:
+        _actualizar(
+            db_path, job_id,
+            estado='fallido',
+            error=f"{e}\n{traceback.format_exc()}",
+            finalizado=datetime.now().isoformat()
+        )
+
+class JobQueue:
+    """Cola de trabajos con deduplicación de trabajos idénticos pendientes"""
+
+    def __init__(self, db_path=DATABASE_PATH, max_workers=2, tareas=TAREAS):
+        self.db_path = db_path
+        self.max_workers = max_workers
+        self.tareas = tareas
+        self._executor = None
+        self._lock = threading.Lock()
+
+        create_jobs_table(db_path)
+
+        # Los trabajos activos de una ejecución anterior del servidor no terminarán
+        conn = _connect(db_path)
+        conn.execute(
+            "UPDATE jobs SET estado = 'fallido', error = 'Interrumpido por reinicio del servidor' "
+            "WHERE estado IN (?, ?)", ESTADOS_ACTIVOS
+        )
+        conn.commit()
+        conn.close()
+
+    def _get_executor(self):
+        """Crea el pool de procesos bajo demanda ('spawn' evita heredar la JVM de Spark)"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    @staticmethod
+    def _clave(tipo, parametros):
+        """Clave que identifica trabajos idénticos"""
+        contenido = json.dumps({'tipo': tipo, 'parametros': parametros}, sort_keys=True)
+        return hashlib.sha1(contenido.encode()).hexdigest()
+
+    def submit(self, tipo, parametros=None):
+        """Encola un trabajo o devuelve el trabajo idéntico que ya está pendiente/ejecutándose"""
+        if tipo not in self.tareas:
+            raise ValueError(f"Tipo de trabajo no válido: {tipo}")
+
+        parametros = parametros or {}
+        clave = self._clave(tipo, parametros)
+
+        with self._lock:
+            conn = _connect(self.db_path)
+            existente = conn.execute(
+                "SELECT id FROM jobs WHERE clave = ? AND estado IN (?, ?) ORDER BY creado LIMIT 1",
+                (clave, *ESTADOS_ACTIVOS)
+            ).fetchone()
+
+            if existente is not None:
+                conn.close()
+                job = self.get(existente['id'])
+                job['duplicado'] = True
+                return job
+
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, tipo, parametros, clave, estado, creado) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, tipo, json.dumps(parametros), clave, 'pendiente', datetime.now().isoformat())
+            )
+            conn.commit()
+            conn.close()
+
+            executor = self._get_executor()
+            future = executor.submit(_ejecutar_job, job_id, self.tareas[tipo], parametros, self.db_path)
+
+        # Fuera del lock: si el futuro ya terminó, el callback se ejecuta en este mismo hilo
+        future.add_done_callback(lambda f: self._worker_terminado(f, job_id, executor))
+
+        print(f"⏳ Trabajo {tipo} encolado: {job_id}")
+        job = self.get(job_id)
+        job['duplicado'] = False
+        return job
+
+    def _worker_terminado(self, future, job_id, executor):
+        """Marca como fallido un trabajo cuyo worker murió sin registrar el resultado"""
+        if future.cancelled() or future.exception() is None:
+            return
+        
+        _actualizar(
+            self.db_path, job_id,
+            estado='fallido',
+            error=f"Worker terminado inesperadamente: {future.exception()!r}",
+            finalizado=datetime.now().isoformat()
+        )
+        
+        # Un pool roto no acepta más trabajos: se recrea en el siguiente submit (salvo
+        # que otro submit ya lo haya sustituido)
+        if isinstance(future.exception(), BrokenProcessPool):
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+
+    def get(self, job_id):
+        """Estado y resultado de un trabajo (None si no existe)"""
+        conn = _connect(self.db_path)
+        fila = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        conn.close()
+
+        if fila is None:
+            return None
+
+        job = dict(fila)
+        job['parametros'] = json.loads(job['parametros'])
+        job['resultado'] = json.loads(job['resultado']) if job['resultado'] else None
+        del job['clave']
+        return job
+
+    def shutdown(self):
+        """Detiene el pool de workers"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue():
+    """Obtiene la cola de trabajos compartida del servidor"""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+    return _job_queue
@@ -0,0 +1,30 @@
+"""
+📆 Granularidades de las Series
+Remuestreo de la serie diaria de ventas a semanas o meses (sin Spark)
+"""
+
+# Granularidades: frecuencia pandas (inicio del periodo), periodo estacional, periodo de prueba
+# y máximo de periodos a predecir (unos tres meses en días, medio año en semanas, un año en meses)
+GRANULARIDADES = {
+    'D': {'frecuencia': 'D', 'estacionalidad': 7, 'prueba': 30, 'max_periodos': 90},
+    'W': {'frecuencia': 'W-MON', 'estacionalidad': 52, 'prueba': 8, 'max_periodos': 26},
+    'M': {'frecuencia': 'MS', 'estacionalidad': 12, 'prueba': 3, 'max_periodos': 12}
+}
+
+def resample_series(serie, granularidad='D'):
+    """Agrega la serie diaria por semanas (lunes) o meses
+
+    Cada periodo se etiqueta con su primer día. Los periodos incompletos de los
+    extremos se descartan para no sesgar a la baja el primer y el último valor.
+    """
+    if granularidad not in GRANULARIDADES:
+        raise ValueError(f"Granularidad no válida: {granularidad}")
+    if granularidad == 'D':
+        return serie
+    
+    periodos = serie['ds'].dt.to_period('W' if granularidad == 'W' else 'M')
+    agregada = serie.drop(columns='ds').groupby(periodos.dt.start_time.rename('ds')).sum()
+    dias = periodos.groupby(periodos.dt.start_time).size()
+    
+    completos = dias.values == (7 if granularidad == 'W' else dias.index.days_in_month)
+    return agregada[completos].reset_index()
@@ -0,0 +1,271 @@
+"""
+🧮 Sketches Probabilísticos
+HyperLogLog mergeable para conteos aproximados de elementos distintos y
+KLL para cuantiles aproximados
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+def hash_values(values):
+    """Hash de 64 bits vectorizado (estable entre procesos) de una colección de valores"""
+    return pd.util.hash_array(np.asarray(values, dtype=object))
+
+def tie_breaker(values):
+    """Desempate determinista en [0, 1) por valor (hash), para repartir empates entre intervalos"""
+    return hash_values(values) / 2.0 ** 64
+
+def _leading_zeros(w):
+    """Ceros a la izquierda de enteros uint64 (búsqueda binaria vectorizada)"""
+    w = w.copy()
+    ceros = np.zeros(w.shape, dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        mask = w < (np.uint64(1) << np.uint64(64 - shift))
+        ceros[mask] += shift
+        w[mask] <<= np.uint64(shift)
+    return ceros
+
+def _alpha(m):
+    """Constante de corrección de sesgo de HyperLogLog"""
+    if m == 16:
+        return 0.673
+    if m == 32:
+        return 0.697
+    if m == 64:
+        return 0.709
+    return 0.7213 / (1 + 1.079 / m)
+
+def hll_estimate(registros):
+    """Estimación de cardinalidad para uno (1D) o varios (2D, uno por fila) sketches"""
+    registros = np.atleast_2d(registros)
+    m = registros.shape[1]
+
+    estimacion = _alpha(m) * m * m / np.power(2.0, -registros.astype(np.float64)).sum(axis=1)
+
+    # Corrección para cardinalidades pequeñas (linear counting)
+    ceros = (registros == 0).sum(axis=1)
+    pequenas = (estimacion <= 2.5 * m) & (ceros > 0)
+    estimacion[pequenas] = m * np.log(m / ceros[pequenas])
+
+    return estimacion
+
+class HyperLogLog:
+    """Sketch HyperLogLog con ``2**p`` registros de 8 bits"""
+
+    def __init__(self, p=12):
+        self.p = p
+        self.registros = np.zeros(1 << p, dtype=np.uint8)
+
+    @staticmethod
+    def positions(hashes, p):
+        """Registro y rango (posición del primer bit a 1) de cada hash"""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        indices = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        resto = hashes << np.uint64(p)
+        rangos = np.minimum(_leading_zeros(resto) + 1, 64 - p + 1).astype(np.uint8)
+        return indices, rangos
+
+    @property
+    def relative_error(self):
+        """Error relativo típico (desviación estándar) del estimador"""
+        return 1.04 / np.sqrt(1 << self.p)
+
+    def add(self, values):
+        """Añade valores al sketch"""
+        indices, rangos = self.positions(hash_values(values), self.p)
+        np.maximum.at(self.registros, indices, rangos)
+        return self
+
+    def merge(self, other):
+        """Combina otro sketch de la misma precisión (unión de conjuntos)"""
+        if other.p != self.p:
+            raise ValueError("No se pueden combinar sketches de distinta precisión")
+        np.maximum(self.registros, other.registros, out=self.registros)
+        return self
+
+    def count(self):
+        """Número estimado de elementos distintos"""
+        return float(hll_estimate(self.registros)[0])
+
+class HLLRollup:
+    """Sketches HyperLogLog por celda de un rollup (combinación de dimensiones)
+
+    Los conteos distintos sobre cualquier subconjunto de celdas se obtienen
+    combinando sus registros, sin volver a recorrer los datos originales.
+    """
+
+    def __init__(self, dimensiones, p=10):
+        self.dimensiones = list(dimensiones)
+        self.p = p
+        self.celdas = None
+        self.registros = None
+
+    @property
+    def relative_error(self):
+        """Error relativo típico de cada estimación"""
+        return 1.04 / np.sqrt(1 << self.p)
+
+    def build(self, df, columna):
+        """Construye un sketch por celda con los valores distintos de ``columna``"""
+        indices, rangos = HyperLogLog.positions(hash_values(df[columna]), self.p)
+        return self.from_registers(df[self.dimensiones].assign(indice=indices, rango=rangos))
+
+    def from_registers(self, registros):
+        """Construye los sketches desde registros ya calculados (p. ej. agregados en Spark)
+
+        ``registros`` tiene las dimensiones, el índice de registro (``indice``) y
+        su rango (``rango``); si un registro aparece varias veces se queda el máximo.
+        """
+        agrupado = registros.groupby(self.dimensiones, sort=True)
+        codigos = agrupado.ngroup().to_numpy()
+        self.celdas = agrupado.size().reset_index()[self.dimensiones]
+
+        self.registros = np.zeros((len(self.celdas), 1 << self.p), dtype=np.uint8)
+        np.maximum.at(
+            self.registros,
+            (codigos, registros['indice'].to_numpy(dtype=np.int64)),
+            registros['rango'].to_numpy(dtype=np.uint8)
+        )
+        return self
+
+    def count(self, mascara=None):
+        """Distintos estimados en las celdas seleccionadas (todas si no hay máscara)"""
+        registros = self.registros if mascara is None else self.registros[np.asarray(mascara)]
+        if len(registros) == 0:
+            return 0.0
+        return float(hll_estimate(registros.max(axis=0))[0])
+
+    def count_by(self, dimension, mascara=None):
+        """Distintos estimados por valor de una dimensión"""
+        celdas = self.celdas
+        registros = self.registros
+        if mascara is not None:
+            mascara = np.asarray(mascara)
+            celdas = celdas[mascara]
+            registros = registros[mascara]
+
+        if len(celdas) == 0:
+            return pd.Series(dtype=np.float64)
+
+        # Agrupar celdas contiguas por valor y combinar con reduceat
+        orden = np.argsort(celdas[dimension].to_numpy(), kind='stable')
+        valores = celdas[dimension].to_numpy()[orden]
+        inicios = np.flatnonzero(np.r_[True, valores[1:] != valores[:-1]])
+        combinados = np.maximum.reduceat(registros[orden], inicios, axis=0)
+
+        return pd.Series(hll_estimate(combinados), index=valores[inicios])
+
+class KLLSketch:
+    """Sketch KLL de cuantiles aproximados, mergeable y actualizable en streaming
+
+    Mantiene una jerarquía de compactadores: el nivel ``h`` guarda elementos con
+    peso ``2**h``. Cuando un nivel supera su capacidad se ordena (solo ese nivel)
+    y se promueve al siguiente uno de cada dos elementos.
+    """
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.n = 0
+        self.niveles = [np.empty(0, dtype=np.float64)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacidad(self, nivel):
+        """Capacidad de un nivel: decrece geométricamente hacia los niveles bajos"""
+        altura = len(self.niveles) - nivel - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** altura)))
+
+    def _compactar(self):
+        """Compacta los niveles que superan su capacidad"""
+        nivel = 0
+        while nivel < len(self.niveles):
+            elementos = self.niveles[nivel]
+            if len(elementos) > self._capacidad(nivel):
+                if nivel + 1 == len(self.niveles):
+                    self.niveles.append(np.empty(0, dtype=np.float64))
+
+                elementos = np.sort(elementos)
+                # Con longitud impar un elemento se queda en el nivel actual
+                resto = elementos[-1:] if len(elementos) % 2 else elementos[:0]
+                pares = elementos[:len(elementos) - len(resto)]
+                promovidos = pares[self._rng.integers(0, 2)::2]
+
+                self.niveles[nivel] = resto
+                self.niveles[nivel + 1] = np.concatenate([self.niveles[nivel + 1], promovidos])
+            nivel += 1
+
+    def add(self, values):
+        """Añade valores al sketch en bloques del tamaño del compactador base"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        for inicio in range(0, len(values), self.k):
+            self.niveles[0] = np.concatenate([self.niveles[0], values[inicio:inicio + self.k]])
+            self._compactar()
+        self.n += len(values)
+        return self
+
+    def merge(self, other):
+        """Combina otro sketch (equivale a haber añadido todos sus valores)"""
+        while len(self.niveles) < len(other.niveles):
+            self.niveles.append(np.empty(0, dtype=np.float64))
+        for nivel, elementos in enumerate(other.niveles):
+            self.niveles[nivel] = np.concatenate([self.niveles[nivel], elementos])
+        self.n += other.n
+        self._compactar()
+        return self
+
+    def quantiles(self, qs):
+        """Cuantiles aproximados para las probabilidades ``qs`` en [0, 1]"""
+        if self.n == 0:
+            raise ValueError("El sketch está vacío")
+
+        elementos = np.concatenate(self.niveles)
+        pesos = np.concatenate([
+            np.full(len(nivel), 2.0 ** h) for h, nivel in enumerate(self.niveles)
+        ])
+        orden = np.argsort(elementos, kind='stable')
+        elementos = elementos[orden]
+        acumulado = np.cumsum(pesos[orden])
+
+        objetivos = np.asarray(qs, dtype=np.float64) * acumulado[-1]
+        posiciones = np.searchsorted(acumulado, objetivos, side='left')
+        return elementos[np.minimum(posiciones, len(elementos) - 1)]
+
+    def quantile(self, q):
+        """Cuantil aproximado para una probabilidad ``q``"""
+        return float(self.quantiles([q])[0])
+
+    def bins(self, values, n_bins):
+        """Índice de intervalo (0..n_bins-1) de cada valor según los cuantiles del sketch
+
+        Los intervalos son cerrados por la derecha, como ``pd.qcut``.
+        """
+        umbrales = self.quantiles(np.arange(1, n_bins) / n_bins)
+        return np.searchsorted(umbrales, np.asarray(values, dtype=np.float64), side='left')
+
+class QuantileTracker:
+    """Sketches KLL por clave (p. ej. latencia por endpoint) seguros entre hilos"""
+
+    def __init__(self, k=200):
+        self.k = k
+        self.sketches = {}
+        self._lock = threading.Lock()
+
+    def record(self, clave, valor):
+        """Registra un valor para una clave"""
+        with self._lock:
+            sketch = self.sketches.get(clave)
+            if sketch is None:
+                sketch = self.sketches[clave] = KLLSketch(self.k)
+            sketch.add([valor])
+
+    def summary(self, qs=(0.5, 0.9, 0.99)):
+        """Número de observaciones y cuantiles de cada clave"""
+        with self._lock:
+            return {
+                clave: {
+                    'n': sketch.n,
+                    'cuantiles': dict(zip(qs, sketch.quantiles(qs).tolist()))
+                }
+                for clave, sketch in self.sketches.items()
+            }
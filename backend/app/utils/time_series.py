@@ -0,0 +1,79 @@
+"""
+📅 Series Temporales de Ventas
+Agregación diaria de ventas en Spark con el calendario completo, cacheada por
+versión de datos
+"""
+
+import pandas as pd
+from pyspark.sql import functions as F
+
+from app.utils.data_generator import DataGenerator
+from app.utils.cache import versioned_cache
+from app.utils.resampling import resample_series
+
+def daily_sales(df_spark):
+    """Ventas por día calculadas en Spark, con los días sin ventas a 0
+
+    Solo se transfiere al driver una fila por día con columnas ``ds`` (fecha),
+    ``y`` (total vendido), ``cantidad`` y ``venta_id`` (número de ventas).
+    """
+    diario = df_spark.groupBy('fecha').agg(
+        F.sum('total').alias('y'),
+        F.sum('cantidad').alias('cantidad'),
+        F.count('venta_id').alias('venta_id')
+    )
+    
+    # Calendario completo entre la primera y la última fecha
+    calendario = diario.agg(F.min('fecha').alias('inicio'), F.max('fecha').alias('fin')).select(
+        F.explode(F.sequence(F.col('inicio'), F.col('fin'), F.expr('interval 1 day'))).alias('fecha')
+    )
+    
+    serie = calendario.join(diario, on='fecha', how='left') \
+        .fillna(0, subset=['y', 'cantidad', 'venta_id']) \
+        .orderBy('fecha') \
+        .toPandas()
+    
+    serie = serie.rename(columns={'fecha': 'ds'})
+    serie['ds'] = pd.to_datetime(serie['ds'])
+    return serie
+
+def daily_sales_by(df_spark, columna):
+    """Ventas diarias por grupo (p. ej. categoría o producto) como matriz días × grupos
+
+    La agregación se hace en Spark; los días sin ventas de un grupo valen 0.
+    """
+    ventas = df_spark.groupBy('fecha', columna).agg(F.sum('total').alias('total')).toPandas()
+    ventas['fecha'] = pd.to_datetime(ventas['fecha'])
+    
+    matriz = ventas.pivot_table(index='fecha', columns=columna, values='total', aggfunc='sum', fill_value=0)
+    fechas = pd.date_range(matriz.index.min(), matriz.index.max(), freq='D')
+    return matriz.reindex(fechas, fill_value=0).sort_index(axis=1)
+
+def get_daily_matrix(columna, version=None):
+    """Matriz días × grupos de la versión de datos actual, calculada una vez por versión"""
+    def calcular():
+        data_generator = DataGenerator()
+        try:
+            data_generator.load_data()
+            return daily_sales_by(data_generator.get_combined_data(), columna)
+        finally:
+            data_generator.stop_spark()
+    
+    return versioned_cache.get_or_compute(f"matriz_diaria_{columna}", calcular, version=version)
+
+def get_daily_series(version=None):
+    """Serie diaria de la versión de datos actual, calculada una vez por versión"""
+    def calcular():
+        data_generator = DataGenerator()
+        try:
+            data_generator.load_data()
+            return daily_sales(data_generator.get_combined_data())
+        finally:
+            data_generator.stop_spark()
+    
+    # Copia: la serie cacheada se comparte entre peticiones
+    return versioned_cache.get_or_compute("serie_diaria", calcular, version=version).copy()
+
+def get_series(granularidad='D', version=None):
+    """Serie de la versión de datos actual en la granularidad indicada (a partir de la diaria cacheada)"""
+    return resample_series(get_daily_series(version), granularidad)
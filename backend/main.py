@@ -3,19 +3,25 @@
 Backend principal con FastAPI + PySpark
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
 import os
 import sys
+import time
 
 # Agregar el directorio app al path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
 
-from app.api import summary, products, customers, forecast, recommendations
+from app.api import summary, products, customers, forecast, recommendations, jobs
 from app.utils.data_generator import DataGenerator
 from app.utils.database import init_database
+from app.utils.sketches import QuantileTracker
+from app.utils.jobs import get_job_queue
+from app.utils.data_version import get_data_version
+from app.ml.registry import ModelRegistry
+from app.ml.recommendations import get_recommendation_service
 
 # Configuración de la aplicación
 app = FastAPI(
@@ -35,12 +41,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latencias por endpoint (sketches KLL en memoria)
+latencias = QuantileTracker()
+
+@app.middleware("http")
+async def medir_latencia(request, call_next):
+    """Registra la latencia de cada petición agrupada por plantilla de ruta"""
+    inicio = time.perf_counter()
+    response = await call_next(request)
+    
+    route = request.scope.get("route")
+    ruta = route.path if route is not None else "sin_ruta"
+    latencias.record(f"{request.method} {ruta}", (time.perf_counter() - inicio) * 1000)
+    
+    return response
+
 # Incluir routers
 app.include_router(summary.router, prefix="/api/v1", tags=["summary"])
 app.include_router(products.router, prefix="/api/v1", tags=["products"])
 app.include_router(customers.router, prefix="/api/v1", tags=["customers"])
 app.include_router(forecast.router, prefix="/api/v1", tags=["forecast"])
 app.include_router(recommendations.router, prefix="/api/v1", tags=["recommendations"])
+app.include_router(jobs.router, prefix="/api/v1", tags=["jobs"])
 
 @app.on_event("startup")
 async def startup_event():
@@ -57,8 +79,23 @@ async def startup_event():
         data_generator.generate_all_data()
         print("✅ Datos sintéticos generados")
     
+    # Entrenar en segundo plano los modelos que falten o estén obsoletos
+    job_queue = get_job_queue()
+    if ModelRegistry("forecast").is_stale(get_data_version()):
+        job_queue.submit("forecast_train", {"model_type": "auto", "granularity": "D"})
+    if ModelRegistry("recommendations").is_stale(get_data_version()):
+        job_queue.submit("recommendations_train")
+    
+    # Recomendador en memoria desde el arranque (mientras se reentrena se sirve el último)
+    get_recommendation_service().preload()
+    
     print("✅ Sistema iniciado correctamente")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Evento de cierre de la aplicación"""
+    get_job_queue().shutdown()
+
 @app.get("/")
 async def root():
     """Endpoint raíz"""
@@ -72,7 +109,26 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "timestamp": "2024-01-01T00:00:00Z"}
+    return {
+        "status": "healthy",
+        "timestamp": "2024-01-01T00:00:00Z",
+        "recomendaciones_listas": get_recommendation_service().ready
+    }
+
+@app.get("/metrics/latency")
+async def latency_metrics():
+    """Percentiles de latencia (ms) por endpoint"""
+    return {
+        "latencias_ms": {
+            endpoint: {
+                "peticiones": resumen['n'],
+                "p50": round(resumen['cuantiles'][0.5], 2),
+                "p90": round(resumen['cuantiles'][0.9], 2),
+                "p99": round(resumen['cuantiles'][0.99], 2)
+            }
+            for endpoint, resumen in latencias.summary().items()
+        }
+    }
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
@@ -0,0 +1,82 @@
+"""
+Tests para la detección incremental de anomalías
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+import os
+import sys
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend', 'app'))
+
+from ml.anomalies import AnomalyDetector, AnomalyMonitor
+
+@pytest.fixture
+def matriz():
+    """Ventas diarias de tres series con estacionalidad semanal y un pico inyectado"""
+    rng = np.random.default_rng(0)
+    fechas = pd.date_range('2023-01-02', periods=280, freq='D')
+    base = 1000 * (1 + 0.5 * (fechas.dayofweek >= 5))
+    valores = np.column_stack([base * k * rng.lognormal(0, 0.05, len(fechas)) for k in (1, 2, 3)])
+    valores[200, 1] *= 4
+    return pd.DataFrame(valores, index=fechas, columns=['A', 'B', 'C'])
+
+class TestAnomalyDetector:
+    """Tests para AnomalyDetector"""
+
+    def test_referencia_por_dia(self):
+        """Cada día de la semana tiene su propia referencia"""
+        detector = AnomalyDetector()
+        esperados, zs, anomalias = detector.process(np.tile([[10.0], [10.0], [10.0], [10.0], [10.0], [50.0], [50.0]], (10, 1)))
+
+        assert esperados[-1, 0] == pytest.approx(50)
+        assert esperados[-3, 0] == pytest.approx(10)
+        assert not anomalias.any()
+
+class TestAnomalyMonitor:
+    """Tests para AnomalyMonitor"""
+
+    def test_detecta_pico(self, matriz):
+        """El pico inyectado es la única anomalía"""
+        monitor = AnomalyMonitor().update(matriz)
+
+        assert [(a['fecha'], a['serie'], a['tipo']) for a in monitor.anomalias] == [('2023-07-21', 'B', 'pico')]
+        assert monitor.anomalias[0]['valor'] == pytest.approx(matriz.iloc[200, 1])
+
+    def test_incremental(self, matriz):
+        """Añadir días solo procesa los nuevos y da el mismo resultado que de una vez"""
+        monitor = AnomalyMonitor().update(matriz.iloc[:250])
+        monitor.update(matriz)
+
+        assert monitor.dias_nuevos == 30
+        assert monitor.anomalias == AnomalyMonitor().update(matriz).anomalias
+
+    def test_serie_nueva(self, matriz):
+        """Una serie nueva empieza con estado vacío y las conocidas conservan el suyo"""
+        monitor = AnomalyMonitor().update(matriz.iloc[:250][['A', 'B']])
+        ampliada = matriz.copy()
+        ampliada.iloc[:250, 2] = 0.0
+        monitor.update(ampliada[['C', 'A', 'B']])
+
+        assert monitor.dias_nuevos == 30
+        assert monitor.series == ['A', 'B', 'C']
+        assert monitor.anomalias == AnomalyMonitor().update(matriz[['A', 'B']]).anomalias
+        # La serie nueva solo ha visto los días nuevos
+        assert monitor.detector.cuenta[:, 2].sum() == 30
+        assert monitor.detector.cuenta[:, 0].sum() == len(matriz)
+
+        # Las siguientes actualizaciones siguen siendo incrementales
+        monitor.update(ampliada[['A', 'B', 'C']])
+        assert monitor.dias_nuevos == 0
+
+    def test_reinicio_si_cambia_el_historico(self, matriz):
+        """Si cambian días ya procesados se vuelve a procesar todo"""
+        monitor = AnomalyMonitor().update(matriz)
+        corregida = matriz.copy()
+        corregida.iloc[200, 1] = matriz.iloc[199, 1]
+        monitor.update(corregida)
+
+        assert monitor.dias_nuevos == len(matriz)
+        assert monitor.anomalias == []
@@ -0,0 +1,74 @@
+"""
+Tests para el backtesting con origen móvil
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+import os
+import sys
+
+# Agregar el directorio backend al path (el módulo importa app.*)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.ml.backtesting import generate_cutoffs, backtest, BacktestCache
+
+def media_semanal(train, test):
+    """Modelo de prueba: media de la última semana"""
+    return np.full(len(test), train['y'].values[-7:].mean())
+
+def ultimo_valor(train, test):
+    """Modelo de prueba: último valor observado"""
+    return np.full(len(test), train['y'].values[-1])
+
+@pytest.fixture
+def serie():
+    """Serie diaria sintética con estacionalidad semanal"""
+    rng = np.random.default_rng(0)
+    ds = pd.date_range('2023-01-01', periods=300, freq='D')
+    y = 1000 + 200 * np.sin(2 * np.pi * np.arange(300) / 7) + rng.normal(0, 30, 300)
+    return pd.DataFrame({'ds': ds, 'y': y})
+
+class TestBacktesting:
+    """Tests para el motor de backtesting"""
+
+    def test_cortes(self):
+        """Los cortes terminan al final de la serie y respetan la ventana"""
+        expansivos = generate_cutoffs(300, 30, n_cortes=5)
+        deslizantes = generate_cutoffs(300, 30, n_cortes=5, ventana='sliding', tam_ventana=100)
+
+        assert expansivos[-1] == (0, 270)
+        assert [corte for _, corte in expansivos] == [150, 180, 210, 240, 270]
+        assert all(corte - inicio == 100 for inicio, corte in deslizantes)
+
+        with pytest.raises(ValueError):
+            generate_cutoffs(300, 30, ventana='otra')
+
+    def test_distribucion_por_modelo(self, serie):
+        """Cada modelo tiene métricas por corte y su distribución"""
+        resultado = backtest(serie, {'media': media_semanal, 'ultimo': ultimo_valor}, horizonte=14, n_cortes=6, n_jobs=1)
+
+        for nombre in ['media', 'ultimo']:
+            modelo = resultado['modelos'][nombre]
+            assert len(modelo['cortes']) == 6
+            assert modelo['rmse']['min'] <= modelo['rmse']['p50'] <= modelo['rmse']['max']
+            assert modelo['mape']['media'] > 0
+
+        # La media semanal no arrastra el pico del último día
+        assert resultado['modelos']['media']['rmse']['media'] < resultado['modelos']['ultimo']['rmse']['media']
+
+    def test_cache_por_corte(self, serie, tmp_path):
+        """Al añadir datos solo se ajustan los cortes nuevos"""
+        cache = BacktestCache(str(tmp_path))
+        primero = backtest(serie.iloc[:280], {'media': media_semanal}, horizonte=14, n_cortes=4, paso=14, n_jobs=1, cache=cache)
+
+        # Dos semanas más de datos: tres cortes coinciden con la ejecución anterior
+        segundo = backtest(serie.iloc[:294], {'media': media_semanal}, horizonte=14, n_cortes=4, paso=14, n_jobs=1,
+                           cache=BacktestCache(str(tmp_path)))
+
+        assert primero['ajustes_calculados'] == 4
+        assert segundo['ajustes_calculados'] == 1
+        assert segundo['ajustes_cacheados'] == 3
+
+if __name__ == "__main__":
+    pytest.main([__file__])
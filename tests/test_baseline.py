@@ -0,0 +1,84 @@
+"""
+Tests para los forecasters base vectorizados
+"""
+
+import pytest
+import numpy as np
+import os
+import sys
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend', 'app'))
+
+from ml.baseline import BaselineForecaster
+
+@pytest.fixture
+def series():
+    """Matriz días × series con tendencia, estacionalidad semanal y ruido"""
+    rng = np.random.default_rng(0)
+    t = np.arange(400)
+    niveles = rng.uniform(100, 1000, 5)
+    Y = niveles + 0.5 * t[:, None] + 0.2 * niveles * np.sin(2 * np.pi * t / 7)[:, None]
+    return Y + rng.normal(0, 10, Y.shape)
+
+class TestBaselineForecaster:
+    """Tests para la clase BaselineForecaster"""
+
+    def test_holt_winters_vectorizado(self, series):
+        """Ajustar la matriz equivale a ajustar cada serie por separado"""
+        modelo = BaselineForecaster('holt_winters').fit(series[:372])
+        prediccion = modelo.forecast(28)
+
+        assert prediccion.shape == (5, 28)
+        for j in range(5):
+            individual = BaselineForecaster('holt_winters').fit(series[:372, j]).forecast(28)
+            assert np.allclose(prediccion[j], individual)
+
+        # Error de predicción del orden del ruido
+        rmse = np.sqrt(np.mean((prediccion - series[372:].T) ** 2, axis=1))
+        assert (rmse < 40).all()
+
+    def test_seasonal_naive(self):
+        """El naive estacional repite la última semana alineada con el calendario"""
+        y = np.tile(np.arange(7, dtype=float), 10)[:68]
+        prediccion = BaselineForecaster('seasonal_naive').fit(y).forecast(9)
+
+        assert np.allclose(prediccion, [5, 6, 0, 1, 2, 3, 4, 5, 6])
+
+    def test_intervalos(self, series):
+        """Los intervalos contienen la predicción y se ensanchan con el horizonte"""
+        modelo = BaselineForecaster('holt_winters').fit(series[:, 0])
+        inferior, superior = modelo.intervals(14)
+        prediccion = modelo.forecast(14)
+
+        assert (inferior < prediccion).all() and (prediccion < superior).all()
+        assert (superior - inferior)[-1] >= (superior - inferior)[0]
+
+    def test_update_incremental(self, series):
+        """Actualizar por partes equivale a actualizar de una vez y avanza el calendario"""
+        de_una_vez = BaselineForecaster('holt_winters').fit(series[:300]).update(series[300:350])
+        por_partes = BaselineForecaster('holt_winters').fit(series[:300]).update(series[300:320]).update(series[320:350])
+
+        assert de_una_vez.n_obs == 350
+        assert np.allclose(de_una_vez.forecast(14), por_partes.forecast(14))
+
+        # La predicción actualizada sigue al nivel reciente mejor que la del modelo sin actualizar
+        sin_actualizar = BaselineForecaster('holt_winters').fit(series[:300]).forecast(64)[:, 50:]
+        error_actualizado = np.abs(de_una_vez.forecast(14) - series[350:364].T).mean()
+        assert error_actualizado < np.abs(sin_actualizar - series[350:364].T).mean()
+
+        # En el naive estacional actualizar equivale a reajustar con toda la historia
+        naive = BaselineForecaster('seasonal_naive').fit(series[:300]).update(series[300:350])
+        assert np.allclose(naive.forecast(10), BaselineForecaster('seasonal_naive').fit(series[:350]).forecast(10))
+
+    def test_errores(self):
+        """Método desconocido, historia corta o modelo sin ajustar"""
+        with pytest.raises(ValueError):
+            BaselineForecaster('prophet')
+        with pytest.raises(ValueError):
+            BaselineForecaster().fit(np.ones(10))
+        with pytest.raises(ValueError):
+            BaselineForecaster().forecast(7)
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,79 @@
+"""
+Tests para la caché por versión de datos
+"""
+
+import pytest
+import os
+import sys
+
+# Agregar el directorio backend al path (y backend para los imports app.*)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend', 'app'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from utils.cache import VersionedCache
+
+class Contador:
+    """Cálculo de prueba que cuenta sus ejecuciones"""
+
+    def __init__(self):
+        self.llamadas = 0
+
+    def __call__(self):
+        self.llamadas += 1
+        return {'llamada': self.llamadas}
+
+@pytest.fixture
+def cache(tmp_path):
+    return VersionedCache(str(tmp_path))
+
+class TestVersionedCache:
+    """Tests para VersionedCache"""
+
+    def test_memoria(self, cache):
+        """La misma versión se calcula una sola vez"""
+        calcular = Contador()
+
+        assert cache.get_or_compute('serie', calcular, version='v1') == {'llamada': 1}
+        assert cache.get_or_compute('serie', calcular, version='v1') == {'llamada': 1}
+        assert calcular.llamadas == 1
+
+    def test_disco(self, cache, tmp_path):
+        """Otra instancia recupera el resultado del disco sin temporales sueltos"""
+        cache.get_or_compute('serie', Contador(), version='v1')
+        calcular = Contador()
+
+        assert VersionedCache(str(tmp_path)).get_or_compute('serie', calcular, version='v1') == {'llamada': 1}
+        assert calcular.llamadas == 0
+        assert os.listdir(tmp_path) == ['serie-v1.pkl']
+
+    def test_sin_persistir(self, cache, tmp_path):
+        """Con persistir=False solo se guarda en memoria"""
+        cache.get_or_compute('serie', Contador(), version='v1', persistir=False)
+
+        assert os.listdir(tmp_path) == []
+        assert VersionedCache(str(tmp_path)).get('serie', 'v1') is None
+
+    def test_version_nueva(self, cache, tmp_path):
+        """Una versión nueva se recalcula y borra del disco las anteriores del mismo nombre"""
+        calcular = Contador()
+        cache.get_or_compute('serie', calcular, version='v1')
+        cache.get_or_compute('serie_semanal', Contador(), version='v1')
+
+        assert cache.get_or_compute('serie', calcular, version='v2') == {'llamada': 2}
+        assert sorted(os.listdir(tmp_path)) == ['serie-v2.pkl', 'serie_semanal-v1.pkl']
+        assert cache.get('serie', 'v1') is None
+
+    def test_valido(self, cache):
+        """Un resultado cacheado que no sirve para la petición se recalcula"""
+        calcular = Contador()
+        cache.get_or_compute('serie', calcular, version='v1')
+
+        valor = cache.get_or_compute('serie', calcular, version='v1', valido=lambda valor: valor['llamada'] > 1)
+
+        assert valor == {'llamada': 2}
+        assert cache.get('serie', 'v1') == {'llamada': 2}
+
+    def test_nombre_con_guion(self, cache):
+        """Los nombres con guion se rechazan (el guion separa nombre y versión)"""
+        with pytest.raises(ValueError):
+            cache.get_or_compute('serie-diaria', Contador(), version='v1')
@@ -0,0 +1,79 @@
+"""
+Tests para el motor de cohortes
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+import os
+import sys
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend', 'app'))
+
+from utils.cohorts import CohortRetention, month_index, month_label
+
+def generar_ventas(n=2000, n_clientes=150, seed=0):
+    """Genera ventas aleatorias con customer_id y fecha"""
+    rng = np.random.default_rng(seed)
+    fechas = pd.to_datetime('2023-01-01') + pd.to_timedelta(rng.integers(0, 540, n), unit='D')
+    return pd.DataFrame({
+        'customer_id': [f'C{i:04d}' for i in rng.integers(0, n_clientes, n)],
+        'fecha': fechas
+    }).sort_values('fecha').reset_index(drop=True)
+
+def retencion_pandas(ventas):
+    """Implementación de referencia con periodos de pandas"""
+    df = ventas.copy()
+    df['periodo'] = df['fecha'].dt.to_period('M')
+    primera = df.groupby('customer_id')['periodo'].min().rename('cohorte')
+    df = df.join(primera, on='customer_id')
+    df['numero'] = (df['periodo'] - df['cohorte']).apply(lambda x: x.n)
+    tabla = df.groupby(['cohorte', 'numero'])['customer_id'].nunique().unstack()
+    return tabla.divide(primera.value_counts(), axis=0).fillna(0)
+
+class TestCohortRetention:
+    """Tests para la clase CohortRetention"""
+
+    def test_month_index(self):
+        """Test para el índice entero de meses"""
+        indices = month_index(['2023-01-15', '2023-12-01', '2024-02-29'])
+
+        assert list(np.diff(indices)) == [11, 2]
+        assert month_label(indices[2]) == '2024-02'
+
+    def test_build_igual_a_pandas(self):
+        """La matriz vectorizada coincide con el cálculo con periodos de pandas"""
+        ventas = generar_ventas()
+
+        tabla = CohortRetention().build(ventas).retention_table()
+        referencia = retencion_pandas(ventas)
+
+        assert list(tabla.index) == [str(p) for p in referencia.index]
+        assert np.allclose(tabla.values, referencia.values)
+
+    def test_update_incremental(self):
+        """Actualizar con ventas nuevas equivale a reconstruir"""
+        ventas = generar_ventas()
+        corte_1 = ventas['fecha'].iloc[1200]
+        corte_2 = ventas['fecha'].iloc[1700]
+
+        motor = CohortRetention().build(ventas[ventas['fecha'] <= corte_1])
+        assert motor.update(ventas[(ventas['fecha'] > corte_1) & (ventas['fecha'] <= corte_2)])
+        assert motor.update(ventas[ventas['fecha'] > corte_2])
+
+        completo = CohortRetention().build(ventas)
+
+        assert np.array_equal(motor.matriz, completo.matriz)
+        assert motor.num_ventas == len(ventas)
+        assert motor.active_customers(corte_2) == ventas[ventas['fecha'] >= corte_2]['customer_id'].nunique()
+
+    def test_update_no_incremental(self):
+        """Ventas anteriores al último mes procesado requieren reconstruir"""
+        ventas = generar_ventas()
+        motor = CohortRetention().build(ventas)
+
+        assert not motor.update(ventas.head(10))
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,73 @@
+"""
+Tests para la comparación de modelos candidatos
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+import os
+import sys
+import time
+from functools import partial
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend', 'app'))
+
+from ml.comparison import compare_candidates
+
+def desplazado(desplazamiento, train, test, granularidad='D'):
+    """Candidato de prueba: valores reales más un desplazamiento fijo"""
+    return None, test['y'].values + desplazamiento, {'desplazamiento': desplazamiento}
+
+def lento(segundos, train, test, granularidad='D'):
+    """Candidato de prueba que tarda ``segundos`` en ajustarse"""
+    time.sleep(segundos)
+    return None, test['y'].values, {}
+
+def fallido(train, test, granularidad='D'):
+    raise ValueError("no converge")
+
+@pytest.fixture
+def datos():
+    """Serie de entrenamiento y de prueba"""
+    ds = pd.date_range('2024-01-01', periods=40, freq='D')
+    serie = pd.DataFrame({'ds': ds, 'y': np.arange(40, dtype=float)})
+    return serie.iloc[:30], serie.iloc[30:]
+
+def candidatos(segundos_lento):
+    """Dos candidatos rápidos, uno que agota su tiempo y uno que falla"""
+    return {
+        'exacto': partial(desplazado, 0.5),
+        'sesgado': partial(desplazado, 3.0),
+        'lento': partial(lento, segundos_lento),
+        'fallido': fallido
+    }
+
+TIMEOUTS = {'exacto': 20, 'sesgado': 20, 'lento': 1, 'fallido': 20}
+
+class TestCompareCandidates:
+    """Tests para compare_candidates"""
+
+    def test_timeout_en_paralelo(self, datos):
+        """El candidato lento se descarta por tiempo sin retrasar a los demás"""
+        inicio = time.perf_counter()
+        resultados, agotados = compare_candidates(candidatos(60), *datos, timeouts=TIMEOUTS, paralelo=True)
+
+        assert agotados == ['lento']
+        assert sorted(resultados) == ['exacto', 'sesgado']
+        assert resultados['exacto']['rmse'] == pytest.approx(0.5)
+        assert resultados['sesgado']['mae'] == pytest.approx(3.0)
+        assert resultados['sesgado']['hiperparametros'] == {'desplazamiento': 3.0}
+        # El candidato lento se termina al agotar su plazo, no al acabar su ajuste
+        assert time.perf_counter() - inicio < 60
+
+    def test_secuencial_igual_que_paralelo(self, datos):
+        """El ajuste secuencial (procesos daemon) descarta los mismos candidatos"""
+        paralelo = compare_candidates(candidatos(1.5), *datos, timeouts=TIMEOUTS, paralelo=True)
+        secuencial = compare_candidates(candidatos(1.5), *datos, timeouts=TIMEOUTS, paralelo=False)
+
+        assert secuencial[1] == paralelo[1] == ['lento']
+        assert sorted(secuencial[0]) == sorted(paralelo[0])
+        for nombre in secuencial[0]:
+            assert secuencial[0][nombre]['rmse'] == paralelo[0][nombre]['rmse']
+            assert secuencial[0][nombre]['mae'] == paralelo[0][nombre]['mae']
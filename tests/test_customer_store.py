@@ -0,0 +1,114 @@
+"""
+Tests para el almacén de características de clientes
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+import os
+import sys
+
+# Agregar el directorio backend al path (el módulo importa app.*)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.utils.customer_store import CustomerStore
+
+@pytest.fixture
+def store():
+    """Almacén de tres clientes; C2 no tiene compras por canal"""
+    perfiles = pd.DataFrame({
+        'customer_id': ['C3', 'C1', 'C2'],
+        'ventas_totales': [50.0, 300.0, 20.0],
+        'num_transacciones': [1, 3, 1],
+        'ultima_compra': pd.to_datetime(['2024-01-10', '2024-01-20', '2024-01-05'])
+    })
+    detalle = {
+        'compras_temporales': pd.DataFrame({
+            'customer_id': ['C1', 'C3', 'C1', 'C2', 'C1'],
+            'fecha': pd.to_datetime(['2024-01-20', '2024-01-10', '2024-01-01', '2024-01-05', '2024-01-10']),
+            'total': [100.0, 50.0, 150.0, 20.0, 50.0],
+            'cantidad': [1, 1, 2, 1, 1]
+        }),
+        'compras_categoria': pd.DataFrame({
+            'customer_id': ['C1', 'C1', 'C2', 'C3'],
+            'categoria': ['Laptops', 'Tablets', 'Laptops', 'Audio'],
+            'total': [100.0, 200.0, 20.0, 50.0],
+            'cantidad': [1, 3, 1, 1]
+        }),
+        'compras_canal': pd.DataFrame({
+            'customer_id': ['C3', 'C1'],
+            'canal': ['Online', 'Tienda'],
+            'total': [50.0, 300.0],
+            'transacciones': [1, 3]
+        }),
+        'productos_favoritos': pd.DataFrame({
+            'customer_id': ['C1', 'C1', 'C2', 'C3'],
+            'product_id': ['P1', 'P2', 'P1', 'P3'],
+            'nombre': ['Laptop 1', 'Tablet 2', 'Laptop 1', 'Audio 3'],
+            'total': [100.0, 200.0, 20.0, 50.0],
+            'cantidad': [1, 3, 1, 1]
+        })
+    }
+    return CustomerStore.from_frames('v1', perfiles, detalle)
+
+class TestCustomerStore:
+    """Tests para CustomerStore"""
+
+    def test_offsets(self, store):
+        """Los offsets delimitan las filas de cada cliente en orden de customer_id"""
+        assert store.perfiles['customer_id'].tolist() == ['C1', 'C2', 'C3']
+        np.testing.assert_array_equal(store.offsets['compras_temporales'], [0, 3, 4, 5])
+        np.testing.assert_array_equal(store.offsets['compras_canal'], [0, 1, 1, 2])
+        assert store.perfiles['recency'].tolist() == [0, 15, 10]
+
+    def test_get_customer(self, store):
+        """Detalle ordenado por cliente, incluidos los extremos y tablas vacías"""
+        primero = store.get_customer('C1')
+        assert primero['compras_temporales']['fecha'].dt.day.tolist() == [1, 10, 20]
+        assert primero['productos_favoritos']['product_id'].tolist() == ['P2', 'P1']
+
+        ultimo = store.get_customer('C3')
+        assert ultimo['perfil']['ventas_totales'] == 50.0
+        assert ultimo['compras_canal']['canal'].tolist() == ['Online']
+
+        assert store.get_customer('C2')['compras_canal'].empty
+        assert store.get_customer('C9') is None
+        assert store.get_purchased_products('C9') == []
+
+    def test_guardar_y_cargar(self, store, tmp_path):
+        """El almacén se recupera igual desde parquet y npz"""
+        store.save(str(tmp_path))
+        cargado = CustomerStore.load('v1', str(tmp_path))
+
+        assert CustomerStore.load('v2', str(tmp_path)) is None
+        assert cargado.metadata == store.metadata
+        pd.testing.assert_frame_equal(cargado.perfiles, store.perfiles)
+        for nombre in CustomerStore.TABLAS:
+            np.testing.assert_array_equal(cargado.offsets[nombre], store.offsets[nombre])
+            pd.testing.assert_frame_equal(cargado.tablas[nombre], store.tablas[nombre])
+        assert cargado.get_purchased_products('C1') == ['P2', 'P1']
+        assert cargado._rfm_sketches is not None
+        pd.testing.assert_frame_equal(cargado.rfm_scores(), store.rfm_scores())
+
+    def test_scores_rfm_con_empates(self):
+        """Con frecuencias muy repetidas se asignan igualmente los cinco scores"""
+        rng = np.random.default_rng(0)
+        n = 2000
+        perfiles = pd.DataFrame({
+            'customer_id': [f'C{i}' for i in range(n)],
+            'ventas_totales': rng.exponential(100.0, n),
+            # La mitad de los clientes tiene una sola compra
+            'num_transacciones': np.where(rng.random(n) < 0.5, 1, rng.integers(2, 4, n)),
+            'ultima_compra': pd.Timestamp('2024-03-01') - pd.to_timedelta(rng.integers(0, 5, n), unit='D')
+        })
+        store = CustomerStore.from_frames('v1', perfiles, {})
+        scores = store.rfm_scores()
+
+        for columna in ['R_score', 'F_score', 'M_score']:
+            assert sorted(scores[columna].unique()) == [1, 2, 3, 4, 5]
+            # Quintiles de tamaño parecido pese a los empates
+            assert scores[columna].value_counts().min() > 0.15 * n
+
+        # A más compras, score de frecuencia igual o mayor
+        por_frecuencia = scores['F_score'].groupby(store.perfiles['frequency']).agg(['min', 'max'])
+        assert (por_frecuencia['max'].to_numpy()[:-1] <= por_frecuencia['min'].to_numpy()[1:]).all()
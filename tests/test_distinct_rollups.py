@@ -0,0 +1,54 @@
+"""
+Tests para la caché de sketches por versión de datos
+"""
+
+import pytest
+import os
+import sys
+
+pytest.importorskip("pyspark")
+
+# Agregar el directorio backend al path (el módulo importa app.*)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.utils import distinct_rollups
+
+class _DataGenerator:
+    """Generador sin Spark: devuelve un marcador como datos combinados"""
+
+    def get_combined_data(self):
+        return 'ventas'
+
+    def stop_spark(self):
+        pass
+
+@pytest.fixture
+def version(monkeypatch):
+    """Versión de datos controlada por el test y caché vacía"""
+    actual = {'version': 'v1'}
+    monkeypatch.setattr(distinct_rollups, 'DataGenerator', _DataGenerator)
+    monkeypatch.setattr(distinct_rollups, 'get_data_version', lambda: actual['version'])
+    monkeypatch.setattr(distinct_rollups, '_sketches', {})
+    return actual
+
+class TestGetSketch:
+    """Tests para _get_sketch"""
+
+    def test_sketches_independientes(self, version):
+        """Cada sketch se construye por separado, una vez por versión de datos"""
+        construidos = []
+
+        def construir(nombre):
+            def _construir(df_completo):
+                construidos.append((nombre, df_completo))
+                return f"{nombre}-{version['version']}"
+            return _construir
+
+        assert distinct_rollups._get_sketch('ticket', construir('ticket')) == 'ticket-v1'
+        assert distinct_rollups._get_sketch('ticket', construir('ticket')) == 'ticket-v1'
+        assert construidos == [('ticket', 'ventas')]
+
+        version['version'] = 'v2'
+        assert distinct_rollups._get_sketch('ticket', construir('ticket')) == 'ticket-v2'
+        assert distinct_rollups._get_sketch('rollups', construir('rollups')) == 'rollups-v2'
+        assert construidos == [('ticket', 'ventas'), ('ticket', 'ventas'), ('rollups', 'ventas')]
@@ -0,0 +1,81 @@
+"""
+Tests para la caché de predicciones
+"""
+
+import pytest
+import pandas as pd
+import os
+import sys
+
+# Agregar el directorio backend al path (y backend para los imports app.*)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend', 'app'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from ml.forecast_cache import cached_forecast, cached_history
+from utils.cache import VersionedCache
+
+class ForecasterPrueba:
+    """Forecaster de prueba que cuenta las predicciones calculadas"""
+
+    def __init__(self, model_version):
+        self.model_version = model_version
+        self.horizontes = []
+
+    def predict_future_sales(self, periods, data):
+        self.horizontes.append(periods)
+        fechas = pd.date_range(data['ds'].max() + pd.Timedelta(days=1), periods=periods, freq='D')
+        return [{'fecha': fecha.strftime('%Y-%m-%d'), 'prediccion': float(i)} for i, fecha in enumerate(fechas)]
+
+    def get_model_performance(self, data):
+        return {'rmse': 1.0, 'mae': 1.0, 'mape': 1.0, 'model': 'holt_winters'}
+
+@pytest.fixture
+def serie():
+    """Serie diaria sintética"""
+    return pd.DataFrame({'ds': pd.date_range('2024-01-01', periods=60, freq='D'), 'y': 100.0})
+
+@pytest.fixture
+def cache(tmp_path):
+    return VersionedCache(str(tmp_path))
+
+class TestForecastCache:
+    """Tests para la caché de predicciones por versión de modelo"""
+
+    def test_recorte_del_horizonte_mas_largo(self, serie, cache):
+        """Los horizontes cortos se sirven recortando una única predicción"""
+        forecaster = ForecasterPrueba('v1')
+
+        predicciones, metricas = cached_forecast(forecaster, serie, 6, cache=cache)
+        otras, _ = cached_forecast(forecaster, serie, 12, cache=cache)
+
+        assert len(predicciones) == 6
+        assert otras[:6] == predicciones
+        assert metricas['rmse'] == 1.0
+        assert forecaster.horizontes == [30]
+
+    def test_horizonte_mayor_recalcula(self, serie, cache):
+        """Un horizonte mayor que el cacheado amplía la entrada"""
+        forecaster = ForecasterPrueba('v1')
+
+        cached_forecast(forecaster, serie, 6, cache=cache)
+        predicciones, _ = cached_forecast(forecaster, serie, 45, cache=cache)
+        cached_forecast(forecaster, serie, 40, cache=cache)
+
+        assert len(predicciones) == 45
+        assert forecaster.horizontes == [30, 45]
+
+    def test_invalidacion_por_version_de_modelo(self, serie, cache):
+        """Un modelo nuevo no reutiliza las predicciones ni el historial del anterior"""
+        antiguo, nuevo = ForecasterPrueba('v1'), ForecasterPrueba('v2')
+
+        cached_forecast(antiguo, serie, 6, cache=cache)
+        cached_forecast(nuevo, serie, 6, cache=cache)
+
+        assert antiguo.horizontes == [30]
+        assert nuevo.horizontes == [30]
+
+        calculos = []
+        for forecaster in [antiguo, antiguo, nuevo]:
+            cached_history(forecaster, lambda: calculos.append(1) or {'historial': []}, cache=cache)
+
+        assert len(calculos) == 2
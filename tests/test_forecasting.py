@@ -0,0 +1,114 @@
+"""
+Tests para el sistema de forecasting
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+import os
+import sys
+
+# Agregar el directorio backend al path (el módulo importa app.*)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+pytest.importorskip("prophet")
+pytest.importorskip("pyspark")
+
+from app.ml import forecasting
+from app.ml.forecasting import SalesForecaster
+from app.ml.registry import ModelRegistry
+from app.utils.cache import VersionedCache
+
+@pytest.fixture
+def serie():
+    """Serie diaria sintética con estacionalidad semanal"""
+    rng = np.random.default_rng(0)
+    ds = pd.date_range('2023-01-01', periods=200, freq='D')
+    y = 1000 + 100 * np.sin(2 * np.pi * np.arange(200) / 7) + rng.normal(0, 20, 200)
+    return pd.DataFrame({'ds': ds, 'y': y})
+
+@pytest.fixture
+def ar1():
+    """Serie diaria AR(1) alrededor de 1000 (260 días: 230 de entrenamiento y 30 nuevos)"""
+    rng = np.random.default_rng(1)
+    y = np.zeros(260)
+    for t in range(1, 260):
+        y[t] = 0.6 * y[t - 1] + rng.normal(0, 20)
+    return pd.DataFrame({'ds': pd.date_range('2023-01-01', periods=260, freq='D'), 'y': 1000 + y})
+
+@pytest.fixture
+def cargado(ar1, tmp_path, monkeypatch):
+    """Forecaster ARIMA + Holt-Winters entrenado con los primeros 230 días y recargado del registro"""
+    monkeypatch.setattr(forecasting, 'versioned_cache', VersionedCache(str(tmp_path / "cache")))
+    registry = ModelRegistry("forecast", registry_dir=str(tmp_path / "registry"))
+    train = ar1.iloc[:230]
+
+    forecaster = SalesForecaster()
+    forecaster.registry = registry
+    forecaster.train_models(train, 'arima')
+    forecaster.train_baseline_model(train, 'holt_winters')
+    # RMSE de referencia: la desviación de la serie (lo que cabe esperar a 30 días vista)
+    forecaster.metricas = {'arima': {'rmse': float(train['y'].std())}}
+    forecaster.save_models(train, 'v1')
+
+    cargado = SalesForecaster()
+    cargado.registry = registry
+    cargado.load_models()
+    return cargado
+
+class TestUpdateModels:
+    """Tests para la actualización incremental con detección de deriva"""
+
+    def test_dias_en_distribucion(self, ar1, cargado):
+        """Días nuevos del mismo proceso: se añaden sin reajustar los parámetros"""
+        parametros = np.asarray(cargado.arima_model.params).copy()
+
+        assert cargado.update_models(ar1)
+
+        assert cargado.arima_model.fittedvalues.index[-1] == ar1['ds'].iloc[-1]
+        np.testing.assert_allclose(np.asarray(cargado.arima_model.params), parametros)
+        assert cargado.holt_winters_model.n_obs == len(ar1)
+        assert cargado.actualizacion['tipo'] == 'incremental'
+        assert cargado.actualizacion['dias_nuevos'] == 30
+        assert cargado.actualizacion['deriva'] <= 1.5
+
+    def test_dias_desplazados(self, ar1, cargado):
+        """Un cambio de nivel en los días nuevos es deriva: se pide reentrenar"""
+        desplazada = ar1.copy()
+        desplazada.loc[230:, 'y'] += 300
+
+        assert not cargado.update_models(desplazada)
+
+        assert cargado.arima_model.fittedvalues.index[-1] == ar1['ds'].iloc[229]
+        assert cargado.actualizacion is None
+
+    def test_historico_modificado(self, ar1, cargado):
+        """Sin días nuevos no hay actualización incremental posible"""
+        assert not cargado.update_models(ar1.iloc[:230])
+
+class TestFitArima:
+    """Tests para la selección cacheada del orden ARIMA"""
+
+    def test_orden_por_contenido_de_la_serie(self, serie, tmp_path, monkeypatch):
+        """Cada ventana de entrenamiento tiene su propia búsqueda; la misma ventana se reutiliza"""
+        busquedas = []
+
+        def buscar(y, executor=None, **opciones):
+            busquedas.append(len(y))
+            return {'order': (1, 0, 0), 'seasonal_order': (0, 0, 0, 0), 'aic': 0.0, 'modelos_ajustados': 1}
+
+        monkeypatch.setattr(forecasting, 'versioned_cache', VersionedCache(str(tmp_path)))
+        monkeypatch.setattr(forecasting, 'search_arima_order', buscar)
+
+        forecasting.fit_arima(serie)
+        forecasting.fit_arima(serie.iloc[:-30])
+        forecasting.fit_arima(serie.iloc[:-30])
+        # Alternar cortes no descarta la selección de los demás
+        forecasting.fit_arima(serie)
+
+        assert busquedas == [200, 170]
+
+        # Mismo corte con otros datos: se vuelve a buscar
+        modificada = serie.assign(y=serie['y'] + 1)
+        forecasting.fit_arima(modificada)
+        assert busquedas == [200, 170, 200]
@@ -0,0 +1,95 @@
+"""
+Tests para el forecasting jerárquico
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+import os
+import sys
+
+# Agregar el directorio backend al path (y backend para los imports app.*)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend', 'app'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from ml.hierarchical import HierarchicalForecaster, forecast_matrix
+
+@pytest.fixture
+def ventas():
+    """Ventas diarias sintéticas por producto y por ciudad"""
+    rng = np.random.default_rng(0)
+    fechas = pd.date_range('2024-01-01', periods=120, freq='D')
+    productos = [(f'P{i:03d}', ['Audio', 'Gaming', 'Ropa'][i % 3]) for i in range(12)]
+
+    filas = []
+    for product_id, categoria in productos:
+        base = rng.uniform(50, 200)
+        semanal = 1 + 0.3 * np.sin(2 * np.pi * np.arange(len(fechas)) / 7)
+        for fecha, valor in zip(fechas, base * semanal + rng.normal(0, 5, len(fechas))):
+            filas.append((fecha, categoria, product_id, max(valor, 0)))
+    ventas_producto = pd.DataFrame(filas, columns=['fecha', 'categoria', 'product_id', 'total'])
+
+    # Reparto del total diario entre ciudades con pesos fijos
+    total_diario = ventas_producto.groupby('fecha')['total'].sum()
+    pesos = {'Madrid': 0.5, 'Sevilla': 0.3, 'Bilbao': 0.2}
+    ventas_ciudad = pd.DataFrame([
+        (fecha, ciudad, total * peso) for fecha, total in total_diario.items() for ciudad, peso in pesos.items()
+    ], columns=['fecha', 'ciudad', 'total'])
+
+    return ventas_producto, ventas_ciudad
+
+class TestHierarchicalForecaster:
+    """Tests para la clase HierarchicalForecaster"""
+
+    @pytest.mark.parametrize('metodo', ['bottom_up', 'top_down'])
+    def test_coherencia(self, ventas, metodo):
+        """Categorías y ciudades suman el total en cada día predicho"""
+        forecaster = HierarchicalForecaster(horizonte=14, metodo=metodo, n_jobs=1).fit(*ventas)
+        series, predicciones = forecaster.series, forecaster.predicciones
+
+        total = predicciones[series['nivel'] == 'total'][0]
+        assert np.allclose(predicciones[series['nivel'] == 'categoria'].sum(axis=0), total)
+        assert np.allclose(predicciones[series['nivel'] == 'producto'].sum(axis=0), total)
+        assert np.allclose(predicciones[series['nivel'] == 'ciudad'].sum(axis=0), total)
+        assert len(forecaster.fechas) == 14
+        assert forecaster.fechas[0] == pd.Timestamp('2024-04-30')
+
+    def test_top_down_proporciones(self, ventas):
+        """Top-down reparte el total según la proporción histórica de cada ciudad"""
+        forecaster = HierarchicalForecaster(horizonte=7, metodo='top_down', n_jobs=1).fit(*ventas)
+        series, predicciones = forecaster.series, forecaster.predicciones
+
+        total = predicciones[series['nivel'] == 'total'][0]
+        madrid = predicciones[(series['serie'] == 'Madrid').values][0]
+        assert np.allclose(madrid, 0.5 * total)
+        assert forecaster.rendimiento['series_ajustadas'] == 1
+
+    def test_paginacion(self, ventas):
+        """Las páginas recorren las series de un nivel sin solaparse"""
+        forecaster = HierarchicalForecaster(horizonte=7, n_jobs=1).fit(*ventas)
+
+        total, primera = forecaster.page('producto', periods=3, offset=0, limit=5)
+        _, segunda = forecaster.page('producto', periods=3, offset=5, limit=5)
+
+        assert total == 12
+        assert len(primera) == 5 and len(primera[0]['predicciones']) == 3
+        assert {s['serie'] for s in primera}.isdisjoint({s['serie'] for s in segunda})
+        assert primera[0]['padre'] in {'Audio', 'Gaming', 'Ropa'}
+
+    def test_series_intermitentes(self):
+        """Series casi vacías o cortas nunca predicen negativo"""
+        y = np.zeros((60, 1))
+        y[[3, 10]] = 5
+
+        prediccion = forecast_matrix(y, 14)
+        assert prediccion.shape == (1, 14)
+        assert (prediccion >= 0).all()
+
+        # Con menos de dos semanas se predice la media
+        assert np.allclose(forecast_matrix(np.full((10, 2), 3.0), 7), 3.0)
+
+        # Una matriz sin series devuelve una matriz vacía
+        assert forecast_matrix(np.empty((60, 0)), 7).shape == (0, 7)
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,125 @@
+"""
+Tests para la cola de trabajos en segundo plano
+"""
+
+import pytest
+import os
+import sys
+import time
+
+# Agregar el directorio backend al path (el módulo importa app.*)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.utils.jobs import JobQueue
+
+def esperar_fichero(ruta):
+    """Tarea que no termina hasta que existe ``ruta``"""
+    while not os.path.exists(ruta):
+        time.sleep(0.05)
+    return {'fichero': ruta}
+
+def sumar(a, b):
+    return {'suma': a + b}
+
+def fallar(mensaje):
+    raise ValueError(mensaje)
+
+def abortar():
+    """Tarea que mata el proceso worker sin registrar el resultado"""
+    os._exit(1)
+
+TAREAS_PRUEBA = {
+    'esperar': f'{__name__}:esperar_fichero',
+    'sumar': f'{__name__}:sumar',
+    'fallar': f'{__name__}:fallar',
+    'abortar': f'{__name__}:abortar'
+}
+
+def esperar_estado(queue, job_id, estados, timeout=60):
+    """Consulta el trabajo hasta que llega a uno de ``estados``"""
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        job = queue.get(job_id)
+        if job['estado'] in estados:
+            return job
+        time.sleep(0.05)
+    raise TimeoutError(f"El trabajo {job_id} no llegó a {estados}: {job['estado']}")
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(db_path=str(tmp_path / "jobs.db"), max_workers=1, tareas=TAREAS_PRUEBA)
+    yield queue
+    queue.shutdown()
+
+class TestJobQueue:
+    """Tests para JobQueue"""
+
+    def test_resultado(self, queue):
+        """Un trabajo completado guarda su resultado y sus tiempos"""
+        job = queue.submit('sumar', {'a': 1, 'b': 2})
+        assert job['estado'] == 'pendiente'
+        assert not job['duplicado']
+
+        job = esperar_estado(queue, job['id'], ('completado', 'fallido'))
+
+        assert job['estado'] == 'completado'
+        assert job['resultado'] == {'suma': 3}
+        assert job['iniciado'] <= job['finalizado']
+
+    def test_estados_y_duplicados(self, queue, tmp_path):
+        """Un trabajo idéntico activo se reutiliza; terminado, se encola uno nuevo"""
+        parametros = {'ruta': str(tmp_path / "continuar")}
+        job = queue.submit('esperar', parametros)
+        esperar_estado(queue, job['id'], ('ejecutando',))
+
+        duplicado = queue.submit('esperar', parametros)
+        assert duplicado['duplicado']
+        assert duplicado['id'] == job['id']
+
+        open(parametros['ruta'], 'w').close()
+        assert esperar_estado(queue, job['id'], ('completado', 'fallido'))['estado'] == 'completado'
+
+        nuevo = queue.submit('esperar', parametros)
+        assert not nuevo['duplicado']
+        assert nuevo['id'] != job['id']
+        esperar_estado(queue, nuevo['id'], ('completado',))
+
+    def test_error(self, queue):
+        """Las excepciones de la tarea se registran con su traza"""
+        job = esperar_estado(queue, queue.submit('fallar', {'mensaje': 'sin datos'})['id'], ('completado', 'fallido'))
+
+        assert job['estado'] == 'fallido'
+        assert job['error'].startswith('sin datos')
+        assert 'ValueError' in job['error']
+
+    def test_worker_muerto(self, queue):
+        """Si el worker muere el trabajo falla y el pool se recrea para los siguientes"""
+        job = esperar_estado(queue, queue.submit('abortar')['id'], ('fallido',))
+        assert 'Worker terminado inesperadamente' in job['error']
+
+        siguiente = queue.submit('sumar', {'a': 2, 'b': 2})
+        assert esperar_estado(queue, siguiente['id'], ('completado', 'fallido'))['resultado'] == {'suma': 4}
+
+    def test_tipo_no_valido(self, queue):
+        """Solo se aceptan los tipos de trabajo configurados"""
+        with pytest.raises(ValueError):
+            queue.submit('forecast_train')
+
+    def test_reinicio(self, tmp_path):
+        """Los trabajos activos de una ejecución anterior se marcan como fallidos"""
+        db_path = str(tmp_path / "jobs.db")
+        ruta = str(tmp_path / "continuar")
+        queue = JobQueue(db_path=db_path, tareas=TAREAS_PRUEBA)
+        job = queue.submit('esperar', {'ruta': ruta})
+        esperar_estado(queue, job['id'], ('ejecutando',))
+
+        try:
+            reiniciada = JobQueue(db_path=db_path, tareas=TAREAS_PRUEBA)
+            job = reiniciada.get(job['id'])
+
+            assert job['estado'] == 'fallido'
+            assert job['error'] == 'Interrumpido por reinicio del servidor'
+        finally:
+            # Deja terminar al worker para poder cerrar el pool
+            open(ruta, 'w').close()
+            queue.shutdown()
@@ -0,0 +1,101 @@
+"""
+Tests para la búsqueda de órdenes ARIMA
+"""
+
+import pytest
+import numpy as np
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend', 'app'))
+
+from ml import order_search
+from ml.order_search import ndiffs, candidate_orders, search_arima_order, get_search_executor
+
+class ExecutorContado:
+    """Envuelve un executor y cuenta los ajustes enviados a sus workers"""
+
+    def __init__(self, executor):
+        self.executor = executor
+        self.enviados = 0
+
+    def submit(self, *args, **kwargs):
+        self.enviados += 1
+        return self.executor.submit(*args, **kwargs)
+
+class TestOrderSearch:
+    """Tests para la selección automática del orden ARIMA"""
+
+    def test_ndiffs(self):
+        """Un paseo aleatorio necesita una diferenciación y el ruido blanco ninguna"""
+        rng = np.random.default_rng(0)
+        ruido = rng.normal(size=500)
+
+        assert ndiffs(ruido) == 0
+        assert ndiffs(np.cumsum(ruido)) == 1
+
+    def test_niveles_por_complejidad(self):
+        """La rejilla se agrupa por p+q creciente y conserva d"""
+        niveles = candidate_orders(d=1, max_p=2, max_q=2)
+
+        assert niveles[0] == [((0, 1, 0), (0, 0, 0, 0))]
+        assert sum(len(nivel) for nivel in niveles) == 9
+        assert all(order[1] == 1 for nivel in niveles for order, _ in nivel)
+
+    def test_recupera_proceso_ar(self):
+        """Sobre un AR(1) se elige un orden con componente AR sin diferenciar"""
+        rng = np.random.default_rng(1)
+        y = np.zeros(400)
+        for t in range(1, 400):
+            y[t] = 0.8 * y[t - 1] + rng.normal()
+
+        seleccion = search_arima_order(y, max_p=2, max_q=2)
+
+        assert seleccion['order'][0] >= 1
+        assert seleccion['order'][1] == 0
+        assert np.isfinite(seleccion['aic'])
+
+    def test_parada_temprana(self):
+        """Con paciencia 1 no se ajusta toda la rejilla"""
+        rng = np.random.default_rng(2)
+        seleccion = search_arima_order(rng.normal(size=300), max_p=3, max_q=3)
+
+        assert seleccion['modelos_ajustados'] < 16
+
+    def test_executor_paralelo(self):
+        """Con un pool de larga duración cada nivel se ajusta en sus workers con el mismo resultado"""
+        rng = np.random.default_rng(3)
+        y = np.zeros(300)
+        for t in range(1, 300):
+            y[t] = 0.6 * y[t - 1] + rng.normal()
+
+        secuencial = search_arima_order(y, max_p=2, max_q=2)
+        with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn')) as executor:
+            contado = ExecutorContado(executor)
+            paralelo = search_arima_order(y, max_p=2, max_q=2, executor=contado)
+
+        assert contado.enviados == paralelo['modelos_ajustados'] > 0
+        assert paralelo == secuencial
+
+    def test_pool_compartido(self, monkeypatch):
+        """El pool de las búsquedas se crea una vez por proceso y da el mismo orden que en serie"""
+        monkeypatch.setattr(order_search, '_executor', None)
+        monkeypatch.setattr(order_search.os, 'cpu_count', lambda: 1)
+        assert get_search_executor() is None
+
+        monkeypatch.setattr(order_search.os, 'cpu_count', lambda: 2)
+        executor = get_search_executor()
+        try:
+            assert get_search_executor() is executor
+
+            rng = np.random.default_rng(4)
+            y = np.cumsum(rng.normal(size=250))
+            assert search_arima_order(y, max_p=2, max_q=2, executor=executor) == search_arima_order(y, max_p=2, max_q=2)
+        finally:
+            executor.shutdown()
+
+if __name__ == "__main__":
+    pytest.main([__file__])
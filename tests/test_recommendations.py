@@ -0,0 +1,160 @@
+"""
+Tests para el sistema de recomendaciones
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+import os
+import sys
+
+pytest.importorskip("implicit")
+
+# Agregar el directorio backend al path (el módulo importa app.*)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.ml.recommendations import RecommendationSystem, RecommendationService
+from app.ml.registry import ModelNotFoundError
+from app.ml.user_item_matrix import UserItemMatrix
+from app.ml.similarity_index import SimilarityIndex
+
+def _sistema(registry_dir):
+    """Sistema mínimo con matriz usuario-producto y modelo content-based"""
+    rec_system = RecommendationSystem(registry_dir=str(registry_dir))
+    rec_system.user_item_matrix = UserItemMatrix.from_triples(['C1', 'C1', 'C2'], ['P1', 'P3', 'P2'], [1.0, 2.0, 3.0])
+    rec_system.content_model = {
+        'product_ids': np.array(['P1', 'P2', 'P3']),
+        'similarity_index': SimilarityIndex.from_similarity(np.eye(3)),
+        'productos': pd.DataFrame({
+            'product_id': ['P1', 'P2', 'P3'],
+            'nombre': ['Laptop 1', 'Mouse 2', 'Tablet 3'],
+            'categoria': ['Laptops', 'Accesorios', 'Tablets'],
+            'precio': [999.0, 19.9, 450.0]
+        })
+    }
+    return rec_system
+
+class _ALS:
+    """Factores de un modelo ALS ya entrenado"""
+
+    def __init__(self, user_factors, item_factors):
+        self.user_factors = user_factors
+        self.item_factors = item_factors
+
+class TestRecommendationSystem:
+    """Tests para RecommendationSystem"""
+
+    def test_recomendaciones_por_lotes(self, tmp_path):
+        """El lote coincide con el ranking de cada cliente sin lo ya comprado"""
+        rng = np.random.default_rng(0)
+        n_clientes, n_productos = 50, 20
+        rec_system = RecommendationSystem(registry_dir=str(tmp_path))
+        compras = rng.random((n_clientes, n_productos)) < 0.2
+        filas, columnas = np.nonzero(compras)
+        rec_system.user_item_matrix = UserItemMatrix.from_triples(
+            [f"C{i:02d}" for i in filas], [f"P{j:02d}" for j in columnas], np.ones(len(filas))
+        )
+        matriz = rec_system.user_item_matrix
+        rec_system.collaborative_model = _ALS(
+            rng.normal(size=(matriz.shape[0], 4)), rng.normal(size=(matriz.shape[1], 4))
+        )
+
+        clientes = matriz.clientes.tolist() + ['C99']
+        resultado = dict(rec_system.recommend_batch(clientes, n_recommendations=3, tam_bloque=7))
+
+        assert resultado['C99'] is None
+        for customer_id in matriz.clientes:
+            i = matriz.user_index(customer_id)
+            scores = rec_system.collaborative_model.item_factors @ rec_system.collaborative_model.user_factors[i]
+            scores[matriz.purchased_indices(i)] = -np.inf
+            esperado = matriz.productos[np.argsort(-scores)[:3]].tolist()
+
+            assert [product_id for product_id, _ in resultado[customer_id]] == esperado
+
+    def test_content_based(self, tmp_path):
+        """Similitud media con lo comprado, sin recomendar lo ya comprado"""
+        rec_system = _sistema(tmp_path)
+        rec_system.content_model['similarity_index'] = SimilarityIndex.from_similarity(np.array([
+            [1.0, 0.2, 0.4],
+            [0.2, 1.0, 0.6],
+            [0.4, 0.6, 1.0]
+        ]))
+
+        recomendaciones, status = rec_system.get_content_based_recommendations('C1', 5)
+
+        assert status == "Éxito"
+        assert recomendaciones == [('P2', pytest.approx(0.4))]
+
+    def test_productos_similares(self, tmp_path):
+        """Los similares se ordenan por similitud y excluyen el propio producto"""
+        rec_system = _sistema(tmp_path)
+        rec_system.content_model['similarity_index'] = SimilarityIndex.from_similarity(np.array([
+            [1.0, 1.0, 0.4],
+            [1.0, 1.0, 0.6],
+            [0.4, 0.6, 1.0]
+        ]))
+
+        similares, _ = rec_system.get_similar_products('P2', 5)
+
+        assert similares == [('P1', 1.0), ('P3', pytest.approx(0.6))]
+        assert rec_system.get_similar_products('P9')[1] == "Producto no encontrado"
+
+class TestRecommendationService:
+    """Tests para RecommendationService"""
+
+    def test_sin_modelos(self, tmp_path):
+        """Sin modelos registrados el servicio no está listo"""
+        service = RecommendationService(registry_dir=str(tmp_path))
+
+        with pytest.raises(ModelNotFoundError):
+            service.get()
+        assert not service.ready
+
+    def test_carga_unica(self, tmp_path):
+        """El sistema se carga una vez y se comparte entre llamadas"""
+        version = _sistema(tmp_path).save_models('v1')
+        service = RecommendationService(registry_dir=str(tmp_path))
+
+        sistema = service.get()
+
+        assert service.ready
+        assert service.get() is sistema
+        assert sistema.model_version == version
+        assert sistema.get_product_info('P2') == {'nombre': 'Mouse 2', 'categoria': 'Accesorios', 'precio': 19.9}
+        assert sistema.get_product_info('P9') is None
+
+    def test_modelo_obsoleto(self, tmp_path):
+        """Con datos nuevos el modelo se detecta como obsoleto y se sigue sirviendo"""
+        version = _sistema(tmp_path).save_models('v1')
+        service = RecommendationService(registry_dir=str(tmp_path))
+
+        assert not service.is_stale('v1')
+        assert service.is_stale('v2')
+        assert service.get().model_version == version
+
+    def test_cambio_de_version(self, tmp_path):
+        """Una versión nueva sustituye al sistema sin alterar el que ya usan las peticiones"""
+        _sistema(tmp_path).save_models('v1')
+        service = RecommendationService(registry_dir=str(tmp_path))
+        anterior = service.get()
+
+        nuevo = _sistema(tmp_path)
+        nuevo.user_item_matrix = UserItemMatrix.from_triples(['C1', 'C2'], ['P2', 'P2'], [5.0, 1.0])
+        version = nuevo.save_models('v2')
+
+        actual = service.get()
+        assert actual is not anterior
+        assert actual.model_version == version
+        assert actual.user_item_matrix.purchased_products('C1') == ['P2']
+        assert anterior.user_item_matrix.purchased_products('C1') == ['P1', 'P3']
+
+    def test_version_no_cargable(self, tmp_path):
+        """Si la versión nueva no se puede cargar se sigue sirviendo la anterior"""
+        _sistema(tmp_path).save_models('v1')
+        service = RecommendationService(registry_dir=str(tmp_path))
+        anterior = service.get()
+
+        version = _sistema(tmp_path).save_models('v2')
+        os.remove(os.path.join(str(tmp_path), 'recommendations', version, 'user_item_matrix.pkl'))
+
+        assert service.get() is anterior
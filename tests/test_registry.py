@@ -0,0 +1,109 @@
+"""
+Tests para el registro versionado de modelos
+"""
+
+import pytest
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend', 'app'))
+
+from ml.registry import ModelRegistry, ModelNotFoundError, StaleModelError
+
+def _publicar_varias(registry_dir, proceso, n):
+    """Publica ``n`` versiones de datos distintas desde un proceso (worker)"""
+    registry = ModelRegistry("forecast", registry_dir=registry_dir, conservar=None)
+    return [registry.publish({'modelo': i}, {'data_version': f"p{proceso}-{i}"}) for i in range(n)]
+
+class TestModelRegistry:
+    """Tests para la clase ModelRegistry"""
+
+    def test_registro_vacio(self, tmp_path):
+        """Sin publicaciones no hay modelo que cargar"""
+        registry = ModelRegistry("forecast", registry_dir=str(tmp_path))
+
+        with pytest.raises(ModelNotFoundError):
+            registry.load()
+        assert registry.is_stale("v1")
+
+    def test_publicar_y_cargar(self, tmp_path):
+        """Los artefactos y metadatos publicados se recuperan por versión de datos"""
+        registry = ModelRegistry("forecast", registry_dir=str(tmp_path))
+        version = registry.publish(
+            {'modelo': {'coef': [1, 2, 3]}, 'vacio': None},
+            {'data_version': 'v1', 'metricas': {'rmse': 1.5}}
+        )
+
+        artefactos, metadata = registry.load('v1')
+
+        assert artefactos == {'modelo': {'coef': [1, 2, 3]}}
+        assert metadata['version'] == version
+        assert metadata['metricas'] == {'rmse': 1.5}
+        assert not registry.is_stale('v1')
+        assert not any(nombre.startswith('.tmp') for nombre in os.listdir(registry.directorio))
+
+    def test_modelo_obsoleto(self, tmp_path):
+        """Un modelo de otra versión de datos se detecta como obsoleto"""
+        registry = ModelRegistry("forecast", registry_dir=str(tmp_path))
+        registry.publish({'modelo': 1}, {'data_version': 'v1'})
+
+        with pytest.raises(StaleModelError) as excinfo:
+            registry.load('v2')
+
+        assert excinfo.value.metadata['data_version'] == 'v1'
+        assert registry.is_stale('v2')
+
+        # Sin versión de datos se carga el último modelo publicado
+        artefactos, _ = registry.load()
+        assert artefactos == {'modelo': 1}
+
+    def test_formato_de_guardado(self, tmp_path):
+        """Cada artefacto se guarda con la función indicada y se registra su tamaño"""
+        registry = ModelRegistry("forecast", registry_dir=str(tmp_path))
+
+        def guardar(nombre, artefacto, directorio):
+            fichero = f"{nombre}.txt"
+            with open(os.path.join(directorio, fichero), 'w') as f:
+                f.write(artefacto)
+            return fichero
+
+        registry.publish({'modelo': 'parametros'}, {'data_version': 'v1'}, guardar=guardar)
+
+        def cargar(ruta):
+            with open(ruta) as f:
+                return f.read()
+
+        artefactos, metadata = registry.load('v1', cargar=cargar)
+
+        assert artefactos == {'modelo': 'parametros'}
+        assert metadata['ficheros'] == {'modelo': 'modelo.txt'}
+        assert metadata['tamano_artefactos'] == {'modelo': len('parametros')}
+
+    def test_publicaciones_concurrentes(self, tmp_path):
+        """Varios procesos publicando a la vez no pierden entradas del índice"""
+        with ProcessPoolExecutor(max_workers=4, mp_context=multiprocessing.get_context('spawn')) as executor:
+            versiones = list(executor.map(_publicar_varias, [str(tmp_path)] * 4, range(4), [10] * 4))
+
+        registry = ModelRegistry("forecast", registry_dir=str(tmp_path), conservar=None)
+        for proceso, publicadas in enumerate(versiones):
+            for i, version in enumerate(publicadas):
+                assert registry.current_version(f"p{proceso}-{i}") == version
+        assert not any(nombre.endswith('.tmp') for nombre in os.listdir(registry.directorio))
+
+    def test_conserva_las_ultimas_versiones(self, tmp_path):
+        """Al publicar se borran las versiones antiguas y sus entradas del índice"""
+        registry = ModelRegistry("forecast", registry_dir=str(tmp_path), conservar=3)
+        versiones = [registry.publish({'modelo': i}, {'data_version': f"v{i}"}) for i in range(5)]
+
+        assert sorted(
+            nombre for nombre in os.listdir(registry.directorio) if not nombre.startswith('.')
+        ) == sorted(versiones[-3:] + ['index.json'])
+        assert registry.is_stale('v1')
+        assert registry.current_version('v2') == versiones[2]
+        assert registry.load('v4')[0] == {'modelo': 4}
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,51 @@
+"""
+Tests para el remuestreo de series temporales
+"""
+
+import pytest
+import pandas as pd
+import os
+import sys
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend', 'app'))
+
+from utils.resampling import GRANULARIDADES, resample_series
+
+@pytest.fixture
+def serie():
+    """Serie diaria con una venta de 1 por día entre un martes y un jueves"""
+    ds = pd.date_range('2023-01-10', '2024-08-01', freq='D')
+    return pd.DataFrame({'ds': ds, 'y': 1.0, 'cantidad': 2.0, 'venta_id': 1})
+
+class TestResampleSeries:
+    """Tests para resample_series"""
+
+    def test_semanal(self, serie):
+        """Semanas completas de lunes a domingo etiquetadas con el lunes"""
+        semanal = resample_series(serie, 'W')
+
+        assert (semanal['ds'].dt.dayofweek == 0).all()
+        assert semanal['ds'].iloc[0] == pd.Timestamp('2023-01-16')
+        assert semanal['ds'].iloc[-1] == pd.Timestamp('2024-07-22')
+        assert (semanal['y'] == 7).all()
+        assert (semanal['cantidad'] == 14).all()
+
+    def test_mensual(self, serie):
+        """Los meses incompletos de los extremos se descartan"""
+        mensual = resample_series(serie, 'M')
+
+        assert mensual['ds'].iloc[0] == pd.Timestamp('2023-02-01')
+        assert mensual['ds'].iloc[-1] == pd.Timestamp('2024-07-01')
+        assert (mensual['y'].values == mensual['ds'].dt.days_in_month.values).all()
+
+    def test_diaria_y_no_valida(self, serie):
+        """La granularidad diaria no transforma la serie"""
+        assert resample_series(serie, 'D') is serie
+
+        with pytest.raises(ValueError):
+            resample_series(serie, 'Q')
+
+    def test_maximo_de_periodos(self):
+        """Cada granularidad limita el horizonte a su propia unidad"""
+        assert [GRANULARIDADES[g]['max_periodos'] for g in ('D', 'W', 'M')] == [90, 26, 12]
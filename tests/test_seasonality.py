@@ -0,0 +1,47 @@
+"""
+Tests para el perfil de estacionalidad
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+import os
+import sys
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend', 'app'))
+
+from ml.seasonality import seasonality_profile
+
+@pytest.fixture
+def serie():
+    """Serie diaria con tendencia creciente y pico de ventas los sábados"""
+    rng = np.random.default_rng(0)
+    ds = pd.date_range('2023-01-02', periods=364, freq='D')
+    y = 1000 + 2 * np.arange(364) + 300 * (ds.dayofweek == 5) + rng.normal(0, 20, 364)
+    return pd.DataFrame({'ds': ds, 'y': y})
+
+class TestSeasonalityProfile:
+    """Tests para seasonality_profile"""
+
+    def test_tendencia(self, serie):
+        """La pendiente de la tendencia recupera el crecimiento diario"""
+        perfil = seasonality_profile(serie)
+
+        assert perfil['tendencia_general']['direccion'] == 'creciente'
+        assert perfil['tendencia_general']['pendiente_diaria'] == pytest.approx(2, abs=0.2)
+
+    def test_perfil_semanal(self, serie):
+        """El sábado destaca en el perfil semanal y en el efecto estacional"""
+        perfil = seasonality_profile(serie)
+        sabado = perfil['estacionalidad_semanal'][5]
+
+        assert perfil['patrones']['mejor_dia'] == 'Sábado'
+        assert sabado['efecto_estacional'] == pytest.approx(300 * 6 / 7, rel=0.15)
+        assert perfil['fuerza_estacional_semanal'] > 0.8
+        assert len(perfil['estacionalidad_mensual']) == 12
+
+    def test_serie_corta(self, serie):
+        """Sin dos semanas de datos no hay perfil"""
+        with pytest.raises(ValueError):
+            seasonality_profile(serie.iloc[:10])
@@ -0,0 +1,54 @@
+"""
+Tests para la serialización compacta de modelos
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+import os
+import sys
+
+# Agregar el directorio backend al path (y backend para los imports app.*)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend', 'app'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from statsmodels.tsa.arima.model import ARIMA
+from ml.serialization import save_model, load_model, benchmark
+
+@pytest.fixture
+def arima():
+    """ARIMA ajustado sobre una serie diaria sintética"""
+    rng = np.random.default_rng(0)
+    ds = pd.date_range('2023-01-01', periods=200, freq='D')
+    y = pd.Series(1000 + rng.normal(0, 20, 200), index=ds, name='y')
+    return ARIMA(y, order=(1, 0, 1)).fit()
+
+class TestSerialization:
+    """Tests para el formato compacto de los modelos de forecasting"""
+
+    def test_arima_ida_y_vuelta(self, arima, tmp_path):
+        """El ARIMA recargado predice y admite nuevas observaciones como el original"""
+        fichero = save_model('arima_model', arima, str(tmp_path))
+        cargado = load_model(os.path.join(str(tmp_path), fichero))
+
+        assert fichero == 'arima_model.npz'
+        np.testing.assert_allclose(cargado.forecast(10), arima.forecast(10))
+        assert cargado.fittedvalues.index[-1] == arima.fittedvalues.index[-1]
+
+        nuevos = pd.Series([1000.0, 1010.0], index=pd.date_range('2023-07-20', periods=2, freq='D'), name='y')
+        np.testing.assert_allclose(
+            cargado.append(nuevos, refit=False).forecast(5),
+            arima.append(nuevos, refit=False).forecast(5)
+        )
+
+    def test_carga_memoizada(self, arima, tmp_path):
+        """Cargar dos veces la misma ruta devuelve el mismo objeto"""
+        ruta = os.path.join(str(tmp_path), save_model('arima_model', arima, str(tmp_path)))
+
+        assert load_model(ruta) is load_model(ruta)
+
+    def test_benchmark(self, arima, tmp_path):
+        """El formato compacto ocupa menos que el pickle completo"""
+        resultados = benchmark({'arima_model': arima}, str(tmp_path), repeticiones=1)
+
+        assert resultados['arima_model']['bytes_compacto'] < resultados['arima_model']['bytes_pickle']
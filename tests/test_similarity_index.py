@@ -0,0 +1,63 @@
+"""
+Tests para el índice de productos similares
+"""
+
+import pytest
+import numpy as np
+import os
+import sys
+from scipy.sparse import csr_matrix
+from sklearn.preprocessing import normalize
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend', 'app'))
+
+from ml.similarity_index import SimilarityIndex
+
+@pytest.fixture
+def vectores():
+    """Vectores dispersos normalizados de 40 productos"""
+    rng = np.random.default_rng(0)
+    densos = rng.random((40, 15)) * (rng.random((40, 15)) < 0.3)
+    return csr_matrix(normalize(densos))
+
+class TestSimilarityIndex:
+    """Tests para SimilarityIndex"""
+
+    def test_top_k_por_bloques(self, vectores):
+        """Los vecinos coinciden con el top-k de la matriz completa sin el propio producto"""
+        indice = SimilarityIndex.build(vectores, k=5, tam_bloque=7)
+        similitud = (vectores @ vectores.T).toarray()
+        np.fill_diagonal(similitud, -np.inf)
+
+        for i in range(len(indice)):
+            vecinos, scores = indice.neighbors(i)
+            esperados = np.sort(similitud[i])[::-1][:5]
+            esperados = esperados[esperados > 0]
+
+            assert i not in vecinos
+            assert len(vecinos) <= 5
+            np.testing.assert_allclose(scores, esperados, rtol=1e-5)
+            np.testing.assert_allclose(similitud[i, vecinos], scores, rtol=1e-5)
+
+    def test_vecinos_limitados(self, vectores):
+        """Se pueden pedir menos vecinos de los guardados"""
+        indice = SimilarityIndex.build(vectores, k=5)
+
+        vecinos, scores = indice.neighbors(0, 2)
+
+        assert len(vecinos) == min(2, len(indice.neighbors(0)[0]))
+        assert list(scores) == sorted(scores, reverse=True)
+
+    def test_similitud_media(self):
+        """La similitud media usa las filas de los productos indicados"""
+        similitud = np.array([
+            [1.0, 0.2, 0.4, 0.0],
+            [0.2, 1.0, 0.6, 0.1],
+            [0.4, 0.6, 1.0, 0.3],
+            [0.0, 0.1, 0.3, 1.0]
+        ])
+        indice = SimilarityIndex.from_similarity(similitud, k=2)
+
+        np.testing.assert_allclose(indice.mean_similarity([0, 1]), [0.1, 0.1, 0.5, 0.0])
+        assert indice.vecinos.nnz == 8
@@ -0,0 +1,143 @@
+"""
+Tests para los sketches probabilísticos
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+import os
+import sys
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend', 'app'))
+
+from utils.sketches import HyperLogLog, HLLRollup, KLLSketch, QuantileTracker, hash_values
+
+class TestHyperLogLog:
+    """Tests para HyperLogLog y los rollups por celda"""
+
+    def test_count_dentro_del_error(self):
+        """La estimación queda dentro de 3 errores estándar"""
+        for n in [10, 1000, 50000]:
+            sketch = HyperLogLog(p=12).add([f'C{i}' for i in range(n)])
+            assert abs(sketch.count() - n) / n < 3 * sketch.relative_error
+
+    def test_duplicados_no_cuentan(self):
+        """Añadir los mismos valores no cambia la estimación"""
+        sketch = HyperLogLog().add(range(500))
+        estimacion = sketch.count()
+        sketch.add(range(500))
+
+        assert sketch.count() == estimacion
+
+    def test_merge_es_union(self):
+        """Combinar sketches estima la unión de los conjuntos"""
+        a = HyperLogLog().add(range(0, 20000))
+        b = HyperLogLog().add(range(10000, 30000))
+
+        assert abs(a.merge(b).count() - 30000) / 30000 < 3 * a.relative_error
+
+    def test_merge_precision_distinta(self):
+        """No se pueden combinar sketches de distinta precisión"""
+        with pytest.raises(ValueError):
+            HyperLogLog(p=10).merge(HyperLogLog(p=12))
+
+    def test_rollup_por_dimension(self):
+        """Los conteos por dimensión y por rango de fechas salen de combinar celdas"""
+        rng = np.random.default_rng(1)
+        df = pd.DataFrame({
+            'fecha': pd.to_datetime('2024-01-01') + pd.to_timedelta(rng.integers(0, 60, 20000), unit='D'),
+            'ciudad': rng.choice(['Madrid', 'Sevilla', 'Bilbao'], 20000),
+            'customer_id': [f'C{i}' for i in rng.integers(0, 3000, 20000)]
+        })
+        rollup = HLLRollup(['fecha', 'ciudad'], p=12).build(df, 'customer_id')
+        tolerancia = 3 * rollup.relative_error
+
+        exacto = df.groupby('ciudad')['customer_id'].nunique()
+        aproximado = rollup.count_by('ciudad')
+        assert ((aproximado[exacto.index] - exacto).abs() / exacto < tolerancia).all()
+
+        desde = pd.Timestamp('2024-02-15')
+        exacto_rango = df[df['fecha'] >= desde]['customer_id'].nunique()
+        aproximado_rango = rollup.count(rollup.celdas['fecha'] >= desde)
+        assert abs(aproximado_rango - exacto_rango) / exacto_rango < tolerancia
+
+    def test_rollup_desde_registros(self):
+        """Los registros ya reducidos (uno por celda y registro) dan el mismo rollup"""
+        rng = np.random.default_rng(2)
+        df = pd.DataFrame({
+            'ciudad': rng.choice(['Madrid', 'Sevilla', 'Bilbao'], 5000),
+            'customer_id': [f'C{i}' for i in rng.integers(0, 800, 5000)]
+        })
+        esperado = HLLRollup(['ciudad']).build(df, 'customer_id')
+
+        indices, rangos = HyperLogLog.positions(hash_values(df['customer_id']), esperado.p)
+        registros = (
+            df[['ciudad']].assign(indice=indices, rango=rangos)
+            .groupby(['ciudad', 'indice'], as_index=False)['rango'].max()
+        )
+        rollup = HLLRollup(['ciudad']).from_registers(registros)
+
+        pd.testing.assert_frame_equal(rollup.celdas, esperado.celdas)
+        np.testing.assert_array_equal(rollup.registros, esperado.registros)
+
+class TestKLLSketch:
+    """Tests para el sketch de cuantiles KLL"""
+
+    def test_cuantiles_aproximados(self):
+        """El rango de los cuantiles estimados tiene un error pequeño"""
+        valores = np.random.default_rng(0).lognormal(size=200000)
+        sketch = KLLSketch(seed=0).add(valores)
+
+        for q, estimado in zip([0.1, 0.5, 0.9, 0.99], sketch.quantiles([0.1, 0.5, 0.9, 0.99])):
+            assert abs(np.mean(valores <= estimado) - q) < 0.02
+
+        # Memoria acotada respecto al número de valores
+        assert sum(len(nivel) for nivel in sketch.niveles) < 1000
+        assert sketch.n == len(valores)
+
+    def test_exacto_con_pocos_valores(self):
+        """Con menos valores que k no hay compactación y los cuantiles son exactos"""
+        sketch = KLLSketch(k=200).add(np.arange(1, 101))
+
+        assert sketch.quantile(0.5) == 50
+        assert sketch.quantile(1.0) == 100
+
+    def test_merge(self):
+        """Combinar sketches aproxima los cuantiles del conjunto completo"""
+        valores = np.random.default_rng(1).normal(size=100000)
+        a = KLLSketch(seed=1).add(valores[:50000])
+        b = KLLSketch(seed=2).add(valores[50000:])
+        a.merge(b)
+
+        assert a.n == len(valores)
+        assert abs(np.mean(valores <= a.quantile(0.5)) - 0.5) < 0.02
+
+    def test_bins_como_qcut(self):
+        """Los intervalos por quintiles coinciden casi siempre con pd.qcut"""
+        valores = np.random.default_rng(2).exponential(size=5000)
+        sketch = KLLSketch(seed=0).add(valores)
+
+        bins = sketch.bins(valores, 5)
+        referencia = pd.qcut(valores, 5, labels=False)
+
+        assert bins.min() == 0 and bins.max() == 4
+        assert np.mean(bins == referencia) > 0.95
+
+    def test_sketch_vacio(self):
+        """Un sketch vacío no tiene cuantiles"""
+        with pytest.raises(ValueError):
+            KLLSketch().quantile(0.5)
+
+    def test_quantile_tracker(self):
+        """El tracker mantiene un sketch por clave"""
+        tracker = QuantileTracker()
+        for valor in range(1, 101):
+            tracker.record('GET /api/v1/summary', valor)
+
+        resumen = tracker.summary()['GET /api/v1/summary']
+        assert resumen['n'] == 100
+        assert resumen['cuantiles'][0.5] == 50
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,47 @@
+"""
+Tests para la agregación diaria de series temporales en Spark
+"""
+
+import pytest
+import pandas as pd
+import os
+import sys
+
+# Agregar el directorio backend al path (y backend para los imports app.*)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend', 'app'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+pytest.importorskip("pyspark")
+
+from utils.time_series import daily_sales
+
+@pytest.fixture(scope="module")
+def spark():
+    """Sesión local de Spark (se omite el test si no se puede arrancar, p. ej. sin Java)"""
+    from utils.database import get_spark_session
+
+    try:
+        spark = get_spark_session()
+    except Exception as e:
+        pytest.skip(f"Spark no disponible: {e}")
+    yield spark
+    spark.stop()
+
+class TestDailySales:
+    """Tests para daily_sales"""
+
+    def test_rellena_dias_sin_ventas(self, spark):
+        """Una fila por día del calendario completo; los días sin ventas valen 0"""
+        ventas = spark.createDataFrame(pd.DataFrame({
+            'venta_id': ['V1', 'V2', 'V3', 'V4'],
+            'fecha': pd.to_datetime(['2024-01-01', '2024-01-01', '2024-01-03', '2024-01-06']),
+            'total': [10.0, 5.0, 7.0, 3.0],
+            'cantidad': [1, 2, 1, 4]
+        }))
+
+        serie = daily_sales(ventas)
+
+        assert serie['ds'].tolist() == list(pd.date_range('2024-01-01', '2024-01-06', freq='D'))
+        assert serie['y'].tolist() == [15.0, 0.0, 7.0, 0.0, 0.0, 3.0]
+        assert serie['cantidad'].tolist() == [3, 0, 1, 0, 0, 4]
+        assert serie['venta_id'].tolist() == [2, 0, 1, 0, 0, 1]
@@ -0,0 +1,62 @@
+"""
+Tests para la matriz usuario-producto dispersa
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+import os
+import sys
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend', 'app'))
+
+from ml.user_item_matrix import UserItemMatrix, benchmark
+
+@pytest.fixture
+def interacciones():
+    """Compras de tres clientes (C2 compra P1 dos veces)"""
+    return pd.DataFrame({
+        'customer_id': ['C2', 'C1', 'C2', 'C3', 'C2'],
+        'product_id': ['P1', 'P3', 'P1', 'P2', 'P3'],
+        'rating_implicito': [1.0, 2.0, 0.5, 4.0, 1.5]
+    })
+
+class TestUserItemMatrix:
+    """Tests para UserItemMatrix"""
+
+    def test_desde_tripletas(self, interacciones):
+        """Las tripletas se codifican por id ordenado y los duplicados se suman"""
+        matriz = UserItemMatrix.from_triples(
+            interacciones['customer_id'], interacciones['product_id'], interacciones['rating_implicito']
+        )
+        densa = interacciones.pivot_table(
+            index='customer_id', columns='product_id', values='rating_implicito', aggfunc='sum', fill_value=0
+        )
+
+        assert matriz.shape == (3, 3)
+        assert matriz.clientes.tolist() == ['C1', 'C2', 'C3']
+        np.testing.assert_allclose(matriz.matriz.toarray(), densa.to_numpy())
+
+    def test_consultas(self, interacciones):
+        """Índice de cliente y productos comprados sin densificar"""
+        matriz = UserItemMatrix.from_triples(
+            interacciones['customer_id'], interacciones['product_id'], interacciones['rating_implicito']
+        )
+
+        assert matriz.user_index('C2') == 1
+        assert matriz.user_index('C9') is None
+        assert matriz.purchased_products('C2') == ['P1', 'P3']
+        assert matriz.purchased_products('C9') == []
+
+        stats = matriz.stats()
+        assert stats['matrix_density'] == pytest.approx(4 / 9)
+        assert stats['avg_ratings_per_user'] == pytest.approx(4 / 3)
+
+    def test_benchmark(self, interacciones):
+        """El benchmark compara la memoria con el pivot denso"""
+        resultado = benchmark(interacciones)
+
+        assert resultado['forma'] == [3, 3]
+        assert resultado['interacciones'] == 4
+        assert resultado['bytes_densa'] == 3 * 3 * 8